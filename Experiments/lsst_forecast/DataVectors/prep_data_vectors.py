@@ -269,13 +269,13 @@ def create_static_data_vectors(
         raise ValueError("not implemented")
     
     # time-delays
-    # pad with a 2nd batch dim for # of fpd samples
-    data_vector_dict['td_measured'] = np.repeat(td_meas[:, np.newaxis, :],
-        num_fpd_samps, axis=1)
-    data_vector_dict['td_likelihood_prec'] = np.repeat(td_meas_prec[:, np.newaxis, :, :],
-        num_fpd_samps, axis=1)
-    data_vector_dict['td_likelihood_prefactors'] = np.log( (1/(2*np.pi)**(num_td/2)) / 
-        np.sqrt(np.linalg.det(np.linalg.inv(data_vector_dict['td_likelihood_prec']))) )
+    # one measurement per lens, broadcast across fpd samples in the likelihood
+    data_vector_dict['td_measured'] = td_meas
+    data_vector_dict['td_likelihood_prec'] = td_meas_prec
+    data_vector_dict['td_likelihood_prefactors'] = tdc_sampler.gaussian_log_prefactors(
+        td_meas_prec)
+    # sufficient statistics (a^T P a, a^T P m, m^T P m) for use_td_suff_stats
+    tdc_sampler.add_td_sufficient_statistics(data_vector_dict)
     
     # gamma_lens interim modeling prior
     # if no modeling prior specified, assumes uniform
@@ -294,15 +294,13 @@ def create_static_data_vectors(
     if kinematic_type is not None:
 
         # measured sigma_v
-        # pad with a 2nd batch dim for # of fpd samples
-        data_vector_dict['sigma_v_measured'] = np.repeat(sigma_v_meas[:, np.newaxis, :],
-                num_fpd_samps, axis=1)
-        data_vector_dict['sigma_v_likelihood_prec'] = np.repeat(
-            sigma_v_meas_prec[:, np.newaxis, :, :],
-            num_fpd_samps, axis=1)
-        
-        data_vector_dict['sigma_v_likelihood_prefactors'] = np.log( (1/(2*np.pi)**(num_kin_bins/2)) / 
-            np.sqrt(np.linalg.det(np.linalg.inv(data_vector_dict['sigma_v_likelihood_prec']))))
+        # one measurement per lens, broadcast across fpd samples in the likelihood
+        data_vector_dict['sigma_v_measured'] = sigma_v_meas
+        data_vector_dict['sigma_v_likelihood_prec'] = sigma_v_meas_prec
+        data_vector_dict['sigma_v_likelihood_prefactors'] = tdc_sampler.gaussian_log_prefactors(
+            sigma_v_meas_prec)
+        # sufficient statistics for use_kin_suff_stats
+        tdc_sampler.add_kin_sufficient_statistics(data_vector_dict)
         
         # beta_ani
         if log_prob_beta_ani_nu_int is None:
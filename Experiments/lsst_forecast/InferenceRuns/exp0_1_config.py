@@ -5,7 +5,7 @@ from scipy.stats import norm
 import numpy as np
 
 # file locations
-static_dv_file = 'InferenceRuns/exp0_1/TEST_static_datavectors.json'
+static_dv_file = 'InferenceRuns/exp0_1/TEST_static_datavectors.h5'
 gold_quads_h5_file = 'DataVectors/gold/quad_posteriors_KIN.h5'
 gold_dbls_h5_file = 'DataVectors/gold/dbl_posteriors_KIN.h5'
 gold_metadata_file = 'DataVectors/gold/truth_metadata.csv'
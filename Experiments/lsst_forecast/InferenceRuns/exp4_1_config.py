@@ -9,7 +9,7 @@ from scipy.stats import norm
 RANDOM_SEED = 1
 
 # file locations
-static_dv_file = 'InferenceRuns/exp4_1/static_datavectors_seed'+str(RANDOM_SEED)+'.json'
+static_dv_file = 'InferenceRuns/exp4_1/static_datavectors_seed'+str(RANDOM_SEED)+'.h5'
 gold_quads_h5_file = 'DataVectors/gold/quad_posteriors_KIN.h5'
 gold_dbls_h5_file = 'DataVectors/gold/dbl_posteriors_KIN.h5'
 gold_metadata_file = 'DataVectors/gold/truth_metadata.csv'
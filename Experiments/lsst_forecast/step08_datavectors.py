@@ -8,6 +8,7 @@ dirname = os.path.dirname(__file__)
 sys.path.insert(0, os.path.join(dirname, 'InferenceRuns'))
 sys.path.insert(0, os.path.join(dirname, '../..'))
 from Experiments.lsst_forecast.DataVectors.prep_data_vectors import create_static_data_vectors
+from Utils.data_vector_io import write_data_vectors_h5
 import tdc_sampler
 import time
 import argparse
@@ -15,6 +16,12 @@ import argparse
 parser = argparse.ArgumentParser(description="Run model with specific configurations.")
 # TODO: feed in config name
 parser.add_argument('--config',help="Name of config, stored in InferenceRuns/") # ex: exp0_1_config
+parser.add_argument('--from-json',default=None,
+    help="Convert an existing .json static data vectors file instead of re-computing")
+parser.add_argument('--sample-precision',choices=['float64','float32'],
+    default='float64',help="dtype of the per-sample arrays in the .h5 file, "+
+    "float32 files are memory-mapped as is by step08_inference.py "+
+    "--sample-precision float32")
 args = parser.parse_args()
 config_name = args.config
 config_module = import_module(config_name)
@@ -28,6 +35,22 @@ likelihood_configs = config_module.likelihood_configs
 if os.path.exists(static_dv_filepath):
     print(f"File {static_dv_filepath} already exists, exiting.")
 
+elif args.from_json is not None:
+    print(f"Converting {args.from_json} to: {static_dv_filepath}")
+
+    with open(args.from_json, 'r') as file:
+        data_vector_dict_list = json.load(file)
+    for dv_dict in data_vector_dict_list:
+        for key in dv_dict.keys():
+            if isinstance(dv_dict[key], list):
+                dv_dict[key] = np.asarray(dv_dict[key])
+        # older files replicate measurements across fpd samples
+        tdc_sampler.compact_measurements(dv_dict)
+        tdc_sampler.set_sample_precision(dv_dict,np.dtype(args.sample_precision))
+
+    write_data_vectors_h5(static_dv_filepath, data_vector_dict_list,
+        subsample_names=list(likelihood_configs.keys()))
+
 else:
     print(f"Writing new static data vectors file: {static_dv_filepath}")
 
@@ -40,15 +63,23 @@ else:
         # TODO: replace args with **input_dict (check all params are there)
         data_vector_dict = create_static_data_vectors(**input_dict)
 
-        # switch numpy arrays to lists for writing to .json
-        for key in data_vector_dict.keys():
-            if isinstance(data_vector_dict[key], np.ndarray):
-                data_vector_dict[key] = data_vector_dict[key].tolist()
-
         # append to list (one for each likelihood object)
         data_vector_dict_list.append(data_vector_dict)
 
-    # Write list of static data vectors to a JSON file
-    with open(static_dv_filepath, 'w') as file:
-        json.dump(data_vector_dict_list, file, indent=4)
+    if static_dv_filepath.endswith('.json'):
+        # legacy text format
+        for data_vector_dict in data_vector_dict_list:
+            # switch numpy arrays to lists for writing to .json
+            for key in data_vector_dict.keys():
+                if isinstance(data_vector_dict[key], np.ndarray):
+                    data_vector_dict[key] = data_vector_dict[key].tolist()
+        with open(static_dv_filepath, 'w') as file:
+            json.dump(data_vector_dict_list, file, indent=4)
+    else:
+        # binary store, memory-mapped by step08_inference.py
+        for data_vector_dict in data_vector_dict_list:
+            tdc_sampler.set_sample_precision(data_vector_dict,
+                np.dtype(args.sample_precision))
+        write_data_vectors_h5(static_dv_filepath, data_vector_dict_list,
+            subsample_names=list(likelihood_configs.keys()))
 
@@ -8,6 +8,7 @@ dirname = os.path.dirname(__file__)
 sys.path.insert(0, os.path.join(dirname, 'InferenceRuns'))
 sys.path.insert(0, os.path.join(dirname, '../..'))
 import tdc_sampler
+from Utils.data_vector_io import read_data_vectors_h5
 import time
 import argparse
 
@@ -16,6 +17,55 @@ parser = argparse.ArgumentParser(description="Run model with specific configurat
 parser.add_argument('--config',help="Name of config, stored in InferenceRuns/") # ex: exp0_1_config
 parser.add_argument("--use-MPI", action="store_true", help="Use MPI for parallel processing.")
 parser.add_argument("--use-multiprocess", action="store_true", help="Use multiprocess for parallel processing.")
+parser.add_argument("--td-suff-stats", action="store_true",
+    help="Evaluate the time-delay likelihood from precomputed sufficient "+
+    "statistics (quadratic form in the Ddt scaling).")
+parser.add_argument("--kin-suff-stats", action="store_true",
+    help="Same for the kinematics likelihood (quadratic form in the "+
+    "sqrt(Ds/Dds) scaling).")
+parser.add_argument("--group-likelihoods", action="store_true",
+    help="Evaluate the cosmology & distances once for all subsamples.")
+parser.add_argument("--pack-likelihoods", action="store_true",
+    help="Evaluate all subsamples (doubles, quads, any kinematics) w/ one "+
+    "likelihood object, in one vectorized pass per proposal.")
+parser.add_argument("--early-exit-chunks", type=int, default=None,
+    help="Split each subsample's lenses into this many chunks, evaluated "+
+    "tightest constraints first, so ruled-out proposals stop early.")
+parser.add_argument("--distance-emulator", choices=['linear', 'cubic'], default=None,
+    help="Interpolate distances from a precomputed (Omega_M,w0,wa) table.")
+parser.add_argument("--distance-emulator-dir", default=None,
+    help="Directory to store/re-use distance emulator tables.")
+parser.add_argument("--shared-data-vectors", action="store_true",
+    help="With --use-MPI: one rank per node loads the data vectors into "+
+    "shared memory, the other ranks attach read-only views.")
+parser.add_argument("--distribute-lenses", action="store_true",
+    help="With --use-MPI: shard lenses across ranks (one chain, allreduce "+
+    "of the log likelihood) instead of farming out walkers.")
+parser.add_argument("--likelihood-threads", type=int, default=None,
+    help="Split lenses into chunks evaluated by this many threads.")
+parser.add_argument("--num-cores", type=int, default=None,
+    help="Split this many cores into walker processes x lens threads, "+
+    "chosen from a short calibration run.")
+parser.add_argument("--persistent-workers", action="store_true",
+    help="Requires --use-multiprocess or --num-cores (not --use-MPI): "+
+    "workers attach the data vectors & build the likelihoods once, only "+
+    "proposals are sent per step.")
+parser.add_argument("--common-random-numbers", action="store_true",
+    help="Fixed lambda_int base uniforms (seeded by RANDOM_SEED), so the "+
+    "likelihood is a deterministic function of the hyperparameters.")
+parser.add_argument("--marginalize-lambda-int", action="store_true",
+    help="For time-delay-only likelihoods w/ COSMO_MODEL='LCDM_lambda_int': "+
+    "integrate lambda_int out analytically instead of sampling it.")
+parser.add_argument("--backend", choices=['numpy', 'jax'], default=None,
+    help="Likelihood backend. 'jax' evaluates all walkers & lenses in one "+
+    "jitted call. Default: LIKELIHOOD_BACKEND from the config, else 'numpy'.")
+parser.add_argument("--sample-precision", choices=['float64', 'float32'],
+    default=None, help="dtype of the per-sample arrays & arithmetic (sums "+
+    "over samples & lenses stay float64). Default: SAMPLE_PRECISION from the "+
+    "config, else 'float64'. See validate_sample_precision.py.")
+parser.add_argument("--jax-cache-dir", default=None,
+    help="Persistent jax compilation cache shared by MPI ranks, worker "+
+    "processes & later runs. Default: JAX_CACHE_DIR from the config, if set.")
 args = parser.parse_args()
 config_name = args.config
 use_MPI = args.use_MPI
@@ -23,10 +73,21 @@ use_multiprocess = args.use_multiprocess
 
 # TODO: switch to feeding in a config file
 config_module = import_module(config_name)
+likelihood_backend = args.backend
+if likelihood_backend is None:
+    likelihood_backend = getattr(config_module, 'LIKELIHOOD_BACKEND', 'numpy')
+sample_precision = args.sample_precision
+if sample_precision is None:
+    sample_precision = getattr(config_module, 'SAMPLE_PRECISION', 'float64')
+sample_dtype = np.dtype(sample_precision)
+jax_cache_dir = args.jax_cache_dir
+if jax_cache_dir is None:
+    jax_cache_dir = getattr(config_module, 'JAX_CACHE_DIR', None)
 
 
 # USER SETTINGS HERE
-USE_ASTROPY = True
+# distances default to the batched tdc_utils.W0waCDMDistanceEngine
+USE_ASTROPY = False
 np.random.seed(config_module.RANDOM_SEED)
 
 static_dv_filepath = config_module.static_dv_file 
@@ -39,33 +100,121 @@ if not os.path.exists(static_dv_filepath):
 # RUN MCMC HERE!!!
 ###################
 
-# load in static data vectors
-with open(static_dv_filepath, 'r') as file:
-    data_vector_dict_list = json.load(file)
-
-# return it to np.array
-for dv_dict in data_vector_dict_list:
-    for key in dv_dict.keys():
-        if isinstance(dv_dict[key], list):
-            dv_dict[key] = np.asarray(dv_dict[key])
-
-likelihood_obj_list = []
-# TODO: need to handle edge case when re-sampling, and might be missing silver quads...
-for dv_dict in data_vector_dict_list:
-    #print('Processing ', subsamp)
-    fpd_sample_shape = dv_dict['fpd_samples'].shape
-    if 'kin_pred_samples' in dv_dict.keys():
-        kin_pred_samples_shape = dv_dict['kin_pred_samples'].shape
-        lklhd_obj = tdc_sampler.TDCKinLikelihood(
-            fpd_sample_shape, kin_pred_samples_shape,
-            cosmo_model=config_module.COSMO_MODEL,
-            use_astropy=USE_ASTROPY)
+def load_data_vectors(static_dv_filepath):
+    """
+    Returns:
+        [dict]: static data vectors, one per likelihood object
+    """
+    if static_dv_filepath.endswith('.json'):
+        # legacy text format
+        with open(static_dv_filepath, 'r') as file:
+            data_vector_dict_list = json.load(file)
+
+        # return it to np.array
+        for dv_dict in data_vector_dict_list:
+            for key in dv_dict.keys():
+                if isinstance(dv_dict[key], list):
+                    dv_dict[key] = np.asarray(dv_dict[key])
+            # older files replicate measurements across fpd samples
+            tdc_sampler.compact_measurements(dv_dict)
     else:
-        lklhd_obj = tdc_sampler.TDCLikelihood(fpd_sample_shape,
-            cosmo_model=config_module.COSMO_MODEL,
-            use_astropy=USE_ASTROPY)
+        # read-only memory map, pages are shared by all processes on a node
+        data_vector_dict_list = read_data_vectors_h5(static_dv_filepath, mmap=True)
+
+    return data_vector_dict_list
+
+def build_likelihoods(data_vector_dict_list):
+    """
+    Returns:
+        [TDCLikelihood]: one likelihood object per data vector
+    """
+    likelihood_obj_list = []
+    # TODO: need to handle edge case when re-sampling, and might be missing silver quads...
+    for i, dv_dict in enumerate(data_vector_dict_list):
+        #print('Processing ', subsamp)
+        # same seed on every rank/worker, one stream per subsample
+        lambda_int_seed = None
+        if args.common_random_numbers:
+            lambda_int_seed = (config_module.RANDOM_SEED, i)
+        fpd_sample_shape = dv_dict['fpd_samples'].shape
+        if 'kin_pred_samples' in dv_dict.keys():
+            kin_pred_samples_shape = dv_dict['kin_pred_samples'].shape
+            lklhd_obj = tdc_sampler.TDCKinLikelihood(
+                fpd_sample_shape, kin_pred_samples_shape,
+                cosmo_model=config_module.COSMO_MODEL,
+                use_astropy=USE_ASTROPY,
+                use_td_suff_stats=args.td_suff_stats,
+                use_kin_suff_stats=args.kin_suff_stats,
+                distance_emulator=args.distance_emulator,
+                distance_emulator_dir=args.distance_emulator_dir,
+                lambda_int_seed=lambda_int_seed,
+                sample_dtype=sample_dtype)
+        else:
+            lklhd_obj = tdc_sampler.TDCLikelihood(fpd_sample_shape,
+                cosmo_model=config_module.COSMO_MODEL,
+                use_astropy=USE_ASTROPY,
+                use_td_suff_stats=args.td_suff_stats,
+                distance_emulator=args.distance_emulator,
+                distance_emulator_dir=args.distance_emulator_dir,
+                lambda_int_seed=lambda_int_seed,
+                marginalize_lambda_int=args.marginalize_lambda_int,
+                sample_dtype=sample_dtype)
+
+        likelihood_obj_list.append(lklhd_obj)
 
-    likelihood_obj_list.append(lklhd_obj)
+    return likelihood_obj_list
+
+def set_sample_precision(data_vector_dict_list):
+    """Converts the per-sample arrays to sample_dtype. No copy if the file 
+        already stores them in sample_dtype (memory maps are kept, see 
+        step08_datavectors.py --sample-precision), otherwise private 
+        in-memory copies.
+    """
+    if sample_dtype == np.float64:
+        return data_vector_dict_list
+    num_copied = sum(dv_dict[key].dtype != sample_dtype
+        for dv_dict in data_vector_dict_list
+        for key in tdc_sampler.PER_SAMPLE_KEYS
+        if isinstance(dv_dict.get(key), np.ndarray) and
+            dv_dict[key].dtype.kind == 'f')
+    if num_copied > 0:
+        print('Copying %d per-sample arrays to %s in memory (write the data '
+              'vectors w/ step08_datavectors.py --sample-precision %s to '
+              'memory-map them)' % (num_copied, sample_dtype, sample_dtype))
+    for dv_dict in data_vector_dict_list:
+        tdc_sampler.set_sample_precision(dv_dict, sample_dtype)
+
+    return data_vector_dict_list
+
+# load in static data vectors
+tik_load = time.time()
+if args.shared_data_vectors:
+    if not use_MPI:
+        raise ValueError("--shared-data-vectors requires --use-MPI")
+    from Utils import shared_data_vectors
+    node_comm = shared_data_vectors.node_communicator()
+    data_vector_dict_list = None
+    likelihood_obj_list = None
+    if node_comm.Get_rank() == 0:
+        data_vector_dict_list = load_data_vectors(static_dv_filepath)
+        likelihood_obj_list = build_likelihoods(data_vector_dict_list)
+        # computed once per node (in float64), before the arrays become 
+        #   read-only
+        tdc_sampler.add_missing_sufficient_statistics(data_vector_dict_list,
+            likelihood_obj_list)
+        set_sample_precision(data_vector_dict_list)
+    data_vector_dict_list = shared_data_vectors.share_data_vectors_mpi(
+        data_vector_dict_list, node_comm)
+    # the likelihood objects only hold settings & shapes
+    likelihood_obj_list = node_comm.bcast(likelihood_obj_list, root=0)
+else:
+    data_vector_dict_list = load_data_vectors(static_dv_filepath)
+    likelihood_obj_list = build_likelihoods(data_vector_dict_list)
+    # computed in float64, before the samples are rounded
+    tdc_sampler.add_missing_sufficient_statistics(data_vector_dict_list,
+        likelihood_obj_list)
+    set_sample_precision(data_vector_dict_list)
+print('Time to load static data vectors: %.2f seconds' % (time.time() - tik_load))
 
 # tdc_sampler likelihood object
 
@@ -75,7 +224,18 @@ tenIFU_chain = tdc_sampler.fast_TDC(likelihood_obj_list,data_vector_dict_list,
     n_walkers=config_module.NUM_MCMC_WALKERS,
     use_mpi=use_MPI, use_multiprocess=use_multiprocess,
     backend_path=config_module.BACKEND_PATH,
-    reset_backend=config_module.RESET_BACKEND)
+    reset_backend=config_module.RESET_BACKEND,
+    group_likelihoods=args.group_likelihoods,
+    pack_likelihoods=args.pack_likelihoods,
+    early_exit_chunks=args.early_exit_chunks,
+    distribute_lenses=args.distribute_lenses,
+    likelihood_threads=args.likelihood_threads,
+    num_cores=args.num_cores,
+    persistent_workers=args.persistent_workers,
+    # the jitted likelihood is vmapped over all walkers
+    vectorize=(likelihood_backend == 'jax'),
+    likelihood_backend=likelihood_backend,
+    jax_cache_dir=jax_cache_dir)
 end = time.time()
 print('Time to run MCMC:',end-start)
 
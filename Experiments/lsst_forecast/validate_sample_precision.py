@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import emcee
+import numpy as np
+from importlib import import_module
+
+dirname = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(dirname, 'InferenceRuns'))
+sys.path.insert(0, os.path.join(dirname, '../..'))
+import tdc_sampler
+from Utils.data_vector_io import read_data_vectors_h5
+import time
+import argparse
+
+# Validation of the float32 sample precision (TDCLikelihood(sample_dtype=
+#   np.float32) w/ set_sample_precision()) against float64, on the static data
+#   vectors of each config. Both use the same lambda_int samples (common random
+#   numbers), so differences come from precision only. The change in the
+#   posterior is estimated by importance weighting the float64 chain
+#   (BACKEND_PATH) w/ exp(log L_float32 - log L_float64): shift of the mean
+#   & ratio of the std. dev. of each hyperparameter, and the effective sample
+#   size of the weights. W/out a chain, proposals from generate_initial_state().
+#   Run from Experiments/lsst_forecast/ (config paths are relative), i.e.
+#   python validate_sample_precision.py --configs exp0_1_config exp1_1_config
+
+parser = argparse.ArgumentParser(description="Validate float32 sample precision.")
+parser.add_argument('--configs', nargs='+', default=['exp0_1_config', 'exp1_1_config'],
+    help="Names of configs, stored in InferenceRuns/")
+parser.add_argument('--num-samples', type=int, default=500,
+    help="# of posterior samples (or proposals) evaluated w/ both precisions")
+parser.add_argument('--discard', type=int, default=0,
+    help="burn-in steps discarded from the chain")
+parser.add_argument('--suff-stats', action='store_true',
+    help="Use the td & kinematic sufficient statistics")
+args = parser.parse_args()
+
+def load_data_vectors(static_dv_filepath):
+    """
+    Returns:
+        [dict]: static data vectors, one per likelihood object (in memory)
+    """
+    if static_dv_filepath.endswith('.json'):
+        # legacy text format
+        with open(static_dv_filepath, 'r') as file:
+            data_vector_dict_list = json.load(file)
+        for dv_dict in data_vector_dict_list:
+            for key in dv_dict.keys():
+                if isinstance(dv_dict[key], list):
+                    dv_dict[key] = np.asarray(dv_dict[key])
+            tdc_sampler.compact_measurements(dv_dict)
+        return data_vector_dict_list
+
+    return read_data_vectors_h5(static_dv_filepath, mmap=False)
+
+def build_likelihoods(data_vector_dict_list, config_module, sample_dtype):
+    """
+    Returns:
+        [TDCLikelihood]: one likelihood object per data vector, w/ common
+            random numbers for lambda_int
+    """
+    likelihood_obj_list = []
+    for i, dv_dict in enumerate(data_vector_dict_list):
+        kwargs = {'cosmo_model':config_module.COSMO_MODEL,
+                  'use_td_suff_stats':args.suff_stats,
+                  'lambda_int_seed':(config_module.RANDOM_SEED, i),
+                  'sample_dtype':sample_dtype}
+        if 'kin_pred_samples' in dv_dict.keys():
+            likelihood_obj_list.append(tdc_sampler.TDCKinLikelihood(
+                dv_dict['fpd_samples'].shape, dv_dict['kin_pred_samples'].shape,
+                use_kin_suff_stats=args.suff_stats, **kwargs))
+        else:
+            likelihood_obj_list.append(tdc_sampler.TDCLikelihood(
+                dv_dict['fpd_samples'].shape, **kwargs))
+
+    return likelihood_obj_list
+
+def posterior_samples(config_module):
+    """
+    Returns:
+        (n_samples,n_params) float64 posterior samples from the config's
+            chain, or proposals from generate_initial_state(), and a label
+    """
+    if os.path.exists(config_module.BACKEND_PATH):
+        chain = emcee.backends.HDFBackend(config_module.BACKEND_PATH,
+            read_only=True).get_chain(discard=args.discard, flat=True)
+        if len(chain) > 0:
+            chain = chain[np.random.choice(len(chain),
+                size=min(args.num_samples, len(chain)), replace=False)]
+            return chain, 'posterior samples from %s' % config_module.BACKEND_PATH
+
+    return (tdc_sampler.generate_initial_state(args.num_samples,
+        config_module.COSMO_MODEL), 'initial state proposals (no chain found)')
+
+def log_posteriors(samples, cosmo_model, tdc_likelihood_list):
+    """
+    Returns:
+        np.array (n_samples): log posterior of each sample
+    """
+    return np.asarray([tdc_sampler.log_posterior(sample, cosmo_model,
+        tdc_likelihood_list) for sample in samples])
+
+def report_posterior_change(samples, delta_log_posterior):
+    """Importance weights exp(delta) applied to the float64 samples
+    """
+    finite = np.isfinite(delta_log_posterior)
+    samples, delta_log_posterior = samples[finite], delta_log_posterior[finite]
+    weights = np.exp(delta_log_posterior - np.max(delta_log_posterior))
+    weights /= np.sum(weights)
+    print('  effective sample size of the weights: %.4f of %d' % (
+        1. / np.sum(weights**2) / len(weights), len(weights)))
+
+    mean = np.mean(samples, axis=0)
+    std = np.std(samples, axis=0)
+    weighted_mean = np.sum(weights[:, np.newaxis] * samples, axis=0)
+    weighted_std = np.sqrt(np.sum(weights[:, np.newaxis] *
+        (samples - weighted_mean)**2, axis=0))
+    for p in range(samples.shape[1]):
+        print('  param %d: mean shift %.2e std. dev., std. dev. ratio %.6f' % (
+            p, (weighted_mean[p] - mean[p]) / std[p], weighted_std[p] / std[p]))
+
+
+for config_name in args.configs:
+    config_module = import_module(config_name)
+    np.random.seed(config_module.RANDOM_SEED)
+    print('%s (%s)' % (config_name, config_module.COSMO_MODEL))
+
+    dv_float64 = load_data_vectors(config_module.static_dv_file)
+    lklhd_float64 = build_likelihoods(dv_float64, config_module, np.float64)
+    tdc_sampler.add_missing_sufficient_statistics(dv_float64, lklhd_float64)
+    # sufficient statistics are computed & kept in float64, only the 
+    #   per-sample arrays are rounded
+    dv_float32 = [tdc_sampler.set_sample_precision(dict(dv_dict))
+                  for dv_dict in dv_float64]
+    lklhd_float32 = build_likelihoods(dv_float32, config_module, np.float32)
+    print('  data vectors: %.1f MB (float64), %.1f MB (float32)' % tuple(
+        sum(value.nbytes for dv_dict in dv_list for value in dv_dict.values()
+            if isinstance(value, np.ndarray)) / 1e6
+        for dv_list in [dv_float64, dv_float32]))
+
+    samples, label = posterior_samples(config_module)
+    print('  %d %s' % (len(samples), label))
+    log_post = {}
+    for name, dv_list, lklhd_list in [('float64', dv_float64, lklhd_float64),
+                                      ('float32', dv_float32, lklhd_float32)]:
+        tdc_sampler.data_vector_global = dv_list
+        tik = time.time()
+        log_post[name] = log_posteriors(samples, config_module.COSMO_MODEL,
+                                        lklhd_list)
+        print('  %s: %.4f seconds per evaluation' % (name,
+            (time.time() - tik) / len(samples)))
+
+    # -inf - -inf outside the prior
+    with np.errstate(invalid='ignore'):
+        delta_log_posterior = log_post['float32'] - log_post['float64']
+    finite = np.isfinite(delta_log_posterior)
+    print('  log posterior float32 - float64: max |delta| %.2e, mean %.2e, '
+          'std. dev. %.2e (%d non-finite)' % (
+        np.max(np.abs(delta_log_posterior[finite])),
+        np.mean(delta_log_posterior[finite]),
+        np.std(delta_log_posterior[finite]), np.sum(~finite)))
+    report_posterior_change(samples, delta_log_posterior)
@@ -0,0 +1,77 @@
+import h5py
+import numpy as np
+
+# Binary store for the static data vectors consumed by tdc_sampler.fast_TDC():
+#   one HDF5 group per likelihood config, every array as a contiguous,
+#   uncompressed dataset so it can be memory-mapped read-only (all MPI ranks /
+#   processes then share the OS page cache instead of holding private copies)
+
+
+def write_data_vectors_h5(filepath,data_vector_dict_list,subsample_names=None):
+    """
+    Args:
+        filepath (string): .h5 file (overwritten if it exists)
+        data_vector_dict_list ([dict]): one data vector per likelihood object
+            (i.e. from create_static_data_vectors())
+        subsample_names ([string]): group names (i.e. likelihood_configs
+            keys). Default: 'dv_0','dv_1',...
+    """
+
+    if subsample_names is None:
+        subsample_names = ['dv_%d'%(i) for i in range(len(data_vector_dict_list))]
+
+    with h5py.File(filepath,'w') as h5f:
+        for i,(name,data_vector_dict) in enumerate(zip(subsample_names,
+            data_vector_dict_list)):
+            group = h5f.create_group(name)
+            # keeps the order of the likelihood objects
+            group.attrs['index'] = i
+            none_keys = []
+            for key,value in data_vector_dict.items():
+                if value is None:
+                    none_keys.append(key)
+                else:
+                    # contiguous layout (no chunking/compression) for memmap
+                    group.create_dataset(key,data=np.asarray(value))
+            group.attrs['none_keys'] = none_keys
+
+
+def read_data_vectors_h5(filepath,mmap=True):
+    """
+    Args:
+        filepath (string): .h5 file written by write_data_vectors_h5()
+        mmap (bool): If True, arrays are read-only np.memmap views of the
+            file (loaded lazily by the OS). If False, arrays are read into
+            memory.
+
+    Returns:
+        [dict]: data vectors, in the order they were written
+    """
+
+    data_vector_dict_list = []
+    with h5py.File(filepath,'r') as h5f:
+        groups = sorted(h5f.values(),key=lambda group: group.attrs['index'])
+        for group in groups:
+            data_vector_dict = {}
+            for key,dataset in group.items():
+                data_vector_dict[key] = _read_dataset(filepath,dataset,mmap)
+            for key in group.attrs['none_keys']:
+                data_vector_dict[key] = None
+            data_vector_dict_list.append(data_vector_dict)
+
+    return data_vector_dict_list
+
+
+def _read_dataset(filepath,dataset,mmap):
+    """
+    Returns:
+        np.memmap of a contiguous dataset, otherwise an in-memory np.array
+    """
+
+    # offset is None for chunked/compressed or empty datasets
+    offset = dataset.id.get_offset() if mmap else None
+    if offset is None or dataset.shape == () or dataset.dtype.kind not in 'biuf':
+        return dataset[()]
+
+    return np.memmap(filepath,mode='r',dtype=dataset.dtype,
+        shape=dataset.shape,offset=offset)
@@ -0,0 +1,185 @@
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+
+# Node-level shared memory for the static data vectors: one process per node
+#   holds the arrays in a single shared buffer (MPI shared-memory window or
+#   POSIX shared memory), every other process attaches read-only, zero-copy
+#   np.ndarray views. Memory per node then no longer grows w/ the # of ranks.
+
+# byte alignment of each array inside the shared buffer
+SHARED_ALIGNMENT = 64
+
+# shared buffers (MPI windows / SharedMemory) must outlive the array views
+_shared_buffers = []
+
+
+def data_vector_layout(data_vector_dict_list):
+    """
+    Args:
+        data_vector_dict_list ([dict]): one data vector per likelihood object
+
+    Returns:
+        layout ([dict]): per data vector, key -> ('array',offset,shape,dtype)
+            for np.ndarrays, or ('value',value) for anything else (i.e. None)
+        nbytes (int): size of the shared buffer
+    """
+
+    layout = []
+    nbytes = 0
+    for data_vector_dict in data_vector_dict_list:
+        dv_layout = {}
+        for key,value in data_vector_dict.items():
+            if isinstance(value,np.ndarray):
+                nbytes = -(-nbytes//SHARED_ALIGNMENT)*SHARED_ALIGNMENT
+                dv_layout[key] = ('array',nbytes,value.shape,value.dtype.str)
+                nbytes += value.nbytes
+            else:
+                dv_layout[key] = ('value',value)
+        layout.append(dv_layout)
+
+    return layout, nbytes
+
+
+def copy_to_buffer(buffer,data_vector_dict_list,layout):
+    """Copies every array into its slot of the (writeable) shared buffer
+    """
+
+    for data_vector_dict,dv_layout in zip(data_vector_dict_list,layout):
+        for key,entry in dv_layout.items():
+            if entry[0] == 'array':
+                _,offset,shape,dtype = entry
+                view = np.ndarray(shape,dtype=dtype,buffer=buffer,offset=offset)
+                view[...] = data_vector_dict[key]
+
+
+def views_from_buffer(buffer,layout,read_only=True):
+    """
+    Args:
+        buffer (buffer): shared buffer filled by copy_to_buffer()
+        layout ([dict]): from data_vector_layout()
+        read_only (bool): If True, views can not be written to
+
+    Returns:
+        [dict]: data vectors w/ np.ndarray views into the buffer (no copy)
+    """
+
+    data_vector_dict_list = []
+    for dv_layout in layout:
+        data_vector_dict = {}
+        for key,entry in dv_layout.items():
+            if entry[0] == 'array':
+                _,offset,shape,dtype = entry
+                view = np.ndarray(shape,dtype=dtype,buffer=buffer,offset=offset)
+                if read_only:
+                    view.flags.writeable = False
+                data_vector_dict[key] = view
+            else:
+                data_vector_dict[key] = entry[1]
+        data_vector_dict_list.append(data_vector_dict)
+
+    return data_vector_dict_list
+
+
+#####################
+# MPI shared windows
+#####################
+
+def node_communicator(comm=None):
+    """
+    Args:
+        comm (mpi4py.MPI.Comm): Default=MPI.COMM_WORLD
+
+    Returns:
+        mpi4py.MPI.Comm w/ the ranks that share memory (one per node)
+    """
+    from mpi4py import MPI
+
+    if comm is None:
+        comm = MPI.COMM_WORLD
+
+    return comm.Split_type(MPI.COMM_TYPE_SHARED)
+
+
+def share_data_vectors_mpi(data_vector_dict_list,node_comm):
+    """Collective over node_comm. Rank 0 of node_comm copies its data vectors
+    into an MPI shared-memory window, every rank gets read-only views.
+
+    Args:
+        data_vector_dict_list ([dict]): data vectors on rank 0 of node_comm
+            (ignored, i.e. None, on the other ranks)
+        node_comm (mpi4py.MPI.Comm): from node_communicator()
+
+    Returns:
+        [dict]: data vectors backed by the node's shared window
+    """
+    from mpi4py import MPI
+
+    is_node_root = (node_comm.Get_rank() == 0)
+    layout, nbytes = None, None
+    if is_node_root:
+        layout, nbytes = data_vector_layout(data_vector_dict_list)
+    layout, nbytes = node_comm.bcast((layout,nbytes),root=0)
+
+    # only the node root allocates, others attach to its segment
+    window = MPI.Win.Allocate_shared(max(nbytes,1) if is_node_root else 0,1,
+        comm=node_comm)
+    _shared_buffers.append(window)
+    shared_buffer,_ = window.Shared_query(0)
+    shared_buffer = np.ndarray((max(nbytes,1),),dtype=np.uint8,
+        buffer=shared_buffer)
+
+    if is_node_root:
+        copy_to_buffer(shared_buffer,data_vector_dict_list,layout)
+    node_comm.Barrier()
+
+    return views_from_buffer(shared_buffer,layout,read_only=True)
+
+
+######################
+# POSIX shared memory
+######################
+
+def share_data_vectors_posix(data_vector_dict_list,name=None):
+    """Copies the data vectors into a new POSIX shared memory block. The
+    owner should call close() and unlink() on the block when done.
+
+    Args:
+        data_vector_dict_list ([dict])
+        name (string): shared memory name. Default: random name
+
+    Returns:
+        shared_memory.SharedMemory, layout ([dict]) to pass to
+            attach_data_vectors_posix()
+    """
+
+    layout, nbytes = data_vector_layout(data_vector_dict_list)
+    shm = shared_memory.SharedMemory(name=name,create=True,size=max(nbytes,1))
+    copy_to_buffer(shm.buf,data_vector_dict_list,layout)
+
+    return shm, layout
+
+
+def attach_data_vectors_posix(name,layout):
+    """
+    Args:
+        name (string): SharedMemory.name from share_data_vectors_posix()
+        layout ([dict]): from share_data_vectors_posix()
+
+    Returns:
+        [dict]: read-only data vectors backed by the shared memory block
+    """
+
+    try:
+        # python>=3.13: attaching process does not own the block
+        shm = shared_memory.SharedMemory(name=name,track=False)
+    except TypeError:
+        # the owner's resource tracker is inherited by forked/spawned
+        #   children, an unrelated process starts its own tracker which would
+        #   unlink the block when this process exits
+        own_tracker = getattr(resource_tracker._resource_tracker,'_fd',None) is None
+        shm = shared_memory.SharedMemory(name=name)
+        if own_tracker:
+            resource_tracker.unregister(shm._name,'shared_memory')
+    _shared_buffers.append(shm)
+
+    return views_from_buffer(shm.buf,layout,read_only=True)
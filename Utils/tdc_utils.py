@@ -1,4 +1,9 @@
+import os
+import hashlib
+import tempfile
 import numpy as np
+from collections import namedtuple, OrderedDict
+from scipy.ndimage import spline_filter1d
 import jax
 jax.config.update("jax_enable_x64", True)
 import jax_cosmo.background as jc_background
@@ -145,6 +150,48 @@ def jax_kin_distance_ratio(my_cosmology,z_lens,z_src):
 
     return D_s/D_ds
 
+@jax.jit
+def jax_distance_bundle(my_cosmology,z_lens,z_src):
+    """
+    All distances needed by TDCKinLikelihood from one comoving distance 
+        evaluation at a_lens & a_src (assumes a flat cosmology, as built by
+        TDCLikelihood.construct_proposed_cosmo())
+
+    Args:
+        my_cosmology (jax-cosmo Cosmology): jax-cosmo cosmology object
+        z_lens ([float]): lens redshifts
+        z_src ([float]): source redshifts
+
+    Returns:
+        (dict) w/ 'D_d','D_s','D_ds','Ddt' (in Mpc) and 'Ds_div_Dds'
+    """
+
+    # translate redshift to scale factor
+    a_lens = jc_utils.z2a(z_lens)
+    a_src = jc_utils.z2a(z_src)
+
+    comoving_d = jc_background.radial_comoving_distance(my_cosmology,a_lens)/my_cosmology.h
+    comoving_s = jc_background.radial_comoving_distance(my_cosmology,a_src)/my_cosmology.h
+    comoving_ds = comoving_s - comoving_d
+
+    return {
+        'D_d':comoving_d*a_lens,
+        'D_s':comoving_s*a_src,
+        'D_ds':comoving_ds*a_src,
+        # Ddt = (1+z_lens) (D_d*D_s)/(D_ds)
+        'Ddt':comoving_d*comoving_s/comoving_ds,
+        'Ds_div_Dds':comoving_s/comoving_ds
+    }
+
+# vectorized over a batch of proposals: every jax_cosmo.Cosmology parameter
+#   carries a leading (n_walkers) axis, output is (n_walkers,n_lenses)
+jax_ddt_from_redshifts_batched = jax.jit(jax.vmap(jax_ddt_from_redshifts,
+    in_axes=(0,None,None)))
+jax_kin_distance_ratio_batched = jax.jit(jax.vmap(jax_kin_distance_ratio,
+    in_axes=(0,None,None)))
+jax_distance_bundle_batched = jax.jit(jax.vmap(jax_distance_bundle,
+    in_axes=(0,None,None)))
+
 def kin_distance_ratio(my_cosmology,z_lens,z_src):
     """
     Computes: D_s / D_ds
@@ -161,4 +208,583 @@ def kin_distance_ratio(my_cosmology,z_lens,z_src):
     D_s = my_cosmology.angular_diameter_distance(z_src)
     D_ds = my_cosmology.angular_diameter_distance_z1z2(z_lens, z_src)
 
-    return D_s/D_ds
\ No newline at end of file
+    return D_s/D_ds
+
+def distance_bundle(my_cosmology,z_lens,z_src):
+    """
+    Same as jax_distance_bundle(), for an astropy cosmology (one comoving 
+        distance evaluation at z_lens & z_src, flat cosmology)
+
+    Args:
+        my_cosmology (astropy.cosmology.Cosmology): astropy cosmology object
+        z_lens ([float]): lens redshifts
+        z_src ([float]): source redshifts
+
+    Returns:
+        (dict) w/ 'D_d','D_s','D_ds','Ddt' (in Mpc) and 'Ds_div_Dds'
+    """
+
+    z_lens = np.asarray(z_lens)
+    z_src = np.asarray(z_src)
+    comoving_d = my_cosmology.comoving_distance(z_lens).value
+    comoving_s = my_cosmology.comoving_distance(z_src).value
+    comoving_ds = comoving_s - comoving_d
+
+    return {
+        'D_d':comoving_d/(1.+z_lens),
+        'D_s':comoving_s/(1.+z_src),
+        'D_ds':comoving_ds/(1.+z_src),
+        # Ddt = (1+z_lens) (D_d*D_s)/(D_ds)
+        'Ddt':comoving_d*comoving_s/comoving_ds,
+        'Ds_div_Dds':comoving_s/comoving_ds
+    }
+
+#########################################
+# Batched flat w0waCDM distance engine
+#########################################
+
+# speed of light used by astropy (C_kmpersec above is kept for td conversions)
+C_kmpersec_astropy = 299792.458
+
+# proposed cosmology consumed by W0waCDMDistanceEngine.distances(). Every field
+#   can carry a leading (n_walkers) axis for a batch of proposals
+FlatW0waCDM = namedtuple('FlatW0waCDM',['H0','Om0','w0','wa'])
+
+class W0waCDMDistanceEngine():
+
+    def __init__(self,z_lens,z_src,num_nodes=32,cache_size=256):
+        """
+        Flat w0waCDM distances (no radiation, matches astropy's w0waCDM w/ 
+        Ode0=1-Om0 and Tcmb0=0) for a fixed set of lens/source redshifts.
+
+        D_C(z) = (c/H0) int_0^z dz'/E(z') is evaluated with a fixed-order 
+        Gauss-Legendre rule on [0,z], for every redshift (and every proposal
+        in a batch) in one array pass. The nodes only depend on the redshifts,
+        so everything but E(z') is precomputed here.
+
+        Accuracy: with num_nodes=32, comoving distances agree with astropy to
+        better than 1e-10 (relative) for z<=5 over the prior ranges 
+        Omega_M=[0.05,0.5], w0=[-2,0], wa=[-2,2] (num_nodes=16 gives ~3e-6)
+
+        H0 only sets the overall distance scale (Ddt ~ 1/H0, Ds/Dds is 
+        independent of H0), so the integral is done once per unique 
+        (Omega_M,w0,wa) and kept in an LRU cache of the most recent 
+        cache_size shape parameters. H0 is applied analytically in 
+        distances_from_dimensionless().
+
+        Args:
+            z_lens ([float]): lens redshifts (n_lenses)
+            z_src ([float]): source redshifts (n_lenses)
+            num_nodes (int): order of the Gauss-Legendre rule
+            cache_size (int): max. number of (Omega_M,w0,wa) entries kept in 
+                the cache. Set to 0 to disable caching.
+        """
+
+        self.z_lens = np.asarray(z_lens,dtype=float)
+        self.z_src = np.asarray(z_src,dtype=float)
+        self.num_lenses = len(self.z_lens)
+
+        # lens & source redshifts integrated together: (2*n_lenses)
+        z = np.concatenate([self.z_lens,self.z_src])
+        nodes,weights = np.polynomial.legendre.leggauss(num_nodes)
+        # map [-1,1] to [0,z]: (2*n_lenses,num_nodes)
+        z_nodes = 0.5*z[:,np.newaxis]*(nodes+1.)
+        self._weights = 0.5*z[:,np.newaxis]*weights
+        self._one_plus_z_cubed = (1.+z_nodes)**3
+        self._log_one_plus_z = np.log1p(z_nodes)
+        self._z_div_one_plus_z = z_nodes/(1.+z_nodes)
+
+        # (Omega_M,w0,wa) -> (chi_lens,chi_src), most recently used last
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def dimensionless_comoving_distance(self,Om0,w0=-1.,wa=0.):
+        """
+        Args:
+            Om0 (float or [float]): Omega_M, (n_walkers) for a batch
+            w0 (float or [float])
+            wa (float or [float])
+
+        Returns:
+            H0*D_C/c at z_lens and z_src, each w/ shape (...,n_lenses)
+        """
+
+        Om0 = np.asarray(Om0,dtype=float)[...,np.newaxis,np.newaxis]
+        w0 = np.asarray(w0,dtype=float)[...,np.newaxis,np.newaxis]
+        wa = np.asarray(wa,dtype=float)[...,np.newaxis,np.newaxis]
+
+        # CPL dark energy: rho_de(z)/rho_de0 = (1+z)^(3(1+w0+wa)) exp(-3 wa z/(1+z))
+        de_scaling = np.exp(3.*(1.+w0+wa)*self._log_one_plus_z -
+            3.*wa*self._z_div_one_plus_z)
+        inv_E = 1./np.sqrt(Om0*self._one_plus_z_cubed + (1.-Om0)*de_scaling)
+        chi = np.sum(self._weights*inv_E,axis=-1)
+
+        return chi[...,:self.num_lenses], chi[...,self.num_lenses:]
+
+    def gauss_legendre_tables(self):
+        """
+        Precomputed node tables of the Gauss-Legendre rule, for evaluating 
+        the same integral elsewhere (i.e. tdc_jax_utils.jax_distances())
+
+        Returns:
+            dict: 'weights', 'one_plus_z_cubed', 'log_one_plus_z', 
+                'z_div_one_plus_z', each w/ shape (2*n_lenses,num_nodes), 
+                lens redshifts first
+        """
+
+        return {
+            'weights':self._weights,
+            'one_plus_z_cubed':self._one_plus_z_cubed,
+            'log_one_plus_z':self._log_one_plus_z,
+            'z_div_one_plus_z':self._z_div_one_plus_z
+        }
+
+    def cached_dimensionless_comoving_distance(self,Om0,w0=-1.,wa=0.):
+        """
+        Same as dimensionless_comoving_distance(), but only (Omega_M,w0,wa) 
+        combinations missing from the LRU cache are integrated (in one 
+        vectorized call).
+
+        Args:
+            Om0 (float or [float]): Omega_M, (n_walkers) for a batch
+            w0 (float or [float])
+            wa (float or [float])
+
+        Returns:
+            H0*D_C/c at z_lens and z_src, each w/ shape (...,n_lenses)
+        """
+
+        if self.cache_size <= 0:
+            return self.dimensionless_comoving_distance(Om0,w0,wa)
+
+        shape_params = np.broadcast_arrays(np.asarray(Om0,dtype=float),
+            np.asarray(w0,dtype=float),np.asarray(wa,dtype=float))
+        batch_shape = shape_params[0].shape
+        keys = list(zip(*[p.ravel().tolist() for p in shape_params]))
+
+        # look-up unique keys first, so evictions can't affect this call
+        found = {}
+        for key in dict.fromkeys(keys):
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                found[key] = self._cache[key]
+                self.cache_hits += 1
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if len(missing) > 0:
+            Om0_missing,w0_missing,wa_missing = np.asarray(missing).T
+            chi_lens,chi_src = self.dimensionless_comoving_distance(
+                Om0_missing,w0_missing,wa_missing)
+            for i,key in enumerate(missing):
+                found[key] = (chi_lens[i],chi_src[i])
+                self._cache[key] = found[key]
+            self.cache_misses += len(missing)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        chi_lens = np.stack([found[key][0] for key in keys])
+        chi_src = np.stack([found[key][1] for key in keys])
+
+        return (chi_lens.reshape(batch_shape+(self.num_lenses,)), 
+            chi_src.reshape(batch_shape+(self.num_lenses,)))
+
+    def distances(self,cosmo):
+        """
+        Args:
+            cosmo (FlatW0waCDM): proposed cosmology (or batch of proposals)
+
+        Returns:
+            (dict) w/ 'D_d','D_s','D_ds','Ddt' (in Mpc) and 'Ds_div_Dds' 
+                (unitless), each w/ shape (...,n_lenses)
+        """
+
+        chi_lens,chi_src = self.cached_dimensionless_comoving_distance(
+            cosmo.Om0,cosmo.w0,cosmo.wa)
+
+        return distances_from_dimensionless(chi_lens,chi_src,cosmo.H0,
+            self.z_lens,self.z_src)
+
+
+def distances_from_dimensionless(chi_lens,chi_src,H0,z_lens,z_src):
+    """Flat universe: D_A(z1,z2) = (c/H0) (chi(z2)-chi(z1)) / (1+z2)
+
+    Args:
+        chi_lens (...,n_lenses): H0*D_C/c at z_lens
+        chi_src (...,n_lenses): H0*D_C/c at z_src
+        H0 (float or [float]): (n_walkers) for a batch
+        z_lens ([float]): (n_lenses)
+        z_src ([float]): (n_lenses)
+
+    Returns:
+        (dict) w/ 'D_d','D_s','D_ds','Ddt' (in Mpc) and 'Ds_div_Dds'
+    """
+
+    hubble_distance = C_kmpersec_astropy/np.asarray(H0,dtype=float)[...,np.newaxis]
+    chi_ds = chi_src - chi_lens
+
+    return {
+        'D_d':hubble_distance*chi_lens/(1.+z_lens),
+        'D_s':hubble_distance*chi_src/(1.+z_src),
+        'D_ds':hubble_distance*chi_ds/(1.+z_src),
+        # Ddt = (1+z_lens) (D_d*D_s)/(D_ds)
+        'Ddt':hubble_distance*chi_lens*chi_src/chi_ds,
+        'Ds_div_Dds':chi_src/chi_ds
+    }
+
+
+#########################################
+# Tabulated (emulated) flat w0waCDM distances
+#########################################
+
+# covers the (Omega_M,w0,wa) prior box in tdc_sampler: (min,max,num_points)
+EMULATOR_GRID_DEFAULT = {
+    'Om0':(0.05,0.5,46),
+    'w0':(-2.,0.,41),
+    'wa':(-2.,2.,41)
+}
+
+# extra (exact) grid points on each side of the emulated range
+EMULATOR_GRID_PADDING = 3
+
+class W0waCDMDistanceEmulator(W0waCDMDistanceEngine):
+
+    def __init__(self,z_lens,z_src,grid=None,interpolation='linear',
+        num_nodes=32,chi_lens_grid=None,chi_src_grid=None):
+        """
+        Drop-in replacement for W0waCDMDistanceEngine that interpolates 
+        tabulated dimensionless comoving distances on a regular 
+        (Omega_M,w0,wa) grid instead of integrating. Proposals outside the grid
+        fall back to the exact integrator.
+
+        Args:
+            z_lens ([float]): lens redshifts (n_lenses)
+            z_src ([float]): source redshifts (n_lenses)
+            grid (dict): {'Om0':(min,max,num_points),'w0':(...),'wa':(...)}.
+                Default=EMULATOR_GRID_DEFAULT
+            interpolation (string): 'linear' (multilinear) or 'cubic' (cubic
+                B-spline)
+            num_nodes (int): Gauss-Legendre order used to build the table
+            chi_lens_grid, chi_src_grid (np.array): precomputed (padded) 
+                tables w/ shape (n_Om0+2*EMULATOR_GRID_PADDING,...,n_lenses)
+                (see load()). If None, they are computed here.
+        """
+
+        # caching is pointless on top of the table
+        super().__init__(z_lens,z_src,num_nodes=num_nodes,cache_size=0)
+
+        if interpolation not in ['linear','cubic']:
+            raise ValueError('interpolation must be linear or cubic')
+        if grid is None:
+            grid = EMULATOR_GRID_DEFAULT
+        self.grid = {key:tuple(grid[key]) for key in ['Om0','w0','wa']}
+        self.interpolation = interpolation
+        self.num_nodes = num_nodes
+
+        # interpolation is used inside [min,max], the table is padded by
+        #   EMULATOR_GRID_PADDING exact points on each side so that the 
+        #   spline boundary conditions don't degrade the edges of the grid
+        self._range_min = np.asarray([self.grid[key][0] for key in ['Om0','w0','wa']])
+        self._range_max = np.asarray([self.grid[key][1] for key in ['Om0','w0','wa']])
+        # Omega_M axis is uniform in log(Omega_M) (distances vary fastest
+        #   at small Omega_M)
+        self._axes_min = self._grid_coords(self._range_min)
+        self._axes_step = (self._grid_coords(self._range_max)-self._axes_min)/(
+            np.asarray([self.grid[key][2]-1 for key in ['Om0','w0','wa']]))
+        self._axes_len = np.asarray([self.grid[key][2] for key in 
+            ['Om0','w0','wa']]) + 2*EMULATOR_GRID_PADDING
+        self._axes = [self._axes_min[i] + self._axes_step[i]*
+            np.arange(-EMULATOR_GRID_PADDING,
+            self._axes_len[i]-EMULATOR_GRID_PADDING) for i in range(3)]
+
+        if chi_lens_grid is None or chi_src_grid is None:
+            chi_lens_grid,chi_src_grid = self._tabulate()
+        self.chi_lens_grid = np.asarray(chi_lens_grid)
+        self.chi_src_grid = np.asarray(chi_src_grid)
+
+        # (n_Om0,n_w0,n_wa,2*n_lenses), same ordering as the integrator.
+        #   log(chi) is smoother in Omega_M than chi
+        table = np.log(np.concatenate([self.chi_lens_grid,self.chi_src_grid],
+            axis=-1))
+        if self.interpolation == 'cubic':
+            # cubic B-spline coefficients along the three parameter axes
+            for axis in range(3):
+                table = spline_filter1d(table,order=3,axis=axis,mode='mirror')
+        self._table = table
+
+    def _tabulate(self):
+        """
+        Returns:
+            chi_lens_grid, chi_src_grid: exact dimensionless comoving 
+                distances on the padded grid, each w/ shape 
+                (n_Om0+2*EMULATOR_GRID_PADDING,...,n_lenses)
+        """
+        w0_mesh,wa_mesh = np.meshgrid(self._axes[1],self._axes[2],
+            indexing='ij')
+        chi_lens_grid = []
+        chi_src_grid = []
+        # one Omega_M slice at a time to bound memory
+        for Om0 in np.exp(self._axes[0]):
+            chi_lens,chi_src = W0waCDMDistanceEngine.dimensionless_comoving_distance(
+                self,np.full(w0_mesh.shape,Om0),w0_mesh,wa_mesh)
+            chi_lens_grid.append(chi_lens)
+            chi_src_grid.append(chi_src)
+
+        return np.stack(chi_lens_grid), np.stack(chi_src_grid)
+
+    @staticmethod
+    def _grid_coords(points):
+        """
+        Args:
+            points (np.array): (...,3) w/ columns (Om0,w0,wa)
+
+        Returns:
+            (log(Om0),w0,wa), the coordinates the grid is uniform in
+        """
+        coords = np.array(points,dtype=float)
+        coords[...,0] = np.log(coords[...,0])
+        return coords
+
+    def _interpolate(self,points):
+        """
+        Args:
+            points (np.array): (n_points,3) w/ columns (Om0,w0,wa), all 
+                inside the grid
+
+        Returns:
+            np.array w/ shape (n_points,2*n_lenses)
+        """
+
+        # fractional coordinates in the padded table
+        coords = ((self._grid_coords(points)-self._axes_min)/self._axes_step + 
+            EMULATOR_GRID_PADDING)
+
+        idx = np.clip(np.floor(coords).astype(int),0,self._axes_len-2)
+        frac = coords - idx
+
+        if self.interpolation == 'cubic':
+            # B-spline weights for grid points idx-1,...,idx+2: (n_points,3,4)
+            offsets = np.arange(-1,3)
+            weights = np.stack([(1.-frac)**3, 3.*frac**3-6.*frac**2+4.,
+                -3.*frac**3+3.*frac**2+3.*frac+1., frac**3],axis=-1)/6.
+            # mirror boundary (same as the spline_filter1d coefficients)
+            neighbors = idx[...,np.newaxis] + offsets
+            max_idx = (self._axes_len-1)[:,np.newaxis]
+            neighbors = np.abs(neighbors)
+            neighbors = np.where(neighbors > max_idx,2*max_idx-neighbors,
+                neighbors)
+        else:
+            # multilinear: grid points idx,idx+1
+            weights = np.stack([1.-frac,frac],axis=-1)
+            neighbors = idx[...,np.newaxis] + np.arange(2)
+
+        # weighted sum over the surrounding grid points
+        result = np.zeros((len(points),self._table.shape[-1]))
+        for corner in np.ndindex(*([weights.shape[-1]]*3)):
+            weight = (weights[:,0,corner[0]]*weights[:,1,corner[1]]*
+                weights[:,2,corner[2]])
+            result += weight[:,np.newaxis]*self._table[
+                neighbors[:,0,corner[0]],neighbors[:,1,corner[1]],
+                neighbors[:,2,corner[2]]]
+
+        return np.exp(result)
+
+    def dimensionless_comoving_distance(self,Om0,w0=-1.,wa=0.):
+        """
+        Args:
+            Om0 (float or [float]): Omega_M, (n_walkers) for a batch
+            w0 (float or [float])
+            wa (float or [float])
+
+        Returns:
+            H0*D_C/c at z_lens and z_src, each w/ shape (...,n_lenses)
+        """
+
+        shape_params = np.broadcast_arrays(np.asarray(Om0,dtype=float),
+            np.asarray(w0,dtype=float),np.asarray(wa,dtype=float))
+        batch_shape = shape_params[0].shape
+        points = np.stack([p.ravel() for p in shape_params],axis=-1)
+
+        chi = np.empty((len(points),2*self.num_lenses))
+        in_grid = np.all((points >= self._range_min) & 
+            (points <= self._range_max),axis=-1)
+        if np.any(in_grid):
+            chi[in_grid] = self._interpolate(points[in_grid])
+        if not np.all(in_grid):
+            chi_lens,chi_src = W0waCDMDistanceEngine.dimensionless_comoving_distance(
+                self,*points[~in_grid].T)
+            chi[~in_grid] = np.concatenate([chi_lens,chi_src],axis=-1)
+
+        chi = chi.reshape(batch_shape+(2*self.num_lenses,))
+
+        return chi[...,:self.num_lenses], chi[...,self.num_lenses:]
+
+    def accuracy_report(self,num_test_points=1000,seed=0):
+        """
+        Compares interpolated distances against the exact integrator at 
+        random points inside the grid
+
+        Args:
+            num_test_points (int)
+            seed (int)
+
+        Returns:
+            (dict) {'Ddt':{'median':,'p99':,'max':},'Ds_div_Dds':{...}} of 
+                absolute relative errors
+        """
+
+        rng = np.random.default_rng(seed)
+        points = rng.uniform(self._range_min,self._range_max,
+            size=(num_test_points,3))
+        # H0 drops out of relative errors
+        cosmo = FlatW0waCDM(H0=70.,Om0=points[:,0],w0=points[:,1],
+            wa=points[:,2])
+        emulated = self.distances(cosmo)
+        exact = distances_from_dimensionless(
+            *W0waCDMDistanceEngine.dimensionless_comoving_distance(self,
+            cosmo.Om0,cosmo.w0,cosmo.wa),cosmo.H0,self.z_lens,self.z_src)
+
+        report = {}
+        for key in ['Ddt','Ds_div_Dds']:
+            rel_err = np.abs(emulated[key]/exact[key] - 1.)
+            report[key] = {
+                'median':np.median(rel_err),
+                'p99':np.percentile(rel_err,99),
+                'max':np.max(rel_err)
+            }
+
+        return report
+
+    def save(self,filepath):
+        """
+        Args:
+            filepath (string or file): .npz file
+        """
+        np.savez(filepath,z_lens=self.z_lens,z_src=self.z_src,
+            grid=np.asarray([self.grid[key] for key in ['Om0','w0','wa']]),
+            num_nodes=self.num_nodes,chi_lens_grid=self.chi_lens_grid,
+            chi_src_grid=self.chi_src_grid)
+
+    @classmethod
+    def load(cls,filepath,interpolation='linear'):
+        """
+        Args:
+            filepath (string): .npz file written by save()
+            interpolation (string): 'linear' or 'cubic'
+        """
+        with np.load(filepath) as table_file:
+            grid_array = table_file['grid']
+            grid = {key:(grid_array[i][0],grid_array[i][1],int(grid_array[i][2]))
+                for i,key in enumerate(['Om0','w0','wa'])}
+            return cls(table_file['z_lens'],table_file['z_src'],grid=grid,
+                interpolation=interpolation,
+                num_nodes=int(table_file['num_nodes']),
+                chi_lens_grid=table_file['chi_lens_grid'],
+                chi_src_grid=table_file['chi_src_grid'])
+
+    @classmethod
+    def load_or_build(cls,z_lens,z_src,table_dir,grid=None,
+        interpolation='linear',num_nodes=32,verbose=False):
+        """
+        Re-uses a table from table_dir if one exists for the same redshifts
+        & grid, otherwise builds one and writes it there (atomically, see 
+        tdc_sampler.prepare_distance_engines() to build it once before 
+        sampling).
+
+        Args:
+            z_lens ([float]): lens redshifts (n_lenses)
+            z_src ([float]): source redshifts (n_lenses)
+            table_dir (string): directory for emulator tables
+            grid (dict): see __init__
+            interpolation (string): 'linear' or 'cubic'
+            num_nodes (int): see __init__
+            verbose (bool): If True, prints the accuracy report of a new 
+                table
+        """
+
+        if grid is None:
+            grid = EMULATOR_GRID_DEFAULT
+        filepath = os.path.join(table_dir,'distance_emulator_%s.npz'%(
+            emulator_table_hash(z_lens,z_src,grid,num_nodes)))
+
+        if os.path.exists(filepath):
+            return cls.load(filepath,interpolation=interpolation)
+
+        emulator = cls(z_lens,z_src,grid=grid,interpolation=interpolation,
+            num_nodes=num_nodes)
+        os.makedirs(table_dir,exist_ok=True)
+        # written under a temporary name & renamed, so a process checking
+        #   for the table concurrently never loads a partial file
+        tmp_fd,tmp_path = tempfile.mkstemp(suffix='.npz',dir=table_dir)
+        try:
+            with os.fdopen(tmp_fd,'wb') as tmp_file:
+                emulator.save(tmp_file)
+            os.replace(tmp_path,filepath)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        if verbose:
+            print('Wrote distance emulator table: ',filepath)
+            print('Relative errors vs. exact integrator: ',
+                emulator.accuracy_report())
+
+        return emulator
+
+
+def emulator_table_hash(z_lens,z_src,grid,num_nodes):
+    """
+    Returns:
+        (string) identifies an emulator table by redshifts & grid settings
+    """
+    hasher = hashlib.sha1()
+    hasher.update(np.asarray(z_lens,dtype=float).tobytes())
+    hasher.update(np.asarray(z_src,dtype=float).tobytes())
+    hasher.update(repr([tuple(grid[key]) for key in ['Om0','w0','wa']]).encode())
+    hasher.update(repr(num_nodes).encode())
+
+    return hasher.hexdigest()[:16]
+
+
+#########################################
+# JAX compilation cache
+#########################################
+
+def enable_jax_compilation_cache(cache_dir):
+    """Persistent on-disk cache of compiled XLA programs. Every process 
+    (MPI rank, pool worker, later run) w/ the same cache_dir (i.e. on a 
+    shared filesystem) loads a program compiled by another one instead of 
+    compiling it again. Programs are keyed by the traced computation, input 
+    shapes & jax/XLA versions, so changing data vector shapes only adds 
+    entries.
+
+    Args:
+        cache_dir (string): created if it does not exist
+    """
+
+    os.makedirs(cache_dir,exist_ok=True)
+    jax.config.update('jax_compilation_cache_dir',cache_dir)
+    # by default only slow (>1s) compilations are stored, the distance 
+    #   kernels are smaller than that but compiled by every rank
+    jax.config.update('jax_persistent_cache_min_compile_time_secs',0)
+    jax.config.update('jax_persistent_cache_min_entry_size_bytes',-1)
+
+def disable_jax_compilation_cache():
+    """Stops reading/writing the cache set by enable_jax_compilation_cache()
+    """
+    from jax.experimental.compilation_cache import compilation_cache
+
+    jax.config.update('jax_compilation_cache_dir',None)
+    compilation_cache.reset_cache()
+
+def aot_compile(jitted_fn,*args):
+    """Ahead-of-time lowering & compilation for the shapes/dtypes of args 
+    (abstract jax.ShapeDtypeStruct or concrete values, nothing is 
+    executed). A later call w/ the same shapes reuses the lowering & the 
+    XLA executable, but still goes through jitted_fn's (empty) dispatch 
+    cache once.
+
+    Returns:
+        jax.stages.Compiled
+    """
+
+    return jitted_fn.lower(*args).compile()
@@ -0,0 +1,53 @@
+# Startup cost of the static data vectors: indented JSON (legacy
+# step08_datavectors.py output) vs. the memory-mapped HDF5 store
+import os
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+from synthetic_data_vectors import make_synthetic_data_vector
+import tdc_sampler
+from Utils.data_vector_io import write_data_vectors_h5, read_data_vectors_h5
+
+parser = argparse.ArgumentParser(description="Benchmark data vector I/O.")
+parser.add_argument('--num-lenses', type=int, default=50)
+parser.add_argument('--num-fpd-samples', type=int, default=1000)
+args = parser.parse_args()
+
+data_vector_list = [
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 3, 10, seed=0),
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, seed=1)]
+
+def load_json(filepath):
+    with open(filepath, 'r') as file:
+        dv_list = json.load(file)
+    for dv_dict in dv_list:
+        for key in dv_dict.keys():
+            if isinstance(dv_dict[key], list):
+                dv_dict[key] = np.asarray(dv_dict[key])
+        tdc_sampler.compact_measurements(dv_dict)
+    return dv_list
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    json_filepath = os.path.join(tmp_dir, 'static_datavectors.json')
+    h5_filepath = os.path.join(tmp_dir, 'static_datavectors.h5')
+
+    with open(json_filepath, 'w') as file:
+        json.dump([{key: (value.tolist() if isinstance(value, np.ndarray)
+            else value) for key, value in dv.items()}
+            for dv in data_vector_list], file, indent=4)
+    write_data_vectors_h5(h5_filepath, data_vector_list)
+
+    for name, filepath, load in [
+        ('json', json_filepath, load_json),
+        ('h5 (in memory)', h5_filepath,
+            lambda f: read_data_vectors_h5(f, mmap=False)),
+        ('h5 (memmap)', h5_filepath,
+            lambda f: read_data_vectors_h5(f, mmap=True))]:
+        tik = time.time()
+        dv_list = load(filepath)
+        tok = time.time()
+        print('%s: %.1f MB on disk, %.3f seconds to load' % (name,
+            os.path.getsize(filepath) / 1e6, tok - tik))
+        del dv_list
@@ -0,0 +1,106 @@
+# Times the three distance backends (astropy, jax_cosmo, and the batched
+# tdc_utils.W0waCDMDistanceEngine) and reports the engine's accuracy vs. astropy
+import time
+import argparse
+import numpy as np
+import jax_cosmo
+import jax.numpy as jnp
+from astropy.cosmology import w0waCDM
+from synthetic_data_vectors import tdc_utils
+
+parser = argparse.ArgumentParser(description="Benchmark distance backends.")
+parser.add_argument('--num-lenses', type=int, default=100)
+parser.add_argument('--n-walkers', type=int, default=60)
+parser.add_argument('--n-repeats', type=int, default=3)
+parser.add_argument('--emulator-dir', default=None,
+    help="Re-use/store emulator tables here (default: build in memory)")
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+z_lens = rng.uniform(0.3, 0.8, size=args.num_lenses)
+z_src = rng.uniform(1.5, 3.5, size=args.num_lenses)
+
+# one proposal per walker
+H0 = rng.uniform(60., 80., size=args.n_walkers)
+Om0 = rng.uniform(0.1, 0.5, size=args.n_walkers)
+w0 = rng.uniform(-1.5, -0.5, size=args.n_walkers)
+wa = rng.uniform(-1., 1., size=args.n_walkers)
+
+engine = tdc_utils.W0waCDMDistanceEngine(z_lens, z_src)
+# repeated timings would otherwise be served from the LRU cache
+uncached_engine = tdc_utils.W0waCDMDistanceEngine(z_lens, z_src, cache_size=0)
+
+def astropy_ddt():
+    return np.stack([np.asarray(tdc_utils.ddt_from_redshifts(
+        w0waCDM(H0=H0[w], Om0=Om0[w], Ode0=1.-Om0[w], w0=w0[w], wa=wa[w]),
+        z_lens, z_src).value) for w in range(args.n_walkers)])
+
+def jax_cosmo_ddt():
+    return np.stack([np.asarray(tdc_utils.jax_ddt_from_redshifts(
+        jax_cosmo.Cosmology(h=jnp.float32(H0[w]/100.),
+            Omega_c=jnp.float32(Om0[w]), Omega_b=jnp.float32(0.),
+            Omega_k=jnp.float32(0.), w0=jnp.float32(w0[w]),
+            wa=jnp.float32(wa[w]), sigma8=jnp.float32(0.8),
+            n_s=jnp.float32(0.96)),
+        z_lens, z_src)) for w in range(args.n_walkers)])
+
+def engine_ddt_per_walker():
+    return np.stack([uncached_engine.distances(tdc_utils.FlatW0waCDM(
+        H0=H0[w], Om0=Om0[w], w0=w0[w], wa=wa[w]))['Ddt']
+        for w in range(args.n_walkers)])
+
+def engine_ddt_batched():
+    return uncached_engine.distances(tdc_utils.FlatW0waCDM(
+        H0=H0, Om0=Om0, w0=w0, wa=wa))['Ddt']
+
+# H0 scan at fixed (Omega_M,w0,wa): integrated once w/ the LRU cache
+def h0_scan(my_engine):
+    return np.stack([my_engine.distances(tdc_utils.FlatW0waCDM(
+        H0=H0[w], Om0=0.3, w0=-1., wa=0.))['Ddt']
+        for w in range(args.n_walkers)])
+
+# warm-up (jit compilation) & accuracy
+reference = astropy_ddt()
+for name, fn in [('astropy', astropy_ddt), ('jax_cosmo', jax_cosmo_ddt),
+    ('engine (per-walker)', engine_ddt_per_walker),
+    ('engine (batched)', engine_ddt_batched)]:
+    max_rel_err = np.max(np.abs(fn()/reference - 1.))
+    tik = time.time()
+    for _ in range(args.n_repeats):
+        fn()
+    tok = time.time()
+    print('%s: %.5f seconds for %d walkers x %d lenses, max rel. err. %.1e' % (
+        name, (tok - tik) / args.n_repeats, args.n_walkers, args.num_lenses,
+        max_rel_err))
+
+for name, my_engine in [('uncached', uncached_engine), ('cached', engine)]:
+    tik = time.time()
+    for _ in range(args.n_repeats):
+        h0_scan(my_engine)
+    tok = time.time()
+    print('H0 scan, %s engine: %.5f seconds for %d H0 values' % (
+        name, (tok - tik) / args.n_repeats, args.n_walkers))
+
+# tabulated distances (W0waCDMDistanceEmulator)
+for interpolation in ['linear', 'cubic']:
+    tik = time.time()
+    if args.emulator_dir is None:
+        emulator = tdc_utils.W0waCDMDistanceEmulator(z_lens, z_src,
+            interpolation=interpolation)
+    else:
+        emulator = tdc_utils.W0waCDMDistanceEmulator.load_or_build(z_lens,
+            z_src, args.emulator_dir, interpolation=interpolation)
+    tok = time.time()
+    print('emulator (%s): %.2f seconds to build/load' % (interpolation,
+        tok - tik))
+    for key, errors in emulator.accuracy_report().items():
+        print('    %s rel. err. vs. exact: median %.1e, 99%% %.1e, max %.1e' % (
+            key, errors['median'], errors['p99'], errors['max']))
+    emulator.distances(tdc_utils.FlatW0waCDM(H0=H0, Om0=Om0, w0=w0, wa=wa))
+    tik = time.time()
+    for _ in range(args.n_repeats):
+        emulator.distances(tdc_utils.FlatW0waCDM(H0=H0, Om0=Om0, w0=w0, wa=wa))
+    tok = time.time()
+    print('emulator (%s, batched): %.5f seconds for %d walkers x %d lenses' % (
+        interpolation, (tok - tik) / args.n_repeats, args.n_walkers,
+        args.num_lenses))
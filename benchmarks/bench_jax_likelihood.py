@@ -0,0 +1,64 @@
+# Compares the numpy likelihood against the fully jitted JAX backend
+# (tdc_sampler.JaxLikelihood, the path used by
+# fast_TDC(...,likelihood_backend='jax')) on CPU, for a single proposal and for
+# a batch of walkers
+import time
+import argparse
+import numpy as np
+from synthetic_data_vectors import make_synthetic_data_vector, make_likelihood
+import tdc_sampler
+
+parser = argparse.ArgumentParser(description="Benchmark the JAX backend.")
+parser.add_argument('--num-lenses', type=int, default=50)
+parser.add_argument('--num-fpd-samples', type=int, default=1000)
+parser.add_argument('--n-walkers', type=int, default=60)
+parser.add_argument('--n-repeats', type=int, default=5)
+parser.add_argument('--no-suff-stats', action='store_true')
+args = parser.parse_args()
+
+COSMO_MODEL = 'w0waCDM_lambda_int_beta_ani'
+
+data_vector_list = [
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 3, 10, seed=0),
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, 1, seed=1),
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, seed=2)]
+# common random numbers: both backends see the same lambda_int samples
+likelihood_list = [make_likelihood(dv, COSMO_MODEL,
+    use_suff_stats=not args.no_suff_stats, lambda_int_seed=(0, i))
+    for i, dv in enumerate(data_vector_list)]
+tdc_sampler.add_missing_sufficient_statistics(data_vector_list, likelihood_list)
+tdc_sampler.data_vector_global = data_vector_list
+
+walkers = tdc_sampler.generate_initial_state(args.n_walkers, COSMO_MODEL)
+
+tik = time.time()
+device_data_list = tdc_sampler.prepare_jax_data_vectors(likelihood_list)
+print('jax: %.2f seconds to copy %.1f MB of data vectors to the device' % (
+    time.time() - tik, sum(value.nbytes for data in device_data_list
+    for value in data.values()) / 1e6))
+tik = time.time()
+jax_likelihood = tdc_sampler.JaxLikelihood(likelihood_list)
+jax_likelihood.full_log_likelihood(walkers[0])
+print('jax: %.2f seconds to compile (single proposal)' % (time.time() - tik))
+tik = time.time()
+jax_likelihood.full_log_likelihood(walkers)
+print('jax: %.2f seconds to compile (batch of %d)' % (time.time() - tik,
+    args.n_walkers))
+
+numpy_batch = tdc_sampler.total_log_likelihood(walkers, likelihood_list)
+jax_batch = jax_likelihood.full_log_likelihood(walkers)
+print('max. abs. difference numpy vs. jax: %.1e' % (
+    np.max(np.abs(numpy_batch - jax_batch))))
+
+for name, tdc_likelihood_list in [('numpy', likelihood_list),
+    ('jax', jax_likelihood)]:
+    for mode, hyperparameters in [('single proposal', walkers[0]),
+        ('batch of %d' % args.n_walkers, walkers)]:
+        tdc_sampler.total_log_likelihood(hyperparameters, tdc_likelihood_list)
+        tik = time.time()
+        for _ in range(args.n_repeats):
+            tdc_sampler.total_log_likelihood(hyperparameters, tdc_likelihood_list)
+        tok = time.time()
+        print('%s, %s: %.5f seconds per call (%d lenses x %d samples)' % (
+            name, mode, (tok - tik) / args.n_repeats, 3 * args.num_lenses,
+            args.num_fpd_samples))
@@ -0,0 +1,118 @@
+# Time-to-first-likelihood per rank for jitted likelihoods: every MPI rank /
+#   worker process traces & compiles the same jax programs before its first
+#   likelihood call. Compares no cache, a cold & a warm persistent compilation
+#   cache (tdc_utils.enable_jax_compilation_cache()), each w/ or w/o the
+#   ahead-of-time warm-up (tdc_sampler.warm_up_likelihoods()) fast_TDC runs
+#   before sampling. The first call is what emcee's vectorized stretch move
+#   evaluates first: the full ensemble (initial state) then each half of it
+#   (first step).
+#   w/ mpi4py: mpiexec -n 4 python bench_jax_startup.py --cache-dir <dir>
+#   otherwise --num-ranks fresh (spawned) processes play the ranks
+import os
+import time
+import argparse
+import tempfile
+import multiprocessing
+from functools import partial
+
+parser = argparse.ArgumentParser(description="Benchmark jax start-up per rank.")
+parser.add_argument('--num-lenses', type=int, default=50)
+parser.add_argument('--num-fpd-samples', type=int, default=1000)
+parser.add_argument('--n-walkers', type=int, default=60)
+parser.add_argument('--num-ranks', type=int, default=2)
+parser.add_argument('--jax-cosmo', action='store_true',
+    help="numpy likelihoods w/ use_jax_cosmo distances (the MPI-compatible "+
+    "jax path) instead of likelihood_backend='jax' (JaxLikelihood)")
+parser.add_argument('--cache-dir', default=None,
+    help="Default: a temporary directory (cold, then warm)")
+args = parser.parse_args()
+
+COSMO_MODEL = 'w0waCDM_lambda_int_beta_ani'
+
+def time_to_first_likelihood(rank, cache_dir, aot):
+    """
+    Returns:
+        (rank, setup, warm-up, first call, steady call) in seconds
+    """
+    def stretch_move_calls(walkers, tdc_likelihood_list):
+        half = len(walkers) // 2
+        for batch in [walkers, walkers[:half], walkers[half:]]:
+            tdc_sampler.total_log_likelihood(batch, tdc_likelihood_list)
+
+    tik = time.time()
+    from synthetic_data_vectors import make_synthetic_data_vector, make_likelihood
+    import tdc_sampler
+    import Utils.tdc_utils as tdc_utils
+
+    if cache_dir is not None:
+        tdc_utils.enable_jax_compilation_cache(cache_dir)
+    data_vector_list = [
+        make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 3, 10, seed=0),
+        make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, 1, seed=1),
+        make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, seed=2)]
+    likelihood_list = [make_likelihood(dv, COSMO_MODEL, use_suff_stats=True,
+        use_jax_cosmo=args.jax_cosmo) for dv in data_vector_list]
+    tdc_sampler.data_vector_global = data_vector_list
+    tdc_likelihood_list = likelihood_list
+    if not args.jax_cosmo:
+        tdc_likelihood_list = tdc_sampler.JaxLikelihood(likelihood_list)
+        tdc_likelihood_list.build()
+    walkers = tdc_sampler.generate_initial_state(args.n_walkers, COSMO_MODEL)
+    setup_time = time.time() - tik
+
+    tik = time.time()
+    if aot:
+        for hyperparameters in tdc_sampler.proposal_shaped_hyperparameters(
+                args.n_walkers, COSMO_MODEL, vectorize=True):
+            tdc_sampler.warm_up_likelihoods(tdc_likelihood_list, hyperparameters)
+    warm_up_time = time.time() - tik
+
+    tik = time.time()
+    stretch_move_calls(walkers, tdc_likelihood_list)
+    first_call_time = time.time() - tik
+
+    tik = time.time()
+    stretch_move_calls(walkers, tdc_likelihood_list)
+    steady_call_time = time.time() - tik
+
+    return (rank, setup_time, warm_up_time, first_call_time, steady_call_time)
+
+def report(name, results):
+    print(name)
+    for rank, setup_time, warm_up_time, first_call_time, steady_call_time in results:
+        print('  rank %d: setup %.2f s, warm-up %.2f s, first call %.3f s '
+            '(time to first likelihood %.2f s), steady call %.4f s' % (
+            rank, setup_time, warm_up_time, first_call_time,
+            setup_time + warm_up_time + first_call_time, steady_call_time))
+
+if __name__ == '__main__':
+    try:
+        from mpi4py import MPI
+        comm = MPI.COMM_WORLD
+    except ImportError:
+        comm = None
+
+    if comm is not None and comm.Get_size() > 1:
+        # one measurement per launch, rerun w/ the same --cache-dir for warm
+        results = comm.gather(time_to_first_likelihood(comm.Get_rank(),
+            args.cache_dir, aot=True), root=0)
+        if comm.Get_rank() == 0:
+            report('%d MPI ranks, cache: %s' % (comm.Get_size(),
+                args.cache_dir), results)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_dir = args.cache_dir if args.cache_dir is not None else tmp_dir
+            for name, pass_cache_dir, aot in [
+                ('no cache, compiled at first call', None, False),
+                ('no cache, ahead-of-time warm-up', None, True),
+                ('cold cache, ahead-of-time warm-up', cache_dir, True),
+                ('warm cache, ahead-of-time warm-up', cache_dir, True)]:
+                # fresh interpreters, like separate ranks
+                with multiprocessing.get_context('spawn').Pool(
+                        args.num_ranks) as pool:
+                    results = pool.map(partial(time_to_first_likelihood,
+                        cache_dir=pass_cache_dir, aot=aot), range(args.num_ranks))
+                if pass_cache_dir is not None:
+                    # created by the first pass that enables the cache
+                    name += ' (%d cache entries)' % len(os.listdir(pass_cache_dir))
+                report('%d processes, %s' % (args.num_ranks, name), results)
@@ -0,0 +1,55 @@
+# Peak memory of the temporaries allocated per likelihood call & likelihood
+#   evaluations per second, w/ and w/o the preallocated workspace
+#   (TDCLikelihood(use_workspace=...)), for a single proposal & a batch of
+#   walkers. numpy allocations are traced by tracemalloc, the peak is measured
+#   after a first call (so the workspace itself is not counted per call).
+import time
+import argparse
+import tracemalloc
+from synthetic_data_vectors import make_synthetic_data_vector, make_likelihood
+import tdc_sampler
+
+parser = argparse.ArgumentParser(description="Benchmark the likelihood workspace.")
+parser.add_argument('--num-lenses', type=int, default=50)
+parser.add_argument('--num-fpd-samples', type=int, default=5000)
+parser.add_argument('--n-walkers', type=int, default=20)
+parser.add_argument('--n-repeats', type=int, default=5)
+parser.add_argument('--suff-stats', action='store_true')
+args = parser.parse_args()
+
+COSMO_MODEL = 'w0waCDM_lambda_int_beta_ani'
+
+data_vector_list = [
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 3, 10, seed=0),
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, 1, seed=1),
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, seed=2)]
+tdc_sampler.data_vector_global = data_vector_list
+walkers = tdc_sampler.generate_initial_state(args.n_walkers, COSMO_MODEL)
+
+for use_workspace in [False, True]:
+    likelihood_list = [make_likelihood(dv, COSMO_MODEL,
+        use_suff_stats=args.suff_stats, lambda_int_seed=(0, i),
+        use_workspace=use_workspace) for i, dv in enumerate(data_vector_list)]
+    for mode, hyperparameters in [('single proposal', walkers[0]),
+        ('batch of %d' % args.n_walkers, walkers)]:
+        tdc_sampler.total_log_likelihood(hyperparameters, likelihood_list)
+
+        tracemalloc.start()
+        tdc_sampler.total_log_likelihood(hyperparameters, likelihood_list)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tik = time.time()
+        for _ in range(args.n_repeats):
+            tdc_sampler.total_log_likelihood(hyperparameters, likelihood_list)
+        seconds_per_call = (time.time() - tik) / args.n_repeats
+
+        workspace_bytes = sum(likelihood.workspace().nbytes()
+            for likelihood in likelihood_list) if use_workspace else 0
+        print('%s, %s: %.1f MB allocated per call (peak), %.1f MB workspace, '
+            '%.1f proposals per second (%d lenses x %d samples)' % (
+            'workspace' if use_workspace else 'no workspace', mode,
+            peak_bytes / 1e6, workspace_bytes / 1e6,
+            len(hyperparameters) / seconds_per_call if hyperparameters.ndim > 1
+            else 1. / seconds_per_call, 3 * args.num_lenses,
+            args.num_fpd_samples))
@@ -0,0 +1,59 @@
+# Likelihood evaluations per second for a mixed gold+silver sample (quads &
+#   doubles, NIRSPEC / MUSE / 4MOST / no kinematics): one likelihood object
+#   per subsample (a list, or a LikelihoodGroup sharing the distances) vs.
+#   one PackedLikelihood over the packed ragged data vector
+#   (tdc_sampler.pack_data_vectors()), for a single proposal & a batch of
+#   walkers.
+import time
+import argparse
+from synthetic_data_vectors import make_synthetic_data_vector, make_likelihood
+import tdc_sampler
+
+parser = argparse.ArgumentParser(description="Benchmark the packed likelihood.")
+parser.add_argument('--num-lenses', type=int, default=20,
+    help="# of lenses per subsample")
+parser.add_argument('--num-fpd-samples', type=int, default=5000)
+parser.add_argument('--n-walkers', type=int, default=20)
+parser.add_argument('--n-repeats', type=int, default=5)
+parser.add_argument('--suff-stats', action='store_true')
+args = parser.parse_args()
+
+COSMO_MODEL = 'w0waCDM_lambda_int_beta_ani'
+
+# (dim_fpd, num_kin_bins) of each subsample
+SUBSAMPLES = [(3, 10), (3, 3), (1, 3), (3, 1), (1, 1), (3, None), (1, None)]
+data_vector_list = [make_synthetic_data_vector(args.num_lenses,
+    args.num_fpd_samples, dim_fpd, num_kin_bins, seed=s)
+    for s, (dim_fpd, num_kin_bins) in enumerate(SUBSAMPLES)]
+likelihood_list = [make_likelihood(dv, COSMO_MODEL,
+    use_suff_stats=args.suff_stats, lambda_int_seed=(0, s))
+    for s, dv in enumerate(data_vector_list)]
+walkers = tdc_sampler.generate_initial_state(args.n_walkers, COSMO_MODEL)
+
+tik = time.time()
+packed_data_vector_list = [tdc_sampler.pack_data_vectors(data_vector_list,
+                                                          likelihood_list)]
+print('packed %d subsamples in %.2f seconds' % (len(SUBSAMPLES),
+                                                time.time() - tik))
+
+for name, dv_list, tdc_likelihood_list in [
+        ('%d likelihood objects' % len(SUBSAMPLES), data_vector_list,
+            likelihood_list),
+        ('LikelihoodGroup', data_vector_list,
+            tdc_sampler.LikelihoodGroup(likelihood_list)),
+        ('PackedLikelihood', packed_data_vector_list,
+            [tdc_sampler.PackedLikelihood(likelihood_list)])]:
+    tdc_sampler.data_vector_global = dv_list
+    for mode, hyperparameters in [('single proposal', walkers[0]),
+        ('batch of %d' % args.n_walkers, walkers)]:
+        tdc_sampler.total_log_likelihood(hyperparameters, tdc_likelihood_list)
+
+        tik = time.time()
+        for _ in range(args.n_repeats):
+            tdc_sampler.total_log_likelihood(hyperparameters, tdc_likelihood_list)
+        seconds_per_call = (time.time() - tik) / args.n_repeats
+
+        print('%s, %s: %.1f proposals per second (%d lenses x %d samples)' % (
+            name, mode, len(hyperparameters) / seconds_per_call
+            if hyperparameters.ndim > 1 else 1. / seconds_per_call,
+            len(SUBSAMPLES) * args.num_lenses, args.num_fpd_samples))
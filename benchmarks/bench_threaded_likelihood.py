@@ -0,0 +1,51 @@
+# Single-chain latency: one log_posterior call (serial) vs. lens chunks
+# evaluated by a thread pool (the path used by fast_TDC(...,likelihood_threads=N)).
+# Run w/ OMP_NUM_THREADS=1 so that BLAS threads do not compete w/ the pool.
+import os
+import time
+import argparse
+from synthetic_data_vectors import make_synthetic_data_vector, make_likelihood
+import tdc_sampler
+
+parser = argparse.ArgumentParser(description="Benchmark threaded likelihood.")
+parser.add_argument('--num-lenses', type=int, default=100)
+parser.add_argument('--num-fpd-samples', type=int, default=5000)
+parser.add_argument('--n-walkers', type=int, default=1,
+    help="1 for a single proposal, >1 for a vectorized batch")
+parser.add_argument('--n-repeats', type=int, default=5)
+parser.add_argument('--threads', type=int, nargs='+',
+    default=sorted({1, 2, 4, os.cpu_count()}))
+args = parser.parse_args()
+
+COSMO_MODEL = 'w0waCDM_lambda_int_beta_ani'
+
+data_vector_list = [
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 3, 10, seed=0),
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, seed=2)]
+likelihood_list = [make_likelihood(dv, COSMO_MODEL, use_suff_stats=True)
+    for dv in data_vector_list]
+tdc_sampler.add_missing_sufficient_statistics(data_vector_list, likelihood_list)
+
+walkers = tdc_sampler.generate_initial_state(args.n_walkers, COSMO_MODEL)
+hyperparameters = walkers if args.n_walkers > 1 else walkers[0]
+
+def time_log_posterior(tdc_likelihood_list):
+    tdc_sampler.log_posterior(hyperparameters, COSMO_MODEL, tdc_likelihood_list)
+    tik = time.time()
+    for _ in range(args.n_repeats):
+        tdc_sampler.log_posterior(hyperparameters, COSMO_MODEL, tdc_likelihood_list)
+    return (time.time() - tik) / args.n_repeats
+
+tdc_sampler.data_vector_global = data_vector_list
+serial = time_log_posterior(likelihood_list)
+print('serial: %.4f seconds per call (%d lenses x %d samples)' % (
+    serial, 2 * args.num_lenses, args.num_fpd_samples))
+
+for num_threads in args.threads:
+    threaded = tdc_sampler.ThreadedLikelihood(likelihood_list, data_vector_list,
+        num_threads=num_threads)
+    tdc_sampler.data_vector_global = threaded.data_vector_list
+    elapsed = time_log_posterior(threaded)
+    threaded.close()
+    print('%d threads: %.4f seconds per call, speed-up x%.2f' % (
+        num_threads, elapsed, serial / elapsed))
@@ -0,0 +1,46 @@
+# Compares per-walker log_posterior calls against one batched call over all
+# walkers (the path used by fast_TDC(...,vectorize=True))
+import time
+import argparse
+import numpy as np
+from synthetic_data_vectors import make_synthetic_data_vector, make_likelihood
+import tdc_sampler
+
+parser = argparse.ArgumentParser(description="Benchmark vectorized walkers.")
+parser.add_argument('--num-lenses', type=int, default=50)
+parser.add_argument('--num-fpd-samples', type=int, default=1000)
+parser.add_argument('--n-walkers', type=int, default=60)
+parser.add_argument('--n-repeats', type=int, default=3)
+parser.add_argument('--use-astropy', action='store_true')
+args = parser.parse_args()
+
+COSMO_MODEL = 'w0waCDM_lambda_int_beta_ani'
+
+data_vector_list = [
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 3, 10, seed=0),
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, 1, seed=1),
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, seed=2)]
+likelihood_list = [make_likelihood(dv, COSMO_MODEL, use_suff_stats=True,
+    use_astropy=args.use_astropy) for dv in data_vector_list]
+tdc_sampler.data_vector_global = data_vector_list
+
+walkers = tdc_sampler.generate_initial_state(args.n_walkers, COSMO_MODEL)
+
+def per_walker():
+    return np.array([tdc_sampler.log_posterior(w, COSMO_MODEL, likelihood_list)
+        for w in walkers])
+
+def batched():
+    return tdc_sampler.log_posterior(walkers, COSMO_MODEL, likelihood_list)
+
+# warm-up (jit compilation)
+per_walker()
+batched()
+
+for name, fn in [('per-walker', per_walker), ('vectorized', batched)]:
+    tik = time.time()
+    for _ in range(args.n_repeats):
+        fn()
+    tok = time.time()
+    print('%s: %.4f seconds per ensemble evaluation (%d walkers)' % (
+        name, (tok - tik) / args.n_repeats, args.n_walkers))
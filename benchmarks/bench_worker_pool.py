@@ -0,0 +1,78 @@
+# Per-step IPC overhead of the process pool used by fast_TDC(use_multiprocess):
+#   before: Pool.map(partial(log_posterior, tdc_likelihood_list=...)), the
+#       likelihoods are pickled w/ every task & the data come from the
+#       fork-inherited data_vector_global
+#   after: LikelihoodWorkerPool, likelihoods & data vectors installed once
+#       per worker, only proposals & log probabilities are sent
+import time
+import pickle
+import argparse
+import multiprocessing
+from functools import partial
+import numpy as np
+from synthetic_data_vectors import make_synthetic_data_vector, make_likelihood
+import tdc_sampler
+from Utils.shared_data_vectors import share_data_vectors_posix
+
+parser = argparse.ArgumentParser(description="Benchmark worker pools.")
+parser.add_argument('--num-lenses', type=int, default=50)
+parser.add_argument('--num-fpd-samples', type=int, default=1000)
+parser.add_argument('--n-walkers', type=int, default=40)
+parser.add_argument('--n-steps', type=int, default=10)
+parser.add_argument('--processes', type=int, default=None)
+parser.add_argument('--group-likelihoods', action='store_true')
+args = parser.parse_args()
+
+COSMO_MODEL = 'w0waCDM_lambda_int_beta_ani'
+
+data_vector_list = [
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 3, 10, seed=0),
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, 1, seed=1),
+    make_synthetic_data_vector(args.num_lenses, args.num_fpd_samples, 1, seed=2)]
+likelihood_list = [make_likelihood(dv, COSMO_MODEL, use_suff_stats=True)
+    for dv in data_vector_list]
+tdc_sampler.data_vector_global = data_vector_list
+
+# emcee maps half of the walkers at a time
+walkers = tdc_sampler.generate_initial_state(args.n_walkers, COSMO_MODEL)
+half_steps = [walkers[:args.n_walkers // 2], walkers[args.n_walkers // 2:]]
+
+def run(pool_map, fn):
+    wall_times, worker_times = [], []
+    for _ in range(args.n_steps):
+        for proposals in half_steps:
+            tik = time.time()
+            results = pool_map(partial(tdc_sampler.timed_call, fn), proposals)
+            wall_times.append(time.time() - tik)
+            worker_times.append(sum(result[1] for result in results))
+    return np.asarray(wall_times), np.asarray(worker_times)
+
+def report(name, processes, fn, wall_times, worker_times):
+    overhead = wall_times - worker_times / processes
+    print('%s: %.4f s per step, %.4f s IPC overhead per step, %d bytes pickled per task' % (
+        name, 2 * np.mean(wall_times), 2 * np.mean(overhead),
+        len(pickle.dumps((fn, walkers[0])))))
+
+if __name__ == '__main__':
+    tdc_likelihood_list = likelihood_list
+    if args.group_likelihoods:
+        tdc_likelihood_list = tdc_sampler.LikelihoodGroup(likelihood_list)
+
+    before_fn = partial(tdc_sampler.log_posterior, cosmo_model=COSMO_MODEL,
+        tdc_likelihood_list=tdc_likelihood_list)
+    with multiprocessing.get_context('fork').Pool(args.processes) as pool:
+        processes = pool._processes
+        pool.map(before_fn, walkers)
+        report('before (Pool + partial)', processes, before_fn,
+            *run(pool.map, before_fn))
+
+    shm, layout = share_data_vectors_posix(data_vector_list)
+    with tdc_sampler.LikelihoodWorkerPool(likelihood_list, (shm.name, layout),
+            COSMO_MODEL, processes=args.processes,
+            group_likelihoods=args.group_likelihoods) as pool:
+        pool.map(tdc_sampler.worker_log_posterior, walkers)
+        report('after (LikelihoodWorkerPool)', pool.processes,
+            tdc_sampler.worker_log_posterior,
+            *run(pool._pool.map, tdc_sampler.worker_log_posterior))
+    shm.close()
+    shm.unlink()
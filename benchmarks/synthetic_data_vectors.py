@@ -0,0 +1,98 @@
+# Synthetic data vectors (same format as create_static_data_vectors()) so that
+# the likelihood can be benchmarked w/out the LSST forecast posteriors
+import numpy as np
+from scipy.stats import norm, uniform
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import tdc_sampler
+import Utils.tdc_utils as tdc_utils
+
+
+def make_synthetic_data_vector(num_lenses, num_fpd_samples=5000, dim_fpd=3,
+    num_kin_bins=None, td_meas_error_days=2., kin_meas_error_percent=0.05,
+    seed=None):
+    """
+    Args:
+        num_lenses (int)
+        num_fpd_samples (int)
+        dim_fpd (int): 1 for doubles, 3 for quads
+        num_kin_bins (int): Default=None (no kinematics). 1 for 4MOST, 3 for
+            MUSE, 10 for NIRSPEC
+        seed (int): random seed
+
+    Returns:
+        (dict) data vector w/ the keys of create_static_data_vectors()
+    """
+
+    rng = np.random.default_rng(seed)
+
+    z_lens = rng.uniform(0.3, 0.8, size=num_lenses)
+    z_src = z_lens + rng.uniform(0.5, 2., size=num_lenses)
+
+    # truth: H0=70, Omega_M=0.3
+    truth_cosmo = tdc_sampler.TDCLikelihood((num_lenses, num_fpd_samples, dim_fpd),
+        use_astropy=True).construct_proposed_cosmo([70., 0.3, 2., 0.1])
+    Ddt_truth = np.array(tdc_utils.ddt_from_redshifts(truth_cosmo, z_lens, z_src))
+
+    fpd_truth = rng.uniform(0.1, 1., size=(num_lenses, dim_fpd))
+    fpd_samples = fpd_truth[:, np.newaxis, :] * (1 + 0.05 *
+        rng.standard_normal((num_lenses, num_fpd_samples, dim_fpd)))
+    td_truth = tdc_utils.td_from_ddt_fpd(Ddt_truth[:, np.newaxis], fpd_truth)
+    td_measured = td_truth + td_meas_error_days * rng.standard_normal(td_truth.shape)
+    td_prec = np.repeat((np.eye(dim_fpd) / td_meas_error_days**2)[np.newaxis],
+        num_lenses, axis=0)
+
+    data_vector = {
+        'z_lens': z_lens,
+        'z_src': z_src,
+        'fpd_samples': fpd_samples,
+        'gamma_pred_samples': 2. + 0.1 * rng.standard_normal((num_lenses, num_fpd_samples)),
+        'kappa_ext_samples': 0.05 * rng.standard_normal((num_lenses, num_fpd_samples)),
+        'td_measured': td_measured,
+        'td_likelihood_prec': td_prec,
+        'td_likelihood_prefactors': tdc_sampler.gaussian_log_prefactors(td_prec),
+    }
+    data_vector['log_prob_gamma_samps_nu_int'] = norm.logpdf(
+        data_vector['gamma_pred_samples'], loc=2., scale=0.2)
+
+    if num_kin_bins is not None:
+        Ds_div_Dds_truth = np.array(tdc_utils.kin_distance_ratio(truth_cosmo, z_lens, z_src))
+        kin_truth = rng.uniform(150., 300., size=(num_lenses, num_kin_bins))
+        data_vector['kin_pred_samples'] = (kin_truth / np.sqrt(Ds_div_Dds_truth)[:, np.newaxis])[:, np.newaxis, :] * (
+            1 + 0.05 * rng.standard_normal((num_lenses, num_fpd_samples, num_kin_bins)))
+        sigma_v_measured = kin_truth * (1 + kin_meas_error_percent * rng.standard_normal(kin_truth.shape))
+        sigma_v_prec = np.zeros((num_lenses, num_kin_bins, num_kin_bins))
+        for j in range(num_kin_bins):
+            sigma_v_prec[:, j, j] = 1 / (kin_meas_error_percent * kin_truth[:, j])**2
+        data_vector['sigma_v_measured'] = sigma_v_measured
+        data_vector['sigma_v_likelihood_prec'] = sigma_v_prec
+        data_vector['sigma_v_likelihood_prefactors'] = tdc_sampler.gaussian_log_prefactors(sigma_v_prec)
+        data_vector['beta_ani_samples'] = 0.1 * rng.standard_normal((num_lenses, num_fpd_samples))
+        data_vector['log_prob_beta_ani_samps_nu_int'] = uniform.logpdf(
+            data_vector['beta_ani_samples'], loc=-0.5, scale=1.)
+
+    return data_vector
+
+
+def make_likelihood(data_vector, cosmo_model, use_suff_stats=False, **kwargs):
+    """TDCLikelihood or TDCKinLikelihood depending on the data vector keys
+
+    Args:
+        data_vector (dict): from make_synthetic_data_vector()
+        cosmo_model (string)
+        use_suff_stats (bool): if True, uses (and adds to data_vector) the
+            sufficient statistics for both the time-delay & kinematic terms
+        **kwargs: passed on to the likelihood constructor
+    """
+    if use_suff_stats:
+        tdc_sampler.add_td_sufficient_statistics(data_vector)
+        kwargs['use_td_suff_stats'] = True
+    if 'kin_pred_samples' in data_vector:
+        if use_suff_stats:
+            tdc_sampler.add_kin_sufficient_statistics(data_vector)
+            kwargs['use_kin_suff_stats'] = True
+        return tdc_sampler.TDCKinLikelihood(data_vector['fpd_samples'].shape,
+            data_vector['kin_pred_samples'].shape, cosmo_model=cosmo_model, **kwargs)
+    return tdc_sampler.TDCLikelihood(data_vector['fpd_samples'].shape,
+        cosmo_model=cosmo_model, **kwargs)
@@ -1,5 +1,8 @@
 import jax
 import jax.numpy as jnp
+from jax.scipy.special import log_ndtr, logsumexp, ndtr, ndtri
+from jax.scipy.stats import norm
+import Utils.tdc_utils as tdc_utils
 
 
 @jax.jit
@@ -7,14 +10,14 @@ def jax_fpd_samp_summation(log_likelihoood_per_samp):
     """
         log_likelihood_per_samp (n_lenses,n_fpd_samps)
     """
-    return jnp.mean(jnp.exp(log_likelihoood_per_samp),axis=1)
+    return jnp.mean(jnp.exp(log_likelihoood_per_samp),axis=-1)
 
 @jax.jit
 def jax_lenses_summation(individ_likelihood):
     """
         individ_likelihood (n_lenses)
     """
-    return jnp.sum(jnp.log(individ_likelihood))
+    return jnp.sum(jnp.log(individ_likelihood),axis=-1)
 
 @jax.jit
 def jax_td_log_likelihood_per_samp(td_pred_samples, td_measured,
@@ -22,9 +25,9 @@ def jax_td_log_likelihood_per_samp(td_pred_samples, td_measured,
     """
     Args:
         td_pred_samples (n_lenses,n_fpd_samps,n_td)
-        td_measured (n_lenses,n_fpd_samps,n_td)
-        td_likelihood_prec (n_lenses,n_fpd_samps,n_td,n_td)
-        td_likelihood_prefactor (n_lenses,n_fpd_samps)
+        td_measured (n_lenses,n_fpd_samps,n_td) or (n_lenses,1,n_td)
+        td_likelihood_prec (n_lenses,n_fpd_samps,n_td,n_td) or (n_lenses,1,n_td,n_td)
+        td_likelihood_prefactor (n_lenses,n_fpd_samps) or (n_lenses,1)
 
     Returns:
         td_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
@@ -34,11 +37,11 @@ def jax_td_log_likelihood_per_samp(td_pred_samples, td_measured,
     # add dimension s.t. x_minus_mu is 2D
     x_minus_mu = jnp.expand_dims(x_minus_mu, axis=-1)
     # matmul should condense the (# of time delays) dim.
-    exponent = -0.5 * jnp.matmul(jnp.transpose(x_minus_mu, axes=(0, 1, 3, 2)),
+    exponent = -0.5 * jnp.matmul(jnp.swapaxes(x_minus_mu, -1, -2),
                                     jnp.matmul(td_likelihood_prec, x_minus_mu))
 
     # reduce to two dimensions: (n_lenses,n_fpd_samples)
-    exponent = jnp.squeeze(exponent)
+    exponent = exponent[..., 0, 0]
 
     # log-likelihood
     return td_likelihood_prefactors + exponent
@@ -49,9 +52,9 @@ def jax_sigma_v_log_likelihood_per_samp(sigma_v_pred_samples ,sigma_v_measured,
     """
     Args:
         sigma_v_pred_samples (n_lenses,n_fpd_samps,num_kinbins)
-        sigma_v_measured (n_lenses,n_fpd_samps,num_kinbins)
-        sigma_v_likelihood_prec (n_lenses,n_fpd_samps,n_kinbins,n_kinbins)
-        sigma_v_likelihood_prefactor (n_lenses,n_fpd_samps)
+        sigma_v_measured (n_lenses,n_fpd_samps,num_kinbins) or (n_lenses,1,num_kinbins)
+        sigma_v_likelihood_prec (n_lenses,n_fpd_samps,n_kinbins,n_kinbins) or (n_lenses,1,n_kinbins,n_kinbins)
+        sigma_v_likelihood_prefactor (n_lenses,n_fpd_samps) or (n_lenses,1)
 
     Returns:
         sigma_v_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
@@ -61,11 +64,221 @@ def jax_sigma_v_log_likelihood_per_samp(sigma_v_pred_samples ,sigma_v_measured,
     # add dimension s.t. x_minus_mu is 2D
     x_minus_mu = jnp.expand_dims(x_minus_mu ,axis=-1)
     # matmul should condense the (# of time delays) dim.
-    exponent = -0.5 *jnp.matmul(jnp.transpose(x_minus_mu ,axes=(0 ,1 ,3 ,2)),
+    exponent = -0.5 *jnp.matmul(jnp.swapaxes(x_minus_mu ,-1 ,-2),
                                 jnp.matmul(sigma_v_likelihood_prec ,x_minus_mu))
 
     # reduce to two dimensions: (n_lenses,n_fpd_samples)
-    exponent = jnp.squeeze(exponent)
+    exponent = exponent[... ,0 ,0]
 
     # log-likelihood
-    return sigma_v_likelihood_prefactors + exponent
\ No newline at end of file
+    return sigma_v_likelihood_prefactors + exponent
+
+#########################################
+# End-to-end likelihood (JaxLikelihood)
+#########################################
+
+# The functions below are plain jnp code, traced into the single jitted
+#   function built by tdc_sampler.JaxLikelihood. The per-likelihood settings
+#   (cosmo_model, sufficient statistics, ...) are python values, so each
+#   combination compiles its own branch-free program.
+
+# hyperparameter index of (mu,sigma) of lambda_int, only for the models w/
+#   lambda_int (see tdc_sampler.TDCLikelihood.lambda_int_population())
+LAMBDA_INT_INDICES = {
+    'LCDM_lambda_int':(-4,-3),
+    'LCDM_lambda_int_beta_ani':(-6,-5),
+    'w0waCDM_lambda_int_beta_ani':(-6,-5)
+}
+
+def jax_flat_w0wacdm_params(hyperparameters, cosmo_model):
+    """
+    Args:
+        hyperparameters (n_params): single proposal (see 
+            tdc_sampler.TDCLikelihood.construct_proposed_cosmo())
+        cosmo_model (string)
+
+    Returns:
+        H0, Om0, w0, wa
+    """
+
+    if cosmo_model in ['w0waCDM', 'w0waCDM_lambda_int_beta_ani']:
+        return (hyperparameters[0], hyperparameters[1], hyperparameters[2],
+                hyperparameters[3])
+
+    return hyperparameters[0], hyperparameters[1], -1., 0.
+
+def jax_distances(H0, Om0, w0, wa, data):
+    """Flat w0waCDM distances w/ the Gauss-Legendre rule of 
+        tdc_utils.W0waCDMDistanceEngine (same nodes, no cache)
+
+    Args:
+        H0, Om0, w0, wa (float)
+        data (dict): w/ 'gl_weights', 'gl_one_plus_z_cubed', 
+            'gl_log_one_plus_z', 'gl_z_div_one_plus_z' (2*n_lenses,num_nodes)
+            for the lens & source redshifts
+
+    Returns:
+        Ddt (in Mpc), Ds_div_Dds: each (n_lenses)
+    """
+
+    # CPL dark energy: rho_de(z)/rho_de0 = (1+z)^(3(1+w0+wa)) exp(-3 wa z/(1+z))
+    de_scaling = jnp.exp(3.*(1.+w0+wa)*data['gl_log_one_plus_z'] -
+        3.*wa*data['gl_z_div_one_plus_z'])
+    inv_E = 1./jnp.sqrt(Om0*data['gl_one_plus_z_cubed'] + (1.-Om0)*de_scaling)
+    chi = jnp.sum(data['gl_weights']*inv_E, axis=-1)
+    num_lenses = chi.shape[0]//2
+    chi_lens, chi_src = chi[:num_lenses], chi[num_lenses:]
+    chi_ds = chi_src - chi_lens
+
+    hubble_distance = tdc_utils.C_kmpersec_astropy/H0
+
+    return hubble_distance*chi_lens*chi_src/chi_ds, chi_src/chi_ds
+
+def jax_positive_truncnorm_from_uniforms(loc, scale, uniforms):
+    """jnp version of tdc_sampler.positive_truncnorm_from_uniforms()
+
+    Args:
+        loc, scale (float)
+        uniforms (n_lenses,n_fpd_samples): base uniforms v in (0,1]
+
+    Returns:
+        lambda_int samples (n_lenses,n_fpd_samples)
+    """
+
+    z = loc/scale
+    q = uniforms*ndtr(z)
+    upper_tail = q < 0.5
+    p = jnp.where(upper_tail, q, ndtr(-z) + (1. - uniforms)*ndtr(z))
+
+    return jnp.maximum(loc + jnp.where(upper_tail, -scale, scale)*ndtri(p), 0.)
+
+def jax_quadratic_form_exponent(scaling, basis_key, prefix, data,
+                                use_suff_stats):
+    """
+    Args:
+        scaling (n_lenses,n_fpd_samples): prediction is scaling*data[basis_key]
+        basis_key (string): 'fpd_samples' or 'kin_pred_samples'
+        prefix (string): 'td' or 'sigma_v'
+        data (dict): device data vector
+        use_suff_stats (bool): If True, uses prefix+'_aPa', '_aPm', '_mPm'
+
+    Returns:
+        -0.5*(x-m)^T P (x-m) (n_lenses,n_fpd_samples)
+    """
+
+    if use_suff_stats:
+        return -0.5*(scaling*(scaling*data[prefix+'_aPa'] - 2.*data[prefix+'_aPm'])
+            + data[prefix+'_mPm'])
+
+    x_minus_mu = scaling[..., jnp.newaxis]*data[basis_key] - data[prefix+'_measured']
+    return -0.5*jnp.einsum('...i,...ij,...j->...', x_minus_mu,
+        data[prefix+'_likelihood_prec'], x_minus_mu)
+
+def jax_lambda_int_marginalized_td_log_likelihood(td_scaling, mu_lint,
+                                                  sigma_lint, data):
+    """jnp version of 
+        tdc_sampler.TDCLikelihood.td_log_likelihoods_lambda_int_marginalized()
+
+    Args:
+        td_scaling (n_lenses,n_fpd_samples): w/out lambda_int
+        mu_lint, sigma_lint (float)
+        data (dict): w/ the td sufficient statistics
+
+    Returns:
+        td_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
+    """
+
+    A = td_scaling**2*data['td_aPa']
+    B = td_scaling*data['td_aPm']
+    Q = A + 1./sigma_lint**2
+    m = (B + mu_lint/sigma_lint**2)/Q
+
+    return (data['td_likelihood_prefactors'] - 0.5*data['td_mPm']
+            + 0.5*(Q*m**2 - (mu_lint/sigma_lint)**2)
+            - 0.5*jnp.log(sigma_lint**2*Q)
+            + log_ndtr(m*jnp.sqrt(Q)) - log_ndtr(mu_lint/sigma_lint))
+
+def jax_log_mean_exp(log_terms):
+    """jnp port of tdc_sampler.log_mean_exp() (no early exit under jit)
+
+    Args:
+        log_terms (...,n_samples)
+
+    Returns:
+        log(mean(exp(log_terms))) over the last axis, w/ size:(...)
+    """
+
+    return logsumexp(log_terms, axis=-1) - jnp.log(log_terms.shape[-1])
+
+def jax_log_likelihood(hyperparameters, key, data, settings):
+    """Log likelihood of one likelihood object for a single proposal: 
+        distances, lambda_int/kappa_ext scaling, time-delay (& kinematic) 
+        terms, reweighting, log-mean-exp over fpd samples and sum over lenses
+
+    Args:
+        hyperparameters (n_params): single proposal
+        key (jax.random.PRNGKey): for fresh lambda_int draws (only used if
+            lambda_int is sampled w/out common random numbers)
+        data (dict): device data vector (see 
+            tdc_sampler.JaxLikelihood.device_data_vector())
+        settings (dict): python values, see 
+            tdc_sampler.JaxLikelihood.likelihood_settings()
+
+    Returns:
+        log_likelihood (float)
+    """
+
+    cosmo_model = settings['cosmo_model']
+    H0, Om0, w0, wa = jax_flat_w0wacdm_params(hyperparameters, cosmo_model)
+    Ddt, Ds_div_Dds = jax_distances(H0, Om0, w0, wa, data)
+
+    # (n_lenses,n_fpd_samples) scalings: td = s*fpd, sigma_v^2 = r^2*kin_pred^2
+    sample_shape = data['gamma_pred_samples'].shape
+    td_scaling = jnp.broadcast_to(tdc_utils.td_from_ddt_fpd(Ddt, 1.)[:, jnp.newaxis],
+        sample_shape)
+    lambda_scaling = jnp.broadcast_to(Ds_div_Dds[:, jnp.newaxis], sample_shape)
+    if 'kappa_ext_samples' in data:
+        td_scaling = td_scaling*(1. - data['kappa_ext_samples'])
+        lambda_scaling = lambda_scaling*(1. - data['kappa_ext_samples'])
+
+    if cosmo_model in LAMBDA_INT_INDICES:
+        mu_index, sigma_index = LAMBDA_INT_INDICES[cosmo_model]
+        mu_lint = hyperparameters[mu_index]
+        sigma_lint = hyperparameters[sigma_index]
+
+    if settings['marginalize_lambda_int']:
+        log_likelihoods = jax_lambda_int_marginalized_td_log_likelihood(
+            td_scaling, mu_lint, sigma_lint, data)
+    else:
+        if cosmo_model in LAMBDA_INT_INDICES:
+            if 'lambda_int_base_uniforms' in data:
+                uniforms = data['lambda_int_base_uniforms']
+            else:
+                # uniforms in (0,1]
+                uniforms = 1. - jax.random.uniform(key, sample_shape)
+            lambda_int_samples = jax_positive_truncnorm_from_uniforms(mu_lint,
+                sigma_lint, uniforms)
+            td_scaling = td_scaling*lambda_int_samples
+            lambda_scaling = lambda_scaling*lambda_int_samples
+        log_likelihoods = data['td_likelihood_prefactors'] + jax_quadratic_form_exponent(
+            td_scaling, 'fpd_samples', 'td', data, settings['use_td_suff_stats'])
+
+    if settings['use_kinematics']:
+        log_likelihoods = (log_likelihoods + data['sigma_v_likelihood_prefactors']
+            + jax_quadratic_form_exponent(jnp.sqrt(lambda_scaling),
+            'kin_pred_samples', 'sigma_v', data, settings['use_kin_suff_stats']))
+
+    # reweighting factor
+    # NOTE: hardcoding of hyperparameter order!! (-2 is mu, -1 is sigma)
+    if settings['use_gamma_info']:
+        log_likelihoods = (log_likelihoods + norm.logpdf(data['gamma_pred_samples'],
+            loc=hyperparameters[-2], scale=hyperparameters[-1])
+            - data['log_prob_gamma_samps_nu_int'])
+    if settings['use_kinematics'] and cosmo_model in ['LCDM_lambda_int_beta_ani',
+                                                      'w0waCDM_lambda_int_beta_ani']:
+        log_likelihoods = (log_likelihoods + norm.logpdf(data['beta_ani_samples'],
+            loc=hyperparameters[-4], scale=hyperparameters[-3])
+            - data['log_prob_beta_ani_samps_nu_int'])
+
+    # mean across fpd samples, then sum over all lenses
+    return jnp.sum(jax_log_mean_exp(log_likelihoods))
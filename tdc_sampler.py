@@ -1,5 +1,10 @@
+import os
 import time
 import sys
+import copy
+import pickle
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 import emcee
 import jax
@@ -7,13 +12,10 @@ import jax.numpy as jnp
 import jax_cosmo
 import numpy as np
 from astropy.cosmology import w0waCDM
+from scipy.special import log_ndtr, ndtr, ndtri
 from scipy.stats import norm, truncnorm, uniform
 import Utils.tdc_utils as tdc_utils
-
-USE_JAX = False
-
-if USE_JAX:
-    import tdc_jax_utils as jax_utils
+import tdc_jax_utils as jax_utils
 """
 cosmo_models available: 
     'LCDM': [H0,OmegaM,mu(gamma_lens),sigma(gamma_lens)]
@@ -24,6 +26,21 @@ cosmo_models available:
     'w0waCDM_lambda_int_beta_ani'
 """
 
+# length of the hyperparameter vector of each cosmo_model
+NUM_HYPERPARAMETERS = {
+    'LCDM':4,
+    'LCDM_lambda_int':6,
+    'LCDM_lambda_int_beta_ani':8,
+    'w0waCDM':6,
+    'w0waCDM_lambda_int_beta_ani':10
+}
+
+# precision policy: distances, the per-lens arrays, the sufficient statistics
+#   exponent and the sums over samples & lenses are always float64, 
+#   per-sample storage & arithmetic follow the likelihood's sample_dtype 
+#   (float32 halves the memory traffic, see set_sample_precision())
+ACCUMULATION_DTYPE = np.float64
+
 ###########################
 # TDC Likelihood Functions
 ###########################
@@ -35,7 +52,11 @@ cosmo_models available:
 class TDCLikelihood():
 
     def __init__(self, fpd_sample_shape, cosmo_model='LCDM',
-                 use_gamma_info=True, use_astropy=False):
+                 use_gamma_info=True, use_astropy=False,
+                 use_td_suff_stats=False, use_jax_cosmo=False,
+                 distance_emulator=None, distance_emulator_dir=None,
+                 lambda_int_seed=None, marginalize_lambda_int=False,
+                 use_workspace=True, sample_dtype=np.float64):
         """
         Keep track of quantities that remain constant throughout the inference
 
@@ -62,6 +83,41 @@ class TDCLikelihood():
             use_gamma_info (bool): If False, removes reweighting from likelihood
                 evaluation (any population level gamma params should just
                 return the prior then...)
+            use_td_suff_stats (bool): If True, the time-delay exponent is
+                rebuilt from per-sample sufficient statistics (a^T P a,
+                a^T P m, m^T P m) instead of the full quadratic form. These
+                must be in the data vector (see add_td_sufficient_statistics)
+            use_astropy (bool): If True, distances from astropy w0waCDM
+            use_jax_cosmo (bool): If True, distances from jax_cosmo. If both 
+                are False (default), distances come from the batched 
+                tdc_utils.W0waCDMDistanceEngine
+            distance_emulator (string): None (default), 'linear', or 'cubic'.
+                If set, distances are interpolated from a precomputed 
+                (Omega_M,w0,wa) table (tdc_utils.W0waCDMDistanceEmulator)
+            distance_emulator_dir (string): directory where emulator tables 
+                are stored & re-used across runs w/ the same redshifts. If 
+                None, the table is built in memory.
+            lambda_int_seed (int or [int]): If not None, lambda_int samples 
+                use common random numbers: base uniforms are drawn once per 
+                lens from this seed (the same in every process) and mapped to
+                the proposed (mu,sigma) w/ the truncated normal inverse CDF, 
+                so the likelihood is a deterministic function of the 
+                hyperparameters. If None (default), fresh truncnorm draws 
+                every call.
+            marginalize_lambda_int (bool): If True ('LCDM_lambda_int' only), 
+                the integral over the truncated normal lambda_int population
+                is done analytically for each fpd sample instead of drawing 
+                lambda_int samples (uses the td sufficient statistics, see
+                td_log_likelihoods_lambda_int_marginalized())
+            use_workspace (bool): If True (default), the per-sample 
+                arithmetic is done in place in scratch arrays owned by this 
+                object (see LikelihoodWorkspace), sized for the largest 
+                batch of proposals & re-used by every later call
+            sample_dtype (np.dtype): dtype of the per-sample arithmetic in 
+                the workspace (use_workspace only), i.e. np.float32 w/ data 
+                vectors converted by set_sample_precision(). Distances, the 
+                sufficient statistics exponent & the sums over samples and 
+                lenses stay float64 (ACCUMULATION_DTYPE).
         """
 
         # no processing needed (np.squeeze ensures any dimensions of size 1
@@ -74,58 +130,364 @@ class TDCLikelihood():
         self.cosmo_model = cosmo_model
         self.use_gamma_info = use_gamma_info
         self.use_astropy = use_astropy
+        self.use_td_suff_stats = use_td_suff_stats
+        self.use_jax_cosmo = use_jax_cosmo
+        if distance_emulator is not None and (use_astropy or use_jax_cosmo):
+            raise ValueError("distance_emulator replaces the distance "+
+                             "engine, not compatible w/ use_astropy or use_jax_cosmo")
+        self.distance_emulator = distance_emulator
+        self.distance_emulator_dir = distance_emulator_dir
+        # built from the data vector redshifts on first use, rebuilt if 
+        #   they change (see distance_engine())
+        self._distance_engine = None
+        self._distance_engine_index = None
         # make sure the dims are right
         self.num_lenses, self.num_fpd_samples, self.dim_fpd = fpd_sample_shape
+        self.lambda_int_seed = lambda_int_seed
+        if marginalize_lambda_int and cosmo_model != 'LCDM_lambda_int':
+            raise ValueError("marginalize_lambda_int requires cosmo_model="+
+                             "'LCDM_lambda_int'")
+        self.marginalize_lambda_int = marginalize_lambda_int
+        # index of the first lens (non-zero for a shard, see shard_likelihood())
+        self.lens_offset = 0
+        # drawn on first use
+        self._lambda_int_base_uniforms = None
+        # copied to the device on first use, again if the data vector 
+        #   changes (see jax_data_vector())
+        self._jax_data_vector = None
+        self._jax_data_vector_source = None
+        self.use_workspace = use_workspace
+        self.sample_dtype = np.dtype(sample_dtype)
+        # allocated on first use (see workspace())
+        self._workspace = None
+
+    def __getstate__(self):
+        # base uniforms are re-drawn (identically) in worker processes, 
+        #   device arrays & scratch arrays are allocated again
+        state = self.__dict__.copy()
+        state['_lambda_int_base_uniforms'] = None
+        state['_jax_data_vector'] = None
+        state['_jax_data_vector_source'] = None
+        state['_workspace'] = None
+        return state
+
+    def lambda_int_base_uniforms(self):
+        """
+        Returns:
+            np.array, shape=(num_lenses,num_fpd_samples): uniforms in (0,1] 
+                for lens_offset,...,lens_offset+num_lenses-1, each lens w/ its
+                own stream seeded by (lambda_int_seed, lens index)
+        """
+
+        if self._lambda_int_base_uniforms is None:
+            seed = list(np.atleast_1d(self.lambda_int_seed))
+            self._lambda_int_base_uniforms = np.stack([
+                1. - np.random.default_rng(seed + [self.lens_offset + j]).random(
+                    self.num_fpd_samples)
+                for j in range(self.num_lenses)])
+
+        return self._lambda_int_base_uniforms
+
+    def jax_data_vector(self, index_likelihood_list):
+        """
+        Returns:
+            (dict): this likelihood's data vector as device arrays (see 
+                JaxLikelihood.device_data_vector()), kept on this object & 
+                copied again if index_likelihood_list, the data vector or its
+                redshifts change
+        """
+
+        data_vector = data_vector_global[index_likelihood_list]
+        source = (index_likelihood_list, data_vector,
+                  np.array(data_vector['z_lens'], dtype=float),
+                  np.array(data_vector['z_src'], dtype=float))
+        if (self._jax_data_vector is None or
+                self._jax_data_vector_source[0] != source[0] or
+                self._jax_data_vector_source[1] is not source[1] or
+                not np.array_equal(self._jax_data_vector_source[2], source[2]) or
+                not np.array_equal(self._jax_data_vector_source[3], source[3])):
+            self._jax_data_vector = JaxLikelihood.device_data_vector(self,
+                data_vector)
+            self._jax_data_vector_source = source
+
+        return self._jax_data_vector
+
+    def workspace_buffer_dims(self):
+        """
+        Returns:
+            (dict): trailing dims of each scratch array (after the 
+                (n_lenses,n_fpd_samples) sample dims), see LikelihoodWorkspace
+        """
+
+        buffer_dims = {'log_likelihoods':(), 'exponent':(), 'scaling':(),
+                       'tmp':()}
+        if not self.use_td_suff_stats:
+            buffer_dims['td_pred'] = (self.dim_fpd,)
+            buffer_dims['td_prec_x'] = (self.dim_fpd, 1)
+
+        return buffer_dims
+
+    def workspace_buffer_dtypes(self):
+        """
+        Returns:
+            (dict): scratch arrays kept in ACCUMULATION_DTYPE whatever the
+                sample_dtype, see LikelihoodWorkspace (the sufficient 
+                statistics exponent s^2 aPa - 2 s aPm + mPm cancels in 
+                float32)
+        """
+
+        if self.use_td_suff_stats:
+            return {'exponent':ACCUMULATION_DTYPE, 'tmp':ACCUMULATION_DTYPE}
+
+        return {}
+
+    def workspace(self):
+        """
+        Returns:
+            LikelihoodWorkspace: scratch arrays of this object, allocated on 
+                first use
+        """
+
+        if self._workspace is None:
+            self._workspace = LikelihoodWorkspace(
+                (self.num_lenses, self.num_fpd_samples),
+                self.workspace_buffer_dims(), dtype=self.sample_dtype,
+                buffer_dtypes=self.workspace_buffer_dtypes())
+
+        return self._workspace
 
     # compute predicted time delays from predicted fermat potential differences
     # requires an assumed cosmology (from hyperparameters) and redshifts
 
 
-    def td_pred_from_fpd_pred(self, proposed_cosmo, index_likelihood_list, lambda_int_samples=None, ):
+    def distance_engine(self, index_likelihood_list):
+        """
+        Returns:
+            tdc_utils.W0waCDMDistanceEngine (or W0waCDMDistanceEmulator) for 
+                this likelihood's redshifts, kept on this object & rebuilt if 
+                index_likelihood_list or its redshifts change
+        """
+
+        z_lens = np.asarray(data_vector_global[index_likelihood_list]['z_lens'],
+                            dtype=float)
+        z_src = np.asarray(data_vector_global[index_likelihood_list]['z_src'],
+                           dtype=float)
+        if (self._distance_engine is None or
+                self._distance_engine_index != index_likelihood_list or
+                not np.array_equal(self._distance_engine.z_lens, z_lens) or
+                not np.array_equal(self._distance_engine.z_src, z_src)):
+            self._distance_engine = self.build_distance_engine(z_lens, z_src)
+            self._distance_engine_index = index_likelihood_list
+
+        return self._distance_engine
+
+    def build_distance_engine(self, z_lens, z_src):
+        """
+        Args:
+            z_lens ([float]): lens redshifts
+            z_src ([float]): source redshifts
+
+        Returns:
+            tdc_utils.W0waCDMDistanceEngine (or W0waCDMDistanceEmulator, 
+                following this likelihood's settings)
+        """
+
+        if self.distance_emulator is None:
+            return tdc_utils.W0waCDMDistanceEngine(z_lens, z_src)
+        elif self.distance_emulator_dir is None:
+            return tdc_utils.W0waCDMDistanceEmulator(
+                z_lens, z_src, interpolation=self.distance_emulator)
+
+        return tdc_utils.W0waCDMDistanceEmulator.load_or_build(
+            z_lens, z_src, self.distance_emulator_dir,
+            interpolation=self.distance_emulator)
+
+    def ddt_from_proposed_cosmo(self, proposed_cosmo, index_likelihood_list,
+            distances=None):
         """
         Args:
-            proposed_cosmo (default: jax_cosmo.Cosmology): built by
+            proposed_cosmo (default: tdc_utils.FlatW0waCDM): built by
                 construct_proposed_cosmo() (see below)
-            lambda_int_samples (): shape=(num_lenses,num_fpd_samples)
+            distances (dict): precomputed bundle from 
+                distances_from_proposed_cosmo(). Default=None (computed here)
 
         Returns:
-            td_pred_samples (size:(n_lenses,n_samples,3))
+            Ddt_computed (np.array, size:(n_lenses)): time delay distances in Mpc
+                (size:(n_walkers,n_lenses) for a batch of proposals)
         """
 
-        if self.use_astropy:
+        if distances is not None:
+            return np.array(distances['Ddt'])
+
+        if self.use_astropy and isinstance(proposed_cosmo, list):
+            # batch of proposals (one astropy object per walker)
+            Ddt_computed = np.stack([np.array(tdc_utils.ddt_from_redshifts(cosmo,
+                                                                           data_vector_global[index_likelihood_list]['z_lens'],
+                                                                           data_vector_global[index_likelihood_list]['z_src']))
+                                     for cosmo in proposed_cosmo])
+        elif self.use_astropy:
             Ddt_computed = tdc_utils.ddt_from_redshifts(proposed_cosmo,
                                                         data_vector_global[index_likelihood_list]['z_lens'],
                                                         data_vector_global[index_likelihood_list]['z_src'])
-        else:
+        elif self.use_jax_cosmo and np.ndim(proposed_cosmo.h) > 0:
+            # batch of proposals, all distances in one vectorized call
+            Ddt_computed = tdc_utils.jax_ddt_from_redshifts_batched(proposed_cosmo,
+                                                                    data_vector_global[index_likelihood_list]['z_lens'],
+                                                                    data_vector_global[index_likelihood_list]['z_src'])
+        elif self.use_jax_cosmo:
             Ddt_computed = tdc_utils.jax_ddt_from_redshifts(proposed_cosmo,
                                                             data_vector_global[index_likelihood_list]['z_lens'],
                                                             data_vector_global[index_likelihood_list]['z_src'])
+        else:
+            Ddt_computed = self.distance_engine(index_likelihood_list).distances(
+                proposed_cosmo)['Ddt']
+
+        return np.array(Ddt_computed)
+
+    def distances_from_proposed_cosmo(self, proposed_cosmo, index_likelihood_list):
+        """
+        All distances from a single comoving distance evaluation per proposal,
+            to be shared by the time-delay & kinematic terms
+
+        Args:
+            proposed_cosmo (default: tdc_utils.FlatW0waCDM): built by
+                construct_proposed_cosmo() (see below)
+
+        Returns:
+            (dict) w/ 'D_d','D_s','D_ds','Ddt' (in Mpc) and 'Ds_div_Dds', each
+                w/ size:(n_lenses) (or (n_walkers,n_lenses) for a batch)
+        """
+
+        return self.distances_from_redshifts(proposed_cosmo,
+            data_vector_global[index_likelihood_list]['z_lens'],
+            data_vector_global[index_likelihood_list]['z_src'],
+            distance_engine=self.distance_engine(index_likelihood_list)
+                if self.use_distance_engine() else None)
+
+    def use_distance_engine(self):
+        """
+        Returns:
+            (bool) True if distances come from tdc_utils.W0waCDMDistanceEngine
+        """
+        return not (self.use_astropy or self.use_jax_cosmo)
+
+    def warm_up_jax(self, hyperparameters, z_lens, z_src):
+        """Ahead-of-time compilation of the jitted jax_cosmo distance 
+            functions (only if use_jax_cosmo) for these redshifts & proposals
+            shaped like hyperparameters, so the first likelihood call does 
+            not trace or compile
 
-        Ddt_computed = np.array(Ddt_computed)
-        # add batch dimensions for Ddt computed...
-        Ddt_repeated = np.repeat(Ddt_computed[:, np.newaxis],
-                                 self.num_fpd_samples, axis=1)
-        Ddt_repeated = np.repeat(Ddt_repeated[:, :, np.newaxis],
-                                 self.dim_fpd, axis=2)
-        # compute predicted time delays (this function should work w/ arrays)
-        td_pred = tdc_utils.td_from_ddt_fpd(Ddt_repeated, data_vector_global[index_likelihood_list]['fpd_samples'])
+        Args:
+            hyperparameters (np.array): (n_params) or (n_walkers,n_params),
+                only the shape is used
+            z_lens, z_src ([float]): as passed to the distance functions
+
+        Returns:
+            int: # of compiled programs
+        """
+
+        if not self.use_jax_cosmo:
+            return 0
+
+        proposed_cosmo = self.construct_proposed_cosmo(hyperparameters)
+        if np.ndim(proposed_cosmo.h) > 0:
+            jitted_fns = [tdc_utils.jax_ddt_from_redshifts_batched,
+                          tdc_utils.jax_kin_distance_ratio_batched,
+                          tdc_utils.jax_distance_bundle_batched]
+        else:
+            jitted_fns = [tdc_utils.jax_ddt_from_redshifts,
+                          tdc_utils.jax_kin_distance_ratio,
+                          tdc_utils.jax_distance_bundle]
+        for jitted_fn in jitted_fns:
+            tdc_utils.aot_compile(jitted_fn, proposed_cosmo, z_lens, z_src)
+
+        return len(jitted_fns)
+
+    def distances_from_redshifts(self, proposed_cosmo, z_lens, z_src,
+                                 distance_engine=None):
+        """
+        Args:
+            proposed_cosmo (default: tdc_utils.FlatW0waCDM): built by
+                construct_proposed_cosmo() (see below)
+            z_lens ([float]): lens redshifts
+            z_src ([float]): source redshifts
+            distance_engine (tdc_utils.W0waCDMDistanceEngine): engine for 
+                these redshifts (only used if use_distance_engine())
+
+        Returns:
+            (dict): see distances_from_proposed_cosmo()
+        """
+
+        if self.use_astropy and isinstance(proposed_cosmo, list):
+            # batch of proposals (one astropy object per walker)
+            bundles = [tdc_utils.distance_bundle(cosmo, z_lens, z_src)
+                       for cosmo in proposed_cosmo]
+            distances = {key: np.stack([bundle[key] for bundle in bundles])
+                         for key in bundles[0].keys()}
+        elif self.use_astropy:
+            distances = tdc_utils.distance_bundle(proposed_cosmo, z_lens, z_src)
+        elif self.use_jax_cosmo and np.ndim(proposed_cosmo.h) > 0:
+            distances = tdc_utils.jax_distance_bundle_batched(proposed_cosmo,
+                                                              z_lens, z_src)
+        elif self.use_jax_cosmo:
+            distances = tdc_utils.jax_distance_bundle(proposed_cosmo, z_lens, z_src)
+        else:
+            distances = distance_engine.distances(proposed_cosmo)
+
+        return {key: np.asarray(value) for key, value in distances.items()}
+
+    def td_pred_from_fpd_pred(self, proposed_cosmo, index_likelihood_list, lambda_int_samples=None, distances=None):
+        """
+        Args:
+            proposed_cosmo (default: tdc_utils.FlatW0waCDM): built by
+                construct_proposed_cosmo() (see below)
+            lambda_int_samples (): shape=(num_lenses,num_fpd_samples)
+            distances (dict): see ddt_from_proposed_cosmo()
+
+        Returns:
+            td_pred_samples (size:(n_lenses,n_samples,3))
+        """
 
+        Ddt_computed = self.ddt_from_proposed_cosmo(proposed_cosmo,
+                                                    index_likelihood_list,
+                                                    distances)
         # Account for mass sheets:
         #   td = lambda * td
         #   lambda = (1-kappa_ext)*lambda_int
+        # td is linear in fpd: one (n_lenses,n_samples,1) multiplier, the 
+        #   same for every image
+        td_scaling = mass_sheet_scaling(
+            tdc_utils.td_from_ddt_fpd(Ddt_computed, 1.), lambda_int_samples,
+            data_vector_global[index_likelihood_list]['kappa_ext_samples'])
+
+        return (data_vector_global[index_likelihood_list]['fpd_samples'] *
+                td_scaling[..., np.newaxis])
+
+    def td_scaling_from_fpd_pred(self, proposed_cosmo, index_likelihood_list,
+                                 lambda_int_samples=None, distances=None):
+        """Per-sample scalar s s.t. td_pred_samples = s * fpd_samples
+
+        Args:
+            proposed_cosmo (default: tdc_utils.FlatW0waCDM): built by
+                construct_proposed_cosmo() (see below)
+            lambda_int_samples (): shape=(num_lenses,num_fpd_samples)
+            distances (dict): see ddt_from_proposed_cosmo()
+
+        Returns:
+            td_scaling (size:(n_lenses,n_samples))
+        """
 
-        # Linear scaling if lambda_int is present
-        if lambda_int_samples is not None:
-            lambda_int_repeated = np.repeat(lambda_int_samples[:, :, np.newaxis],
-                                            self.dim_fpd, axis=2)
-            td_pred *= lambda_int_repeated
-        # Scaling if kappa_ext is present...
-        if data_vector_global[index_likelihood_list]['kappa_ext_samples'] is not None:
-            kappa_ext_repeated = np.repeat(data_vector_global[index_likelihood_list]['kappa_ext_samples'][:, :, np.newaxis],
-                                           self.dim_fpd, axis=2)
-            td_pred *= (1 - kappa_ext_repeated)
+        Ddt_computed = self.ddt_from_proposed_cosmo(proposed_cosmo,
+                                                    index_likelihood_list,
+                                                    distances)
+        # td is linear in fpd, so td_from_ddt_fpd(Ddt,1.) is the unit scaling
+        #   (mass sheets: see td_pred_from_fpd_pred())
+        td_scaling = mass_sheet_scaling(
+            tdc_utils.td_from_ddt_fpd(Ddt_computed, 1.), lambda_int_samples,
+            data_vector_global[index_likelihood_list]['kappa_ext_samples'])
 
-        return td_pred
+        return np.broadcast_to(td_scaling, np.shape(Ddt_computed) +
+                               (self.num_fpd_samples,))
 
     def td_log_likelihood_per_samp(self, td_pred_samples, index_likelihood_list):
         """
@@ -136,19 +498,159 @@ class TDCLikelihood():
             td_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
         """
 
-        x_minus_mu = (td_pred_samples - data_vector_global[index_likelihood_list]['td_measured'])
+        x_minus_mu = (td_pred_samples - per_sample_measurement(
+            data_vector_global[index_likelihood_list], 'td_measured'))
         # add dimension s.t. x_minus_mu is 2D
         x_minus_mu = np.expand_dims(x_minus_mu, axis=-1)
         # matmul should condense the (# of time delays) dim.
-        exponent = -0.5 * np.matmul(np.transpose(x_minus_mu, axes=(0, 1, 3, 2)),
-                                    np.matmul(data_vector_global[index_likelihood_list]['td_likelihood_prec'], x_minus_mu))
+        exponent = -0.5 * np.matmul(np.swapaxes(x_minus_mu, -1, -2),
+                                    np.matmul(per_sample_measurement(
+                                        data_vector_global[index_likelihood_list],
+                                        'td_likelihood_prec'), x_minus_mu))
 
         # reduce to two dimensions: (n_lenses,n_fpd_samples)
-        exponent = np.squeeze(exponent)
+        exponent = exponent[..., 0, 0]
+
+        # log-likelihood
+        return per_sample_measurement(data_vector_global[index_likelihood_list],
+                                      'td_likelihood_prefactors') + exponent
+
+    def td_log_likelihood_per_samp_suff_stats(self, td_scaling, index_likelihood_list):
+        """
+        Same as td_log_likelihood_per_samp(), but using td_pred = s*a with
+            (x-m)^T P (x-m) = s^2 a^T P a - 2 s a^T P m + m^T P m
+
+        Args:
+            td_scaling (n_lenses,n_fpd_samps): from td_scaling_from_fpd_pred()
+
+        Returns:
+            td_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
+        """
+
+        exponent = -0.5 * sufficient_statistics_exponent(td_scaling,
+            data_vector_global[index_likelihood_list]['td_aPa'],
+            data_vector_global[index_likelihood_list]['td_aPm'],
+            per_sample_measurement(data_vector_global[index_likelihood_list], 'td_mPm'))
+
+        # log-likelihood
+        return per_sample_measurement(data_vector_global[index_likelihood_list],
+                                      'td_likelihood_prefactors') + exponent
+
+    def td_log_likelihoods_from_proposal(self, proposed_cosmo, index_likelihood_list,
+                                         lambda_int_samples=None, distances=None):
+        """
+        Args:
+            proposed_cosmo (default: tdc_utils.FlatW0waCDM): built by
+                construct_proposed_cosmo() (see below)
+            lambda_int_samples (): shape=(num_lenses,num_fpd_samples)
+            distances (dict): see ddt_from_proposed_cosmo()
+
+        Returns:
+            td_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
+        """
+
+        if self.use_td_suff_stats:
+            td_scaling = self.td_scaling_from_fpd_pred(
+                proposed_cosmo, index_likelihood_list, lambda_int_samples,
+                distances)
+            return self.td_log_likelihood_per_samp_suff_stats(
+                td_scaling, index_likelihood_list)
+
+        # td_pred_samples from fpd_pred_samples
+        td_pred_samples = self.td_pred_from_fpd_pred(
+            proposed_cosmo, index_likelihood_list, lambda_int_samples,
+            distances)
+
+        return self.td_log_likelihood_per_samp(
+            td_pred_samples, index_likelihood_list)
+
+    def td_log_likelihoods_in_workspace(self, buffers, proposed_cosmo,
+            index_likelihood_list, lambda_int_samples=None, distances=None):
+        """Same as td_log_likelihoods_from_proposal(), w/ all per-sample 
+            arithmetic done in place in the workspace buffers
+
+        Args:
+            buffers (dict): from LikelihoodWorkspace.buffers()
+            proposed_cosmo, lambda_int_samples, distances: see 
+                td_log_likelihoods_from_proposal()
+
+        Returns:
+            td_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps): 
+                buffers['log_likelihoods'], overwritten by the next call
+        """
+
+        data_vector_dict = data_vector_global[index_likelihood_list]
+        Ddt_computed = self.ddt_from_proposed_cosmo(proposed_cosmo,
+                                                    index_likelihood_list,
+                                                    distances)
+        # td_pred = s * fpd_samples (see td_scaling_from_fpd_pred())
+        td_scaling = mass_sheet_scaling_in_place(buffers['scaling'],
+            tdc_utils.td_from_ddt_fpd(Ddt_computed, 1.), lambda_int_samples,
+            data_vector_dict['kappa_ext_samples'], buffers['tmp'])
+
+        exponent = buffers['exponent']
+        if self.use_td_suff_stats:
+            sufficient_statistics_exponent_in_place(exponent, td_scaling,
+                data_vector_dict['td_aPa'], data_vector_dict['td_aPm'],
+                per_sample_measurement(data_vector_dict, 'td_mPm'),
+                buffers['tmp'])
+        else:
+            x_minus_mu = np.multiply(data_vector_dict['fpd_samples'],
+                td_scaling[..., np.newaxis], out=buffers['td_pred'])
+            np.subtract(x_minus_mu, per_sample_measurement(data_vector_dict,
+                'td_measured', x_minus_mu.dtype), out=x_minus_mu)
+            quadratic_form_in_place(exponent, x_minus_mu,
+                per_sample_measurement(data_vector_dict, 'td_likelihood_prec',
+                                       x_minus_mu.dtype),
+                buffers['td_prec_x'])
 
         # log-likelihood
-        return data_vector_global[index_likelihood_list]['td_likelihood_prefactors'] + exponent
+        log_likelihoods = np.multiply(exponent, -0.5,
+                                      out=buffers['log_likelihoods'])
+        log_likelihoods += per_sample_measurement(data_vector_dict,
+            'td_likelihood_prefactors', log_likelihoods.dtype)
+
+        return log_likelihoods
+
+    def td_log_likelihoods_lambda_int_marginalized(self, proposed_cosmo,
+            index_likelihood_list, hyperparameters, distances=None):
+        """Time-delay log likelihood per fpd sample, integrated over 
+            lambda_int ~ N(mu,sigma) truncated to [0,inf). W/ td_pred = 
+            lambda*s*a, A = s^2 a^T P a, B = s a^T P m, Q = A + 1/sigma^2, 
+            m = (B + mu/sigma^2)/Q:
+
+            log L = prefactor - 0.5*m^T P m + 0.5*(Q*m^2 - mu^2/sigma^2)
+                - 0.5*log(sigma^2*Q) + log ndtr(m*sqrt(Q)) - log ndtr(mu/sigma)
+
+        Args:
+            proposed_cosmo (default: tdc_utils.FlatW0waCDM): built by
+                construct_proposed_cosmo() (see below)
+            hyperparameters (): see process_hyperparam_proposal()
+            distances (dict): see ddt_from_proposed_cosmo()
+
+        Returns:
+            td_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
+        """
 
+        mu_lint, sigma_lint = self.lambda_int_population(np.asarray(hyperparameters))
+        if np.ndim(mu_lint) > 0:
+            mu_lint = mu_lint[:, np.newaxis, np.newaxis]
+            sigma_lint = sigma_lint[:, np.newaxis, np.newaxis]
+        # scaling w/out lambda_int
+        td_scaling = self.td_scaling_from_fpd_pred(proposed_cosmo,
+            index_likelihood_list, None, distances)
+
+        data_vector_dict = data_vector_global[index_likelihood_list]
+        A = td_scaling**2 * data_vector_dict['td_aPa']
+        B = td_scaling * data_vector_dict['td_aPm']
+        Q = A + 1. / sigma_lint**2
+        m = (B + mu_lint / sigma_lint**2) / Q
+
+        return (per_sample_measurement(data_vector_dict, 'td_likelihood_prefactors')
+                - 0.5 * per_sample_measurement(data_vector_dict, 'td_mPm')
+                + 0.5 * (Q * m**2 - (mu_lint / sigma_lint)**2)
+                - 0.5 * np.log(sigma_lint**2 * Q)
+                + log_ndtr(m * np.sqrt(Q)) - log_ndtr(mu_lint / sigma_lint))
 
     def construct_proposed_cosmo(self, hyperparameters):
         """
@@ -160,388 +662,2743 @@ class TDCLikelihood():
                 - w0waCDM order: [H0,Omega_M,w0,wa,mu_gamma,sigma_gamma]
         """
         # construct cosmology object from hyperparameters
-        h0_input = hyperparameters[0]
+        # (a leading (n_walkers) axis is allowed for a batch of proposals)
+        hyperparameters = np.asarray(hyperparameters)
+        h0_input = hyperparameters[..., 0]
         # NOTE: baryonic fraction hardcoded to 0.05
-        omega_m_input = hyperparameters[1]
-        omega_c_input = hyperparameters[1] - 0.05  # CDM fraction
+        omega_m_input = hyperparameters[..., 1]
+        omega_c_input = hyperparameters[..., 1] - 0.05  # CDM fraction
         omega_de_input = 1. - omega_m_input
         if self.cosmo_model in ['LCDM', 'LCDM_lambda_int',
                                 'LCDM_lambda_int_beta_ani']:
             w0_input = -1.
             wa_input = 0.
         elif self.cosmo_model in ['w0waCDM', 'w0waCDM_lambda_int_beta_ani']:
-            w0_input = hyperparameters[2]
-            wa_input = hyperparameters[3]
+            w0_input = hyperparameters[..., 2]
+            wa_input = hyperparameters[..., 3]
+
+        if self.use_astropy and hyperparameters.ndim > 1:
+            # batch of proposals: one astropy cosmology object per walker
+            w0_input = np.broadcast_to(w0_input, h0_input.shape)
+            wa_input = np.broadcast_to(wa_input, h0_input.shape)
+            return [w0waCDM(H0=h0_input[w], Om0=omega_m_input[w],
+                            Ode0=omega_de_input[w], w0=w0_input[w], wa=wa_input[w])
+                    for w in range(len(h0_input))]
+
+        elif self.use_astropy:
+            # instantiate astropy cosmology object
+            astropy_cosmo = w0waCDM(H0=h0_input,
+                                    Om0=omega_m_input, Ode0=omega_de_input,
+                                    w0=w0_input, wa=wa_input)
+
+            return astropy_cosmo
+
+        elif not self.use_jax_cosmo:
+            # lightweight parameter container for W0waCDMDistanceEngine
+            #   (batches are handled by broadcasting)
+            return tdc_utils.FlatW0waCDM(H0=h0_input, Om0=omega_m_input,
+                                         w0=w0_input, wa=wa_input)
+
+        else:
+            # every parameter shares the batch shape (needed for vmap)
+            batch_shape = np.shape(h0_input)
+            # float64, like every distance (see ACCUMULATION_DTYPE)
+            def as_param(value):
+                return jnp.broadcast_to(jnp.asarray(value, dtype=jnp.float64),
+                                        batch_shape)
+            # NOTE: baryonic fraction hardcoded to 0.05
+            my_jax_cosmo = jax_cosmo.Cosmology(h=as_param(h0_input / 100),
+                                               Omega_c=as_param(omega_c_input),  # "cold dark matter fraction"
+                                               Omega_b=as_param(0.05),  # "baryonic fraction"
+                                               Omega_k=as_param(0.),
+                                               w0=as_param(w0_input),
+                                               wa=as_param(wa_input), sigma8=as_param(0.8), n_s=as_param(0.96))
+
+            return my_jax_cosmo
+
+    def process_hyperparam_proposal(self, hyperparameters):
+        """
+        Args:
+            hyperparameters ():
+                - LCDM order: [H0,Omega_M,mu_gamma,sigma_gamma]
+                - LCDM_lambda_int order: [H0,Omega_M,mu_lambda_int,
+                    sigma_lambda_int,mu_gamma,sigma_gamma]
+                - w0waCDM order: [H0,Omega_M,w0,wa,mu_gamma,sigma_gamma]
+                A batch of proposals has shape (n_walkers,n_params)
+        Returns:
+            proposed_cosmo (default=tdc_utils.FlatW0waCDM)
+            lambda_int_samples (): Set to None if no lambda_int in hypermodel.
+                If in hypermodel, shape=(num_lenses,num_fpd_samples)
+                (or (n_walkers,num_lenses,num_fpd_samples) for a batch)
+        """
+
+        return (self.construct_proposed_cosmo(hyperparameters),
+                self.lambda_int_samples_from_proposal(hyperparameters))
+
+    def lambda_int_population(self, hyperparameters):
+        """
+        Args:
+            hyperparameters (): see process_hyperparam_proposal()
+
+        Returns:
+            mu_lint, sigma_lint: population mean & std. dev. of lambda_int 
+                (float, or (n_walkers) for a batch). None, None if no 
+                lambda_int in hypermodel.
+        """
+
+        if self.cosmo_model == 'LCDM_lambda_int':
+            # NOTE: hardcoding of hyperparameter order!! (-4 is mu, -3 is sigma)
+            return hyperparameters[..., -4], hyperparameters[..., -3]
+        elif self.cosmo_model in ['LCDM_lambda_int_beta_ani',
+                                  'w0waCDM_lambda_int_beta_ani']:
+            # NOTE: hardcoding of hyperparameter order!! (-6 is mu, -5 is sigma)
+            # truncating to avoid values below 0 (unphysical)
+            return hyperparameters[..., -6], hyperparameters[..., -5]
+
+        return None, None
+
+    def lambda_int_samples_from_proposal(self, hyperparameters):
+        """
+        Args:
+            hyperparameters (): see process_hyperparam_proposal()
+
+        Returns:
+            lambda_int_samples (): Set to None if no lambda_int in hypermodel.
+                If in hypermodel, shape=(num_lenses,num_fpd_samples)
+                (or (n_walkers,num_lenses,num_fpd_samples) for a batch)
+        """
+
+        hyperparameters = np.asarray(hyperparameters)
+        # importance sampling over lambda_int based on proposal distribution
+        lambda_int_samples = None
+        mu_lint, sigma_lint = self.lambda_int_population(hyperparameters)
+        if self.marginalize_lambda_int:
+            # integrated analytically (td_log_likelihoods_lambda_int_marginalized())
+            mu_lint = None
+
+        if mu_lint is not None and self.lambda_int_seed is not None:
+            if hyperparameters.ndim > 1:
+                # same base uniforms for every walker
+                mu_lint = mu_lint[:, np.newaxis, np.newaxis]
+                sigma_lint = sigma_lint[:, np.newaxis, np.newaxis]
+            lambda_int_samples = positive_truncnorm_from_uniforms(mu_lint,
+                sigma_lint, self.lambda_int_base_uniforms())
+        elif mu_lint is not None:
+            sample_shape = (self.num_lenses, self.num_fpd_samples)
+            if hyperparameters.ndim > 1:
+                # one (num_lenses,num_fpd_samples) draw per walker
+                mu_lint = mu_lint[:, np.newaxis, np.newaxis]
+                sigma_lint = sigma_lint[:, np.newaxis, np.newaxis]
+                sample_shape = (len(hyperparameters),) + sample_shape
+            lambda_int_samples = truncnorm.rvs(-mu_lint / sigma_lint, np.inf,
+                                               loc=mu_lint, scale=sigma_lint,
+                                               size=sample_shape)
+
+        return lambda_int_samples
+
+    def full_log_likelihood(self, hyperparameters, index_likelihood_list,
+                            distances=None):
+        """
+        Args:
+            hyperparameters ([H0,mu_gamma,sigma_gamma] or [H0,w0,wa,mu_gamma,sigma_gamma])
+                or a batch of proposals w/ shape (n_walkers,n_params)
+            fpd_pred_samples (size:(n_lenses,n_samples,3)): Note, it is assumed
+                that doubles are padded w/ zeros
+            distances (dict): precomputed distances for this proposal (see 
+                distances_from_proposed_cosmo(), e.g. from a LikelihoodGroup).
+                Default=None (computed here)
+
+        Returns:
+            log_likelihood (float, or (n_walkers) array for a batch)
+        """
+
+        hyperparameters = np.asarray(hyperparameters)
+        # construct cosmology + lint samps (if required) from hyperparameters
+        if distances is None:
+            proposed_cosmo, lambda_int_samples = self.process_hyperparam_proposal(
+                hyperparameters)
+        else:
+            # no cosmology object needed
+            proposed_cosmo = None
+            lambda_int_samples = self.lambda_int_samples_from_proposal(
+                hyperparameters)
+
+        if self.use_workspace and not self.marginalize_lambda_int:
+            buffers = self.workspace().buffers(hyperparameters.shape[:-1])
+            log_likelihoods = self.td_log_likelihoods_in_workspace(buffers,
+                proposed_cosmo, index_likelihood_list, lambda_int_samples,
+                distances)
+            # reweighting factor
+            # NOTE: hardcoding of hyperparameter order!! (-2 is mu, -1 is sigma)
+            if self.use_gamma_info:
+                add_log_reweighting_in_place(log_likelihoods,
+                    data_vector_global[index_likelihood_list]['gamma_pred_samples'],
+                    hyperparameters[..., -2, np.newaxis, np.newaxis],
+                    hyperparameters[..., -1, np.newaxis, np.newaxis],
+                    data_vector_global[index_likelihood_list]['log_prob_gamma_samps_nu_int'],
+                    buffers['tmp'])
+
+            # mean across fpd samples, then sum over all lenses
+            return sum_log_mean_exp(log_likelihoods, in_place=True)
+
+        if self.marginalize_lambda_int:
+            td_log_likelihoods = self.td_log_likelihoods_lambda_int_marginalized(
+                proposed_cosmo, index_likelihood_list, hyperparameters, distances)
+        else:
+            td_log_likelihoods = self.td_log_likelihoods_from_proposal(
+                proposed_cosmo, index_likelihood_list, lambda_int_samples, distances)
+
+        # reweighting factor
+        # NOTE: hardcoding of hyperparameter order!! (-2 is mu, -1 is sigma)
+        #TODO check this
+        if self.use_gamma_info:
+            eval_at_proposed_nu = norm.logpdf(data_vector_global[index_likelihood_list]['gamma_pred_samples'],
+                                              loc=hyperparameters[..., -2, np.newaxis, np.newaxis],
+                                              scale=hyperparameters[..., -1, np.newaxis, np.newaxis])
+            rw_factor = eval_at_proposed_nu - data_vector_global[index_likelihood_list]['log_prob_gamma_samps_nu_int']
+        else:
+            rw_factor = 0.
+
+        # mean across fpd samples, then sum over all lenses
+        return sum_log_mean_exp(td_log_likelihoods + rw_factor)
+
+    @staticmethod
+    def ddt_posterior_from_td_fpd(td_measured, td_likelihood_prec, fpd_samples,
+                                  num_emcee_samps=10000):
+        """Computes ddt posterior from measured time delay(s) and
+            samples from fermat potential difference posterior(s)
+            for a SINGLE lens
+
+        The inference:
+            p(Ddt | delta_t, d_img) /propto p(Ddt) /integral [
+                p(delta_t | delta_phi, Ddt) p( delta_phi | d_img, nu_int)
+                p(delta_phi) / p(delta_phi | nu_int) d delta_phi   ]
+
+        Args:
+            td_measured ([n_td])
+            td_likelihood_prec ([n_td,n_td])
+            fpd_samples ([n_importance_samples,n_td])
+
+        Returns:
+            emcee.EnsembleSampler.get_chain()
+        """
+
+        # set up variables here
+        n_td = len(td_measured)
+        n_walkers = 10
+        td_likelihood_prefactor = np.log((1 / (2 * np.pi) ** (n_td / 2)) /
+                                         np.sqrt(np.linalg.det(np.linalg.inv(td_likelihood_prec))))
+
+        def td_log_likelihood(Ddt_proposed):
+
+            # TODO: check dimensions heres
+            td_predicted = tdc_utils.td_from_ddt_fpd(Ddt_proposed, fpd_samples)
+
+            x_minus_mu = (td_predicted - td_measured)
+            # add dimension s.t. x_minus_mu is 2D
+            x_minus_mu = np.expand_dims(x_minus_mu, axis=-1)
+            # matmul should condense the (# of time delays) dim.
+            # TODO: probably only 3 dimensions here? check...
+            exponent = -0.5 * np.matmul(np.transpose(x_minus_mu, axes=(0, 2, 1)),
+                                        np.matmul(td_likelihood_prec, x_minus_mu))
+
+            # reduce to one dimension: (n_fpd_samples)
+            exponent = np.squeeze(exponent)
+
+            return log_mean_exp(td_likelihood_prefactor + exponent)
+
+        def td_log_posterior(Ddt_proposed):
+
+            # what's a good prior for Ddt?
+            if Ddt_proposed < 0. or Ddt_proposed > 15000:
+                return -np.inf
+            else:
+                return td_log_likelihood(Ddt_proposed)
+
+        # set-up emcee sampler
+        cur_state = np.empty((n_walkers, 1))
+        cur_state[:, 0] = uniform.rvs(loc=0., scale=15000., size=n_walkers)
+        sampler = emcee.EnsembleSampler(n_walkers,
+                                        cur_state.shape[1], td_log_posterior)
+
+        # run mcmc
+        _ = sampler.run_mcmc(cur_state, nsteps=num_emcee_samps, progress=True)
+
+        # return chain
+        return sampler.get_chain()
+    
+
+
+class TDCKinLikelihood(TDCLikelihood):
+
+    def __init__(self, fpd_sample_shape, kin_pred_samples_shape,
+                 cosmo_model='LCDM' ,use_gamma_info=True,
+                 use_astropy=False, use_td_suff_stats=False,
+                 use_kin_suff_stats=False, use_jax_cosmo=False,
+                 distance_emulator=None, distance_emulator_dir=None,
+                 lambda_int_seed=None, use_workspace=True,
+                 sample_dtype=np.float64):
+        """
+        Keep track of quantities that remain constant throughout the inference
+
+        Args:
+            fpd_sample_shape: shape of fpd samples (n_lenses,n_fpd_samples,dim_fpd)
+            kin_pred_samples_shape: shape of kinematic samples (n_lenses,n_fpd_samples,num_kin_bins)
+            log_prob_gamma_nu_int: TODO
+            cosmo_model (string): 'LCDM', 'w0waCDM', 'LCDM_lambda_int', or
+                'LCDM_lambda_int_beta_ani'
+            use_gamma_info (bool): If False, removes reweighting from likelihood
+                evaluation (any population level gamma params should just
+                return the prior then...)
+            beta_ani_samples (): None if beta_ani not in population model
+                (n_lenses,n_fpd_samples)
+            use_td_suff_stats (bool): see TDCLikelihood
+            use_jax_cosmo (bool): see TDCLikelihood
+            distance_emulator (string): see TDCLikelihood
+            distance_emulator_dir (string): see TDCLikelihood
+            lambda_int_seed (int or [int]): see TDCLikelihood
+            use_kin_suff_stats (bool): If True, the kinematic exponent is
+                rebuilt from per-sample sufficient statistics of
+                kin_pred_samples (see add_kin_sufficient_statistics). Cost per
+                call is then independent of the # of kinematic bins.
+            use_workspace (bool): see TDCLikelihood
+            sample_dtype (np.dtype): see TDCLikelihood
+        """
+
+        super().__init__(fpd_sample_shape, cosmo_model ,use_gamma_info,
+                         use_astropy, use_td_suff_stats, use_jax_cosmo,
+                         distance_emulator, distance_emulator_dir,
+                         lambda_int_seed, use_workspace=use_workspace,
+                         sample_dtype=sample_dtype)
+
+        self.num_kin_bins = kin_pred_samples_shape[2]
+        self.use_kin_suff_stats = use_kin_suff_stats
+
+    def workspace_buffer_dims(self):
+        """
+        Returns:
+            (dict): see TDCLikelihood.workspace_buffer_dims(), w/ the 
+                kinematic scratch arrays
+        """
+
+        buffer_dims = super().workspace_buffer_dims()
+        if not self.use_kin_suff_stats:
+            buffer_dims['sigma_v_pred'] = (self.num_kin_bins,)
+            buffer_dims['sigma_v_prec_x'] = (self.num_kin_bins, 1)
+
+        return buffer_dims
+
+    def workspace_buffer_dtypes(self):
+        """
+        Returns:
+            (dict): see TDCLikelihood.workspace_buffer_dtypes(), also for
+                the kinematic sufficient statistics
+        """
+
+        if self.use_kin_suff_stats:
+            return {'exponent':ACCUMULATION_DTYPE, 'tmp':ACCUMULATION_DTYPE}
+
+        return super().workspace_buffer_dtypes()
+
+    def kin_distance_ratio_from_proposed_cosmo(self, proposed_cosmo, index_likelihood_list,
+            distances=None):
+        """
+        Args:
+            proposed_cosmo (default: tdc_utils.FlatW0waCDM): built by
+                construct_proposed_cosmo() (see below)
+            distances (dict): precomputed bundle from 
+                distances_from_proposed_cosmo(). Default=None (computed here)
+
+        Returns:
+            Ds_div_Dds_computed (np.array, size:(n_lenses)), or
+                (n_walkers,n_lenses) for a batch of proposals
+        """
+
+        if distances is not None:
+            return np.array(distances['Ds_div_Dds'])
+
+        if self.use_astropy and isinstance(proposed_cosmo, list):
+            # batch of proposals (one astropy object per walker)
+            Ds_div_Dds_computed = np.stack([np.array(tdc_utils.kin_distance_ratio(
+                cosmo, data_vector_global[index_likelihood_list]['z_lens'],
+                data_vector_global[index_likelihood_list]['z_src']))
+                for cosmo in proposed_cosmo])
+        elif self.use_astropy:
+            Ds_div_Dds_computed = tdc_utils.kin_distance_ratio(
+                proposed_cosmo , data_vector_global[index_likelihood_list]['z_lens'],
+                data_vector_global[index_likelihood_list]['z_src'])
+
+            # raise ValueError("astropy option not implemented for TDC+Kin")
+        elif self.use_jax_cosmo and np.ndim(proposed_cosmo.h) > 0:
+            # batch of proposals, all distances in one vectorized call
+            Ds_div_Dds_computed = tdc_utils.jax_kin_distance_ratio_batched(
+                proposed_cosmo, data_vector_global[index_likelihood_list]['z_lens'],
+                data_vector_global[index_likelihood_list]['z_src'])
+        elif self.use_jax_cosmo:
+            Ds_div_Dds_computed = tdc_utils.jax_kin_distance_ratio(
+                proposed_cosmo, data_vector_global[index_likelihood_list]['z_lens'],
+                data_vector_global[index_likelihood_list]['z_src'])
+        else:
+            Ds_div_Dds_computed = self.distance_engine(index_likelihood_list).distances(
+                proposed_cosmo)['Ds_div_Dds']
+
+        return np.array(Ds_div_Dds_computed)
+
+
+    def sigma_v_pred_from_kin_pred(self ,proposed_cosmo,index_likelihood_list, lambda_int_samples=None,
+                                   distances=None):
+        """
+        Args:
+            proposed_cosmo (default: tdc_utils.FlatW0waCDM): built by
+                construct_proposed_cosmo() (see below)
+            lambda_int_samples (): shape=(num_lenses,num_fpd_samples)
+            distances (dict): see kin_distance_ratio_from_proposed_cosmo()
+
+        Returns:
+            sigma_v_pred_samples (size:(n_lenses,n_samples,num_kin_bins))
+        """
+
+        Ds_div_Dds_computed = self.kin_distance_ratio_from_proposed_cosmo(
+            proposed_cosmo, index_likelihood_list, distances)
+        # scale the kin_pred with cosmology term: sigma_v = sqrt(Ds/Dds)*c*sqrt(mathcal{J})
+        # Account for mass sheets:
+        #   sigma_v = sqrt(lambda) * sigma_v
+        #   lambda = (1-kappa_ext)*lambda_int
+        # one (n_lenses,n_samples,1) multiplier, the same for every bin
+        sigma_v_scaling = np.sqrt(mass_sheet_scaling(Ds_div_Dds_computed,
+            lambda_int_samples,
+            data_vector_global[index_likelihood_list]['kappa_ext_samples']))
+
+        return (data_vector_global[index_likelihood_list]['kin_pred_samples'] *
+                sigma_v_scaling[..., np.newaxis])
+
+    def sigma_v_scaling_from_kin_pred(self, proposed_cosmo, index_likelihood_list,
+                                      lambda_int_samples=None, distances=None):
+        """Per-sample scalar r s.t. sigma_v_pred_samples = r * kin_pred_samples
+
+        Args:
+            proposed_cosmo (default: tdc_utils.FlatW0waCDM): built by
+                construct_proposed_cosmo() (see below)
+            lambda_int_samples (): shape=(num_lenses,num_fpd_samples)
+            distances (dict): see kin_distance_ratio_from_proposed_cosmo()
+
+        Returns:
+            sigma_v_scaling (size:(n_lenses,n_samples))
+        """
+
+        Ds_div_Dds_computed = self.kin_distance_ratio_from_proposed_cosmo(
+            proposed_cosmo, index_likelihood_list, distances)
+        # r^2 = (Ds/Dds)*lambda_int*(1-kappa_ext), see sigma_v_pred_from_kin_pred()
+        lambda_scaling = mass_sheet_scaling(Ds_div_Dds_computed,
+            lambda_int_samples,
+            data_vector_global[index_likelihood_list]['kappa_ext_samples'])
+
+        return np.broadcast_to(np.sqrt(lambda_scaling),
+            np.shape(Ds_div_Dds_computed) + (self.num_fpd_samples,))
+
+    def sigma_v_log_likelihood_per_samp(self,sigma_v_pred_samples, index_likelihood_list):
+        """
+        Args:
+            sigma_v_pred_samples (n_lenses,n_fpd_samps,num_kin_bins)
+
+        Returns:
+            sigma_v_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
+        """
+
+        x_minus_mu = (sigma_v_pred_samples -per_sample_measurement(
+            data_vector_global[index_likelihood_list], 'sigma_v_measured'))
+        # add dimension s.t. x_minus_mu is 2D
+        x_minus_mu = np.expand_dims(x_minus_mu ,axis=-1)
+        # matmul should condense the (# of time delays) dim.
+        exponent = -0.5 *np.matmul(np.swapaxes(x_minus_mu ,-1 ,-2),
+                                  np.matmul(per_sample_measurement(
+                                      data_vector_global[index_likelihood_list],
+                                      'sigma_v_likelihood_prec'),x_minus_mu))
+
+        # reduce to two dimensions: (n_lenses,n_fpd_samples)
+        exponent = exponent[... ,0 ,0]
+
+        # log-likelihood
+        return per_sample_measurement(data_vector_global[index_likelihood_list],
+                                      'sigma_v_likelihood_prefactors') + exponent
+
+    def sigma_v_log_likelihood_per_samp_suff_stats(self, sigma_v_scaling, index_likelihood_list):
+        """
+        Same as sigma_v_log_likelihood_per_samp(), but using
+            sigma_v_pred = r*kin_pred_samples (see quadratic_form_sufficient_statistics())
+
+        Args:
+            sigma_v_scaling (n_lenses,n_fpd_samps): from sigma_v_scaling_from_kin_pred()
+
+        Returns:
+            sigma_v_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
+        """
+
+        exponent = -0.5 * sufficient_statistics_exponent(sigma_v_scaling,
+            data_vector_global[index_likelihood_list]['sigma_v_aPa'],
+            data_vector_global[index_likelihood_list]['sigma_v_aPm'],
+            per_sample_measurement(data_vector_global[index_likelihood_list], 'sigma_v_mPm'))
+
+        # log-likelihood
+        return per_sample_measurement(data_vector_global[index_likelihood_list],
+                                      'sigma_v_likelihood_prefactors') + exponent
+
+    def sigma_v_log_likelihoods_from_proposal(self, proposed_cosmo, index_likelihood_list,
+                                              lambda_int_samples=None, distances=None):
+        """
+        Args:
+            proposed_cosmo (default: tdc_utils.FlatW0waCDM): built by
+                construct_proposed_cosmo() (see below)
+            lambda_int_samples (): shape=(num_lenses,num_fpd_samples)
+            distances (dict): see kin_distance_ratio_from_proposed_cosmo()
+
+        Returns:
+            sigma_v_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
+        """
+
+        if self.use_kin_suff_stats:
+            sigma_v_scaling = self.sigma_v_scaling_from_kin_pred(
+                proposed_cosmo, index_likelihood_list, lambda_int_samples,
+                distances)
+            return self.sigma_v_log_likelihood_per_samp_suff_stats(
+                sigma_v_scaling, index_likelihood_list)
+
+        sigma_v_pred_samples = self.sigma_v_pred_from_kin_pred(
+            proposed_cosmo, index_likelihood_list, lambda_int_samples,
+            distances)
+
+        return self.sigma_v_log_likelihood_per_samp(
+            sigma_v_pred_samples, index_likelihood_list)
+
+    def add_sigma_v_log_likelihoods_in_workspace(self, buffers, proposed_cosmo,
+            index_likelihood_list, lambda_int_samples=None, distances=None):
+        """Adds sigma_v_log_likelihoods_from_proposal() to 
+            buffers['log_likelihoods'], w/ all per-sample arithmetic done in
+            place in the workspace buffers (re-uses buffers['scaling'])
+
+        Args:
+            buffers (dict): from LikelihoodWorkspace.buffers()
+            proposed_cosmo, lambda_int_samples, distances: see 
+                sigma_v_log_likelihoods_from_proposal()
+
+        Returns:
+            buffers['log_likelihoods'] (n_lenses,n_fpd_samps)
+        """
+
+        data_vector_dict = data_vector_global[index_likelihood_list]
+        Ds_div_Dds_computed = self.kin_distance_ratio_from_proposed_cosmo(
+            proposed_cosmo, index_likelihood_list, distances)
+        # sigma_v_pred = r * kin_pred_samples (see sigma_v_scaling_from_kin_pred())
+        sigma_v_scaling = mass_sheet_scaling_in_place(buffers['scaling'],
+            Ds_div_Dds_computed, lambda_int_samples,
+            data_vector_dict['kappa_ext_samples'], buffers['tmp'])
+        np.sqrt(sigma_v_scaling, out=sigma_v_scaling)
+
+        exponent = buffers['exponent']
+        if self.use_kin_suff_stats:
+            sufficient_statistics_exponent_in_place(exponent, sigma_v_scaling,
+                data_vector_dict['sigma_v_aPa'], data_vector_dict['sigma_v_aPm'],
+                per_sample_measurement(data_vector_dict, 'sigma_v_mPm'),
+                buffers['tmp'])
+        else:
+            x_minus_mu = np.multiply(data_vector_dict['kin_pred_samples'],
+                sigma_v_scaling[..., np.newaxis], out=buffers['sigma_v_pred'])
+            np.subtract(x_minus_mu, per_sample_measurement(data_vector_dict,
+                'sigma_v_measured', x_minus_mu.dtype), out=x_minus_mu)
+            quadratic_form_in_place(exponent, x_minus_mu,
+                per_sample_measurement(data_vector_dict,
+                    'sigma_v_likelihood_prec', x_minus_mu.dtype),
+                buffers['sigma_v_prec_x'])
+
+        # log-likelihood
+        exponent *= -0.5
+        exponent += per_sample_measurement(data_vector_dict,
+            'sigma_v_likelihood_prefactors', exponent.dtype)
+        log_likelihoods = buffers['log_likelihoods']
+        log_likelihoods += exponent
+
+        return log_likelihoods
+    
+
+    def full_log_likelihood(self, hyperparameters, index_likelihood_list,
+                            distances=None):
+        """
+        Args:
+            hyperparameters ([float]): see log_posterior(), or a batch of
+                proposals w/ shape (n_walkers,n_params)
+            distances (dict): see TDCLikelihood.full_log_likelihood()
+
+        Returns:
+            log_likelihood (float, or (n_walkers) array for a batch)
+        """
+
+        hyperparameters = np.asarray(hyperparameters)
+        if distances is None:
+            # construct cosmology from hyperparameters
+            proposed_cosmo, lambda_int_samples = self.process_hyperparam_proposal(
+                hyperparameters)
+            # Ddt & Ds/Dds from one distance evaluation, shared by both terms
+            distances = self.distances_from_proposed_cosmo(proposed_cosmo,
+                                                           index_likelihood_list)
+        else:
+            proposed_cosmo = None
+            lambda_int_samples = self.lambda_int_samples_from_proposal(
+                hyperparameters)
+
+        if self.use_workspace:
+            buffers = self.workspace().buffers(hyperparameters.shape[:-1])
+            self.td_log_likelihoods_in_workspace(buffers, proposed_cosmo,
+                index_likelihood_list, lambda_int_samples, distances)
+            log_likelihoods = self.add_sigma_v_log_likelihoods_in_workspace(
+                buffers, proposed_cosmo, index_likelihood_list,
+                lambda_int_samples, distances)
+            # reweighting factors
+            # NOTE: hardcoding of hyperparameter order!! (-2 is mu, -1 is sigma)
+            if self.use_gamma_info:
+                add_log_reweighting_in_place(log_likelihoods,
+                    data_vector_global[index_likelihood_list]['gamma_pred_samples'],
+                    hyperparameters[..., -2, np.newaxis, np.newaxis],
+                    hyperparameters[..., -1, np.newaxis, np.newaxis],
+                    data_vector_global[index_likelihood_list]['log_prob_gamma_samps_nu_int'],
+                    buffers['tmp'])
+            if self.cosmo_model in ['LCDM_lambda_int_beta_ani', 'w0waCDM_lambda_int_beta_ani']:
+                add_log_reweighting_in_place(log_likelihoods,
+                    data_vector_global[index_likelihood_list]['beta_ani_samples'],
+                    hyperparameters[..., -4, np.newaxis, np.newaxis],
+                    hyperparameters[..., -3, np.newaxis, np.newaxis],
+                    data_vector_global[index_likelihood_list]['log_prob_beta_ani_samps_nu_int'],
+                    buffers['tmp'])
+
+            # mean across fpd samples, then sum over all lenses
+            return sum_log_mean_exp(log_likelihoods, in_place=True)
+
+        # td log likelihood per sample
+        td_log_likelihoods = self.td_log_likelihoods_from_proposal(
+            proposed_cosmo, index_likelihood_list, lambda_int_samples, distances)
+
+        # kin log likelihood per sample
+        sigma_v_log_likelihoods = self.sigma_v_log_likelihoods_from_proposal(
+            proposed_cosmo, index_likelihood_list, lambda_int_samples, distances)
+
+        # reweighting factor
+        # NOTE: hardcoding of hyperparameter order!! (-2 is mu, -1 is sigma)
+        if self.use_gamma_info:
+            eval_at_proposed_nu = norm.logpdf(data_vector_global[index_likelihood_list]['gamma_pred_samples'],
+                                              loc=hyperparameters[... ,-2 ,np.newaxis ,np.newaxis],
+                                              scale=hyperparameters[... ,-1 ,np.newaxis ,np.newaxis])
+            rw_factor = eval_at_proposed_nu - data_vector_global[index_likelihood_list]['log_prob_gamma_samps_nu_int']
+        else:
+            rw_factor = 0.
+
+        if self.cosmo_model in ['LCDM_lambda_int_beta_ani' ,'w0waCDM_lambda_int_beta_ani']:
+            eval_at_proposed_beta_pop = norm.logpdf(data_vector_global[index_likelihood_list]['beta_ani_samples'],
+                                                    loc=hyperparameters[... ,-4 ,np.newaxis ,np.newaxis],
+                                                    scale=hyperparameters[... ,-3 ,np.newaxis ,np.newaxis])
+            beta_rw_factor = eval_at_proposed_beta_pop - data_vector_global[index_likelihood_list]['log_prob_beta_ani_samps_nu_int']
+            rw_factor += beta_rw_factor
+
+        # mean across fpd samples, then sum over all lenses (the fully 
+        #   jitted path is JaxLikelihood)
+        return sum_log_mean_exp(td_log_likelihoods + sigma_v_log_likelihoods
+                                + rw_factor)
+
+
+###################
+# Likelihood Groups
+###################
+
+class LikelihoodGroup():
+
+    def __init__(self, tdc_likelihood_list, index_likelihood_list=None):
+        """
+        Evaluates several likelihood objects (i.e. one per subsample: gold 
+        NIRSPEC quads, MUSE quads/doubles, 4MOST, silver, ...) together. The 
+        proposed cosmology is built once, distances for the concatenated 
+        redshifts of all members are computed in one vectorized call, and 
+        each member receives its own slice.
+
+        Args:
+            tdc_likelihood_list ([TDCLikelihood]): members, must share 
+                cosmo_model and distance settings
+            index_likelihood_list ([int]): index of each member's data vector 
+                in data_vector_global. Default: 0,...,len(tdc_likelihood_list)-1
+        """
+
+        self.tdc_likelihood_list = list(tdc_likelihood_list)
+        if index_likelihood_list is None:
+            index_likelihood_list = range(len(self.tdc_likelihood_list))
+        self.index_likelihood_list = list(index_likelihood_list)
+
+        lead = self.tdc_likelihood_list[0]
+        for tdc_likelihood in self.tdc_likelihood_list[1:]:
+            if tdc_likelihood.cosmo_model != lead.cosmo_model:
+                raise ValueError("all likelihoods in a group must share cosmo_model")
+            if ((tdc_likelihood.use_astropy, tdc_likelihood.use_jax_cosmo,
+                 tdc_likelihood.distance_emulator) != 
+                (lead.use_astropy, lead.use_jax_cosmo, lead.distance_emulator)):
+                raise ValueError("all likelihoods in a group must share "+
+                                 "distance settings")
+        self.cosmo_model = lead.cosmo_model
+
+        # set from data_vector_global on first use
+        self._z_lens = None
+        self._z_src = None
+        self._split_indices = None
+        self._distance_engine = None
+
+    def concatenate_redshifts(self):
+        """
+        Returns:
+            z_lens, z_src (np.array): redshifts of all members, in order
+        """
+
+        if self._z_lens is None:
+            z_lens = [np.atleast_1d(np.asarray(data_vector_global[i]['z_lens'], dtype=float))
+                      for i in self.index_likelihood_list]
+            z_src = [np.atleast_1d(np.asarray(data_vector_global[i]['z_src'], dtype=float))
+                     for i in self.index_likelihood_list]
+            self._split_indices = np.cumsum([len(z) for z in z_lens])[:-1]
+            self._z_lens = np.concatenate(z_lens)
+            self._z_src = np.concatenate(z_src)
+
+        return self._z_lens, self._z_src
+
+    def distances_from_proposal(self, hyperparameters):
+        """
+        Args:
+            hyperparameters ([float]): see log_posterior(), or a batch of
+                proposals w/ shape (n_walkers,n_params)
+
+        Returns:
+            [dict]: one distance dict per member (see 
+                TDCLikelihood.distances_from_proposed_cosmo())
+        """
+
+        z_lens, z_src = self.concatenate_redshifts()
+        lead = self.tdc_likelihood_list[0]
+        if lead.use_distance_engine() and self._distance_engine is None:
+            self._distance_engine = lead.build_distance_engine(z_lens, z_src)
+
+        proposed_cosmo = lead.construct_proposed_cosmo(hyperparameters)
+        distances = lead.distances_from_redshifts(proposed_cosmo, z_lens, z_src,
+                                                  self._distance_engine)
+
+        # scatter back to the members (lens axis is last)
+        split_distances = {key: np.split(value, self._split_indices, axis=-1)
+                           for key, value in distances.items()}
+
+        return [{key: split_distances[key][m] for key in split_distances.keys()}
+                for m in range(len(self.tdc_likelihood_list))]
+
+    def full_log_likelihood(self, hyperparameters):
+        """
+        Args:
+            hyperparameters ([float]): see log_posterior(), or a batch of
+                proposals w/ shape (n_walkers,n_params)
+
+        Returns:
+            log_likelihood (float, or (n_walkers) array for a batch): summed 
+                over all members
+        """
+
+        member_distances = self.distances_from_proposal(hyperparameters)
+
+        log_likelihood = 0.
+        for tdc_likelihood, index_likelihood, distances in zip(
+                self.tdc_likelihood_list, self.index_likelihood_list,
+                member_distances):
+            log_likelihood = log_likelihood + tdc_likelihood.full_log_likelihood(
+                hyperparameters, index_likelihood, distances=distances)
+            if np.all(log_likelihood == -np.inf):
+                # no need to evaluate the other members
+                return log_likelihood
+
+        return log_likelihood
+
+
+####################
+# Packed Likelihood
+####################
+
+class PackedLikelihood(TDCLikelihood):
+
+    def __init__(self, tdc_likelihood_list):
+        """
+        One likelihood object for a mixed sample (doubles, quads, w/ any or no
+        kinematics), evaluated in one vectorized pass per proposal. Its data
+        vector is the packed ragged layout of the members' data vectors (see
+        pack_data_vectors()), so no kernel depends on the # of images or
+        kinematic bins: per-lens terms are (n_lenses,n_fpd_samples) arrays,
+        per-delay / per-bin terms are reduced to their lens by segment sums.
+        Lenses are packed w/ the TDCKinLikelihood members first, kinematic
+        terms are then the first num_kin_lenses lenses (slices, no gathers).
+
+        Args:
+            tdc_likelihood_list ([TDCLikelihood]): members (i.e. one per
+                subsample), must share cosmo_model, distance settings,
+                use_gamma_info, use_td_suff_stats, use_kin_suff_stats (for
+                TDCKinLikelihood members), marginalize_lambda_int, whether
+                lambda_int_seed is set, use_workspace, sample_dtype & the #
+                of fpd samples. The members' lambda_int base uniforms are
+                re-used (same common random numbers as the members).
+        """
+
+        tdc_likelihood_list = list(tdc_likelihood_list)
+        # kinematic members first (stable), see pack_data_vectors()
+        self.member_order = sorted(range(len(tdc_likelihood_list)),
+            key=lambda m: not isinstance(tdc_likelihood_list[m], TDCKinLikelihood))
+        self.tdc_likelihood_list = [tdc_likelihood_list[m] for m in self.member_order]
+        kin_likelihood_list = [tdc_likelihood for tdc_likelihood in
+            self.tdc_likelihood_list if isinstance(tdc_likelihood, TDCKinLikelihood)]
+
+        lead = self.tdc_likelihood_list[0]
+        for tdc_likelihood in self.tdc_likelihood_list[1:]:
+            if ((tdc_likelihood.cosmo_model, tdc_likelihood.use_gamma_info,
+                 tdc_likelihood.use_td_suff_stats,
+                 tdc_likelihood.marginalize_lambda_int,
+                 tdc_likelihood.lambda_int_seed is None,
+                 tdc_likelihood.use_workspace, tdc_likelihood.sample_dtype,
+                 tdc_likelihood.num_fpd_samples) !=
+                (lead.cosmo_model, lead.use_gamma_info, lead.use_td_suff_stats,
+                 lead.marginalize_lambda_int, lead.lambda_int_seed is None,
+                 lead.use_workspace, lead.sample_dtype, lead.num_fpd_samples)):
+                raise ValueError("all packed likelihoods must share cosmo_model, "+
+                                 "use_gamma_info, use_td_suff_stats, "+
+                                 "marginalize_lambda_int, lambda_int_seed, "+
+                                 "use_workspace, sample_dtype & the # of fpd "+
+                                 "samples")
+            if ((tdc_likelihood.use_astropy, tdc_likelihood.use_jax_cosmo,
+                 tdc_likelihood.distance_emulator) !=
+                (lead.use_astropy, lead.use_jax_cosmo, lead.distance_emulator)):
+                raise ValueError("all packed likelihoods must share "+
+                                 "distance settings")
+        if len(set(tdc_likelihood.use_kin_suff_stats for tdc_likelihood
+                   in kin_likelihood_list)) > 1:
+            raise ValueError("all packed kinematic likelihoods must share "+
+                             "use_kin_suff_stats")
+
+        # dim_fpd is ragged (None)
+        super().__init__((sum(tdc_likelihood.num_lenses for tdc_likelihood
+                              in self.tdc_likelihood_list),
+                          lead.num_fpd_samples, None),
+                         cosmo_model=lead.cosmo_model,
+                         use_gamma_info=lead.use_gamma_info,
+                         use_astropy=lead.use_astropy,
+                         use_td_suff_stats=lead.use_td_suff_stats,
+                         use_jax_cosmo=lead.use_jax_cosmo,
+                         distance_emulator=lead.distance_emulator,
+                         distance_emulator_dir=lead.distance_emulator_dir,
+                         lambda_int_seed=lead.lambda_int_seed,
+                         marginalize_lambda_int=lead.marginalize_lambda_int,
+                         use_workspace=lead.use_workspace,
+                         sample_dtype=lead.sample_dtype)
+        self.num_kin_lenses = sum(tdc_likelihood.num_lenses for tdc_likelihood
+                                  in kin_likelihood_list)
+        self.use_kin_suff_stats = (len(kin_likelihood_list) > 0 and
+                                   kin_likelihood_list[0].use_kin_suff_stats)
+
+    def lambda_int_base_uniforms(self):
+        """
+        Returns:
+            np.array, shape=(num_lenses,num_fpd_samples): the members' base
+                uniforms (see TDCLikelihood.lambda_int_base_uniforms()), in
+                packed order
+        """
+
+        if self._lambda_int_base_uniforms is None:
+            self._lambda_int_base_uniforms = np.concatenate([
+                tdc_likelihood.lambda_int_base_uniforms()
+                for tdc_likelihood in self.tdc_likelihood_list])
+
+        return self._lambda_int_base_uniforms
+
+    def workspace_buffer_dims(self):
+        """
+        Returns:
+            (dict): see TDCLikelihood.workspace_buffer_dims(), per-lens
+                scratch arrays only (the kinematic terms use views of the
+                first num_kin_lenses lenses)
+        """
+
+        return {'log_likelihoods':(), 'exponent':(), 'scaling':(), 'tmp':()}
+
+    def workspace_buffer_dtypes(self):
+        """
+        Returns:
+            (dict): see TDCLikelihood.workspace_buffer_dtypes(), also for
+                the kinematic sufficient statistics
+        """
+
+        if self.use_kin_suff_stats:
+            return {'exponent':ACCUMULATION_DTYPE, 'tmp':ACCUMULATION_DTYPE}
+
+        return super().workspace_buffer_dtypes()
+
+    def td_log_likelihoods_from_proposal(self, proposed_cosmo, index_likelihood_list,
+                                         lambda_int_samples=None, distances=None):
+        """
+        Args:
+            proposed_cosmo, lambda_int_samples, distances: see
+                TDCLikelihood.td_log_likelihoods_from_proposal()
+
+        Returns:
+            td_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
+        """
+
+        td_scaling = self.td_scaling_from_fpd_pred(proposed_cosmo,
+            index_likelihood_list, lambda_int_samples, distances)
+        if self.use_td_suff_stats:
+            # per-lens, independent of the # of images
+            return self.td_log_likelihood_per_samp_suff_stats(
+                td_scaling, index_likelihood_list)
+
+        data_vector_dict = data_vector_global[index_likelihood_list]
+        exponent = segment_quadratic_form(packed_residuals(
+            data_vector_dict['fpd_samples'], td_scaling,
+            data_vector_dict['td_measured'], data_vector_dict['delay_offsets']),
+            data_vector_dict['td_pair_indices'], data_vector_dict['td_pair_prec'],
+            data_vector_dict['td_pair_offsets'])
+
+        # log-likelihood
+        return (per_sample_measurement(data_vector_dict, 'td_likelihood_prefactors')
+                - 0.5 * exponent)
+
+    def td_log_likelihoods_in_workspace(self, buffers, proposed_cosmo,
+            index_likelihood_list, lambda_int_samples=None, distances=None):
+        """
+        Args, Returns: see TDCLikelihood.td_log_likelihoods_in_workspace()
+        """
+
+        if self.use_td_suff_stats:
+            return super().td_log_likelihoods_in_workspace(buffers,
+                proposed_cosmo, index_likelihood_list, lambda_int_samples,
+                distances)
+
+        data_vector_dict = data_vector_global[index_likelihood_list]
+        Ddt_computed = self.ddt_from_proposed_cosmo(proposed_cosmo,
+                                                    index_likelihood_list,
+                                                    distances)
+        td_scaling = mass_sheet_scaling_in_place(buffers['scaling'],
+            tdc_utils.td_from_ddt_fpd(Ddt_computed, 1.), lambda_int_samples,
+            data_vector_dict['kappa_ext_samples'], buffers['tmp'])
+        exponent = segment_quadratic_form(packed_residuals(
+            data_vector_dict['fpd_samples'], td_scaling,
+            data_vector_dict['td_measured'], data_vector_dict['delay_offsets']),
+            data_vector_dict['td_pair_indices'], data_vector_dict['td_pair_prec'],
+            data_vector_dict['td_pair_offsets'], out=buffers['exponent'])
+
+        # log-likelihood
+        log_likelihoods = np.multiply(exponent, -0.5,
+                                      out=buffers['log_likelihoods'])
+        log_likelihoods += per_sample_measurement(data_vector_dict,
+            'td_likelihood_prefactors', log_likelihoods.dtype)
+
+        return log_likelihoods
+
+    def sigma_v_log_likelihoods_from_proposal(self, index_likelihood_list,
+            lambda_int_samples=None, distances=None):
+        """
+        Args:
+            lambda_int_samples (): shape=([n_walkers],num_lenses,num_fpd_samples)
+            distances (dict): see TDCLikelihood.distances_from_proposed_cosmo()
+
+        Returns:
+            sigma_v_log_likelihood_per_fpd_samp (num_kin_lenses,n_fpd_samps)
+        """
+
+        data_vector_dict = data_vector_global[index_likelihood_list]
+        kin_lenses = slice(0, self.num_kin_lenses)
+        kappa_ext_samples = data_vector_dict['kappa_ext_samples']
+        # sigma_v_pred = r * kin_pred_samples (see
+        #   TDCKinLikelihood.sigma_v_scaling_from_kin_pred())
+        sigma_v_scaling = np.sqrt(mass_sheet_scaling(
+            distances['Ds_div_Dds'][..., kin_lenses],
+            None if lambda_int_samples is None else
+                lambda_int_samples[..., kin_lenses, :],
+            None if kappa_ext_samples is None else
+                kappa_ext_samples[kin_lenses]))
+        sigma_v_scaling = np.broadcast_to(sigma_v_scaling,
+            sigma_v_scaling.shape[:-1] + (self.num_fpd_samples,))
+
+        if self.use_kin_suff_stats:
+            exponent = sufficient_statistics_exponent(sigma_v_scaling,
+                data_vector_dict['sigma_v_aPa'], data_vector_dict['sigma_v_aPm'],
+                per_sample_measurement(data_vector_dict, 'sigma_v_mPm'))
+        else:
+            exponent = segment_quadratic_form(packed_residuals(
+                data_vector_dict['kin_pred_samples'], sigma_v_scaling,
+                data_vector_dict['sigma_v_measured'],
+                data_vector_dict['kin_bin_offsets']),
+                data_vector_dict['sigma_v_pair_indices'],
+                data_vector_dict['sigma_v_pair_prec'],
+                data_vector_dict['sigma_v_pair_offsets'])
+
+        # log-likelihood
+        return (per_sample_measurement(data_vector_dict,
+                                       'sigma_v_likelihood_prefactors')
+                - 0.5 * exponent)
+
+    def add_sigma_v_log_likelihoods_in_workspace(self, buffers,
+            index_likelihood_list, lambda_int_samples=None, distances=None):
+        """Adds sigma_v_log_likelihoods_from_proposal() to the first
+            num_kin_lenses lenses of buffers['log_likelihoods'], in place
+
+        Args:
+            buffers (dict): from LikelihoodWorkspace.buffers()
+            lambda_int_samples, distances: see
+                sigma_v_log_likelihoods_from_proposal()
+
+        Returns:
+            buffers['log_likelihoods'] (n_lenses,n_fpd_samps)
+        """
+
+        data_vector_dict = data_vector_global[index_likelihood_list]
+        kin_lenses = slice(0, self.num_kin_lenses)
+        kin_buffers = {key: value[..., kin_lenses, :]
+                       for key, value in buffers.items()}
+        kappa_ext_samples = data_vector_dict['kappa_ext_samples']
+        sigma_v_scaling = mass_sheet_scaling_in_place(kin_buffers['scaling'],
+            distances['Ds_div_Dds'][..., kin_lenses],
+            None if lambda_int_samples is None else
+                lambda_int_samples[..., kin_lenses, :],
+            None if kappa_ext_samples is None else
+                kappa_ext_samples[kin_lenses], kin_buffers['tmp'])
+        np.sqrt(sigma_v_scaling, out=sigma_v_scaling)
+
+        exponent = kin_buffers['exponent']
+        if self.use_kin_suff_stats:
+            sufficient_statistics_exponent_in_place(exponent, sigma_v_scaling,
+                data_vector_dict['sigma_v_aPa'], data_vector_dict['sigma_v_aPm'],
+                per_sample_measurement(data_vector_dict, 'sigma_v_mPm'),
+                kin_buffers['tmp'])
+        else:
+            segment_quadratic_form(packed_residuals(
+                data_vector_dict['kin_pred_samples'], sigma_v_scaling,
+                data_vector_dict['sigma_v_measured'],
+                data_vector_dict['kin_bin_offsets']),
+                data_vector_dict['sigma_v_pair_indices'],
+                data_vector_dict['sigma_v_pair_prec'],
+                data_vector_dict['sigma_v_pair_offsets'], out=exponent)
+
+        # log-likelihood
+        exponent *= -0.5
+        exponent += per_sample_measurement(data_vector_dict,
+            'sigma_v_likelihood_prefactors', exponent.dtype)
+        kin_buffers['log_likelihoods'] += exponent
+
+        return buffers['log_likelihoods']
+
+    def full_log_likelihood(self, hyperparameters, index_likelihood_list,
+                            distances=None):
+        """
+        Args:
+            hyperparameters ([float]): see log_posterior(), or a batch of
+                proposals w/ shape (n_walkers,n_params)
+            index_likelihood_list (int): the packed data vector in
+                data_vector_global
+            distances (dict): see TDCLikelihood.full_log_likelihood()
+
+        Returns:
+            log_likelihood (float, or (n_walkers) array for a batch)
+        """
+
+        hyperparameters = np.asarray(hyperparameters)
+        data_vector_dict = data_vector_global[index_likelihood_list]
+        if distances is None:
+            proposed_cosmo, lambda_int_samples = self.process_hyperparam_proposal(
+                hyperparameters)
+            # Ddt & Ds/Dds of every lens from one distance evaluation
+            distances = self.distances_from_proposed_cosmo(proposed_cosmo,
+                                                           index_likelihood_list)
+        else:
+            lambda_int_samples = self.lambda_int_samples_from_proposal(
+                hyperparameters)
+        kin_lenses = slice(0, self.num_kin_lenses)
+        use_beta_ani = (self.num_kin_lenses > 0 and self.cosmo_model in
+                        ['LCDM_lambda_int_beta_ani', 'w0waCDM_lambda_int_beta_ani'])
+
+        if self.use_workspace and not self.marginalize_lambda_int:
+            buffers = self.workspace().buffers(hyperparameters.shape[:-1])
+            log_likelihoods = self.td_log_likelihoods_in_workspace(buffers,
+                None, index_likelihood_list, lambda_int_samples, distances)
+            if self.num_kin_lenses > 0:
+                self.add_sigma_v_log_likelihoods_in_workspace(buffers,
+                    index_likelihood_list, lambda_int_samples, distances)
+            # reweighting factors
+            # NOTE: hardcoding of hyperparameter order!! (-2 is mu, -1 is sigma)
+            if self.use_gamma_info:
+                add_log_reweighting_in_place(log_likelihoods,
+                    data_vector_dict['gamma_pred_samples'],
+                    hyperparameters[..., -2, np.newaxis, np.newaxis],
+                    hyperparameters[..., -1, np.newaxis, np.newaxis],
+                    data_vector_dict['log_prob_gamma_samps_nu_int'],
+                    buffers['tmp'])
+            if use_beta_ani:
+                add_log_reweighting_in_place(log_likelihoods[..., kin_lenses, :],
+                    data_vector_dict['beta_ani_samples'],
+                    hyperparameters[..., -4, np.newaxis, np.newaxis],
+                    hyperparameters[..., -3, np.newaxis, np.newaxis],
+                    data_vector_dict['log_prob_beta_ani_samps_nu_int'],
+                    buffers['tmp'][..., kin_lenses, :])
+
+            # mean across fpd samples, then sum over all lenses
+            return sum_log_mean_exp(log_likelihoods, in_place=True)
+
+        if self.marginalize_lambda_int:
+            log_likelihoods = self.td_log_likelihoods_lambda_int_marginalized(
+                None, index_likelihood_list, hyperparameters, distances)
+        else:
+            log_likelihoods = self.td_log_likelihoods_from_proposal(None,
+                index_likelihood_list, lambda_int_samples, distances)
+
+        if self.num_kin_lenses > 0:
+            log_likelihoods[..., kin_lenses, :] += (
+                self.sigma_v_log_likelihoods_from_proposal(
+                    index_likelihood_list, lambda_int_samples, distances))
+
+        # reweighting factors
+        # NOTE: hardcoding of hyperparameter order!! (-2 is mu, -1 is sigma)
+        if self.use_gamma_info:
+            log_likelihoods += norm.logpdf(data_vector_dict['gamma_pred_samples'],
+                loc=hyperparameters[..., -2, np.newaxis, np.newaxis],
+                scale=hyperparameters[..., -1, np.newaxis, np.newaxis])
+            log_likelihoods -= data_vector_dict['log_prob_gamma_samps_nu_int']
+        if use_beta_ani:
+            log_likelihoods[..., kin_lenses, :] += (norm.logpdf(
+                data_vector_dict['beta_ani_samples'],
+                loc=hyperparameters[..., -4, np.newaxis, np.newaxis],
+                scale=hyperparameters[..., -3, np.newaxis, np.newaxis]) -
+                data_vector_dict['log_prob_beta_ani_samps_nu_int'])
+
+        # mean across fpd samples, then sum over all lenses
+        return sum_log_mean_exp(log_likelihoods, in_place=True)
+
+
+def pack_quadratic_form(pred_samples_list, measured_list, likelihood_prec_list):
+    """Ragged layout of Gaussian measurements of different dims: entries
+        (delays / kinematic bins) of all lenses are concatenated, each lens
+        owning entries offsets[j]:offsets[j+1]. Entries w/ zero precision
+        (i.e. the zero padding of doubles) are dropped. The non-zero
+        elements of the upper triangle of each precision matrix are stored
+        as (row,col) pairs of entries (off-diagonal values doubled), each
+        lens owning pairs pair_offsets[j]:pair_offsets[j+1]. A lens w/ no 
+        entry of non-zero precision raises a ValueError.
+
+    Args:
+        pred_samples_list ([np.array]): (n_lenses,n_fpd_samples,dim) per
+            data vector, i.e. fpd_samples
+        measured_list ([np.array]): (n_lenses,dim) per data vector
+        likelihood_prec_list ([np.array]): (n_lenses,dim,dim) per data vector
+
+    Returns:
+        (dict) w/ 'pred_samples' (n_entries,n_fpd_samples), 'measured'
+            (n_entries), 'offsets' (n_lenses+1), 'pair_indices' (n_pairs,2),
+            'pair_prec' (n_pairs) and 'pair_offsets' (n_lenses+1)
+    """
+
+    pred_samples, measured, offsets = [], [], [0]
+    pair_indices, pair_prec, pair_offsets = [], [], [0]
+    for m, (member_pred_samples, member_measured, member_prec) in enumerate(zip(
+            pred_samples_list, measured_list, likelihood_prec_list)):
+        for j in range(len(member_measured)):
+            active = np.flatnonzero(np.diag(member_prec[j]))
+            if len(active) == 0:
+                # would be an empty segment in segment_quadratic_form()
+                raise ValueError("lens %d of data vector %d has an all-zero "
+                                 "precision matrix" % (j, m))
+            rows, cols = np.triu_indices(len(active))
+            prec = member_prec[j][active[rows], active[cols]] * np.where(
+                rows == cols, 1., 2.)
+            nonzero = prec != 0
+            pair_indices.append(offsets[-1] + np.stack([rows[nonzero],
+                                                        cols[nonzero]], axis=-1))
+            pair_prec.append(prec[nonzero].astype(member_prec.dtype))
+            pair_offsets.append(pair_offsets[-1] + np.sum(nonzero))
+            pred_samples.append(member_pred_samples[j][:, active].T)
+            measured.append(member_measured[j][active])
+            offsets.append(offsets[-1] + len(active))
+
+    return {'pred_samples':np.concatenate(pred_samples),
+            'measured':np.concatenate(measured),
+            'offsets':np.asarray(offsets),
+            'pair_indices':np.concatenate(pair_indices),
+            'pair_prec':np.concatenate(pair_prec),
+            'pair_offsets':np.asarray(pair_offsets)}
+
+def pack_data_vectors(data_vector_list, tdc_likelihood_list):
+    """Data vector of PackedLikelihood(tdc_likelihood_list): per-lens arrays
+        are concatenated over the lens axis (in PackedLikelihood.member_order,
+        kinematic members first), time delays & kinematic bins in the ragged
+        layout of pack_quadratic_form(). Kinematic arrays cover the first
+        num_kin_lenses lenses. Sufficient statistics (if used) must be in the
+        data vectors (see add_missing_sufficient_statistics()).
+
+    Args:
+        data_vector_list ([dict]): one data vector per likelihood object
+        tdc_likelihood_list ([TDCLikelihood])
+
+    Returns:
+        (dict): packed data vector, w/ the keys of a TDCKinLikelihood data
+            vector & 'delay_offsets', 'td_pair_indices', 'td_pair_prec',
+            'td_pair_offsets' ('kin_bin_offsets', 'sigma_v_pair_indices', ...
+            for kinematics) if the sufficient statistics are not used
+    """
+
+    packed_likelihood = PackedLikelihood(tdc_likelihood_list)
+    # per-lens measurements (older data vectors are replicated across samples)
+    data_vector_list = [compact_measurements(dict(data_vector_list[m]))
+                        for m in packed_likelihood.member_order]
+    kin_data_vector_list = [data_vector_dict for data_vector_dict, tdc_likelihood
+        in zip(data_vector_list, packed_likelihood.tdc_likelihood_list)
+        if isinstance(tdc_likelihood, TDCKinLikelihood)]
+
+    def concatenate(key, kin_only=False):
+        return np.concatenate([data_vector_dict[key] for data_vector_dict in
+            (kin_data_vector_list if kin_only else data_vector_list)])
+
+    packed_data_vector = {
+        'z_lens':np.concatenate([np.atleast_1d(np.asarray(data_vector_dict['z_lens'], dtype=float))
+                                 for data_vector_dict in data_vector_list]),
+        'z_src':np.concatenate([np.atleast_1d(np.asarray(data_vector_dict['z_src'], dtype=float))
+                                for data_vector_dict in data_vector_list]),
+        'td_likelihood_prefactors':concatenate('td_likelihood_prefactors')
+    }
+    # lenses w/out kappa_ext get (1-0)
+    if all(data_vector_dict.get('kappa_ext_samples') is None
+           for data_vector_dict in data_vector_list):
+        packed_data_vector['kappa_ext_samples'] = None
+    else:
+        packed_data_vector['kappa_ext_samples'] = np.concatenate([
+            np.zeros(data_vector_dict['fpd_samples'].shape[:2],
+                     dtype=packed_likelihood.sample_dtype)
+            if data_vector_dict.get('kappa_ext_samples') is None
+            else data_vector_dict['kappa_ext_samples']
+            for data_vector_dict in data_vector_list])
+    if packed_likelihood.use_gamma_info:
+        packed_data_vector['gamma_pred_samples'] = concatenate('gamma_pred_samples')
+        packed_data_vector['log_prob_gamma_samps_nu_int'] = concatenate(
+            'log_prob_gamma_samps_nu_int')
+
+    if packed_likelihood.use_td_suff_stats or packed_likelihood.marginalize_lambda_int:
+        for key in ['td_aPa', 'td_aPm', 'td_mPm']:
+            packed_data_vector[key] = concatenate(key)
+    if not packed_likelihood.use_td_suff_stats:
+        packed_td = pack_quadratic_form(
+            [data_vector_dict['fpd_samples'] for data_vector_dict in data_vector_list],
+            [data_vector_dict['td_measured'] for data_vector_dict in data_vector_list],
+            [data_vector_dict['td_likelihood_prec'] for data_vector_dict in data_vector_list])
+        packed_data_vector['fpd_samples'] = packed_td['pred_samples']
+        packed_data_vector['td_measured'] = packed_td['measured']
+        packed_data_vector['delay_offsets'] = packed_td['offsets']
+        packed_data_vector['td_pair_indices'] = packed_td['pair_indices']
+        packed_data_vector['td_pair_prec'] = packed_td['pair_prec']
+        packed_data_vector['td_pair_offsets'] = packed_td['pair_offsets']
+
+    if len(kin_data_vector_list) > 0:
+        packed_data_vector['sigma_v_likelihood_prefactors'] = concatenate(
+            'sigma_v_likelihood_prefactors', kin_only=True)
+        if packed_likelihood.cosmo_model in ['LCDM_lambda_int_beta_ani',
+                                             'w0waCDM_lambda_int_beta_ani']:
+            for key in ['beta_ani_samples', 'log_prob_beta_ani_samps_nu_int']:
+                packed_data_vector[key] = concatenate(key, kin_only=True)
+        if packed_likelihood.use_kin_suff_stats:
+            for key in ['sigma_v_aPa', 'sigma_v_aPm', 'sigma_v_mPm']:
+                packed_data_vector[key] = concatenate(key, kin_only=True)
+        else:
+            packed_kin = pack_quadratic_form(
+                [data_vector_dict['kin_pred_samples'] for data_vector_dict in kin_data_vector_list],
+                [data_vector_dict['sigma_v_measured'] for data_vector_dict in kin_data_vector_list],
+                [data_vector_dict['sigma_v_likelihood_prec'] for data_vector_dict in kin_data_vector_list])
+            packed_data_vector['kin_pred_samples'] = packed_kin['pred_samples']
+            packed_data_vector['sigma_v_measured'] = packed_kin['measured']
+            packed_data_vector['kin_bin_offsets'] = packed_kin['offsets']
+            packed_data_vector['sigma_v_pair_indices'] = packed_kin['pair_indices']
+            packed_data_vector['sigma_v_pair_prec'] = packed_kin['pair_prec']
+            packed_data_vector['sigma_v_pair_offsets'] = packed_kin['pair_offsets']
+
+    return packed_data_vector
+
+def packed_residuals(pred_samples, scaling, measured, offsets):
+    """x - m for every entry of the ragged layout, w/ x = s * pred_samples
+        and s the per-sample scaling of the entry's lens
+
+    Args:
+        pred_samples (n_entries,n_fpd_samples): see pack_quadratic_form()
+        scaling ([n_walkers],n_lenses,n_fpd_samples): i.e. from
+            td_scaling_from_fpd_pred()
+        measured (n_entries)
+        offsets (n_lenses+1)
+
+    Returns:
+        ([n_walkers],n_entries,n_fpd_samples)
+    """
+
+    entry_lens_indices = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    # gathered copy, then in place
+    x_minus_mu = scaling[..., entry_lens_indices, :]
+    x_minus_mu *= pred_samples
+    x_minus_mu -= measured.astype(x_minus_mu.dtype, copy=False)[:, np.newaxis]
+
+    return x_minus_mu
+
+def segment_quadratic_form(x_minus_mu, pair_indices, pair_prec, pair_offsets,
+                           out=None):
+    """(x-m)^T P (x-m) of every lens, as a segment sum over the precision
+        pairs of each lens (see pack_quadratic_form())
+
+    Args:
+        x_minus_mu ([n_walkers],n_entries,n_fpd_samples): from
+            packed_residuals()
+        pair_indices (n_pairs,2), pair_prec (n_pairs), pair_offsets
+            (n_lenses+1)
+        out ([n_walkers],n_lenses,n_fpd_samples): Default=None (allocated)
+
+    Returns:
+        ([n_walkers],n_lenses,n_fpd_samples)
+    """
+
+    products = x_minus_mu[..., pair_indices[:, 0], :]
+    products *= x_minus_mu[..., pair_indices[:, 1], :]
+    products *= pair_prec.astype(products.dtype, copy=False)[:, np.newaxis]
+
+    # every lens has >= 1 pair (checked in pack_quadratic_form()): 
+    #   reduceat() returns products[i] for an empty segment, not 0
+    return np.add.reduceat(products, pair_offsets[:-1], axis=-2, out=out)
+
+#######################
+# Likelihood Workspace
+#######################
+
+class LikelihoodWorkspace():
+
+    def __init__(self, sample_shape, buffer_dims, dtype=np.float64,
+                 buffer_dtypes=None):
+        """
+        Scratch arrays for the per-sample arithmetic of one likelihood object
+        (see TDCLikelihood.td_log_likelihoods_in_workspace()), so that a 
+        likelihood call does not allocate (n_lenses,n_fpd_samples,...) 
+        temporaries. One set of arrays, sized for the largest batch so far 
+        (i.e. n_walkers), is allocated & overwritten by every call: smaller
+        batches (single proposal, half of the walkers) get views of it. Not 
+        thread-safe: one workspace per likelihood object, ThreadedLikelihood
+        evaluates shards w/ their own likelihood objects.
+
+        Args:
+            sample_shape (tuple): (n_lenses,n_fpd_samples)
+            buffer_dims (dict): name -> trailing dims of each scratch array
+            dtype (np.dtype): i.e. the likelihood's sample_dtype
+            buffer_dtypes (dict): name -> dtype of the scratch arrays that 
+                do not follow dtype
+        """
+
+        self.sample_shape = tuple(sample_shape)
+        self.buffer_dims = buffer_dims
+        self.dtype = np.dtype(dtype)
+        self.buffer_dtypes = {} if buffer_dtypes is None else buffer_dtypes
+        # flat storage for batch_size proposals
+        self.batch_size = 0
+        self._storage = {}
+        # views of _storage, by batch shape
+        self._buffers = {}
+
+    def buffers(self, batch_shape=()):
+        """
+        Args:
+            batch_shape (tuple): () for a single proposal, (n_walkers,) for a
+                batch
+
+        Returns:
+            (dict): name -> np.array w/ shape batch_shape+sample_shape+dims
+                (contiguous views of the same storage for every batch shape)
+        """
+
+        batch_shape = tuple(batch_shape)
+        if batch_shape not in self._buffers:
+            batch_size = int(np.prod(batch_shape))
+            shapes = {key: self.sample_shape + tuple(dims)
+                      for key, dims in self.buffer_dims.items()}
+            if batch_size > self.batch_size:
+                # the previous storage (& its views) is released
+                self.batch_size = batch_size
+                self._storage = {key: np.empty(batch_size * int(np.prod(shape)),
+                                               dtype=self.buffer_dtypes.get(key, self.dtype))
+                                 for key, shape in shapes.items()}
+                self._buffers = {}
+            self._buffers[batch_shape] = {
+                key: self._storage[key][:batch_size * int(np.prod(shape))].reshape(
+                    batch_shape + shape)
+                for key, shape in shapes.items()}
+
+        return self._buffers[batch_shape]
+
+    def nbytes(self):
+        """
+        Returns:
+            int: bytes held by all scratch arrays
+        """
+
+        return sum(value.nbytes for value in self._storage.values())
+
+
+#########################
+# Distributed Likelihood
+#########################
+
+def lens_shard(num_lenses, num_shards, shard_index):
+    """
+    Args:
+        num_lenses (int)
+        num_shards (int): i.e. # of MPI ranks
+        shard_index (int): i.e. MPI rank
+
+    Returns:
+        slice: contiguous lens range owned by this shard (sizes differ by at
+            most one lens, may be empty if num_shards > num_lenses)
+    """
+
+    edges = np.linspace(0, num_lenses, num_shards + 1).round().astype(int)
+
+    return slice(edges[shard_index], edges[shard_index + 1])
+
+def shard_data_vector(data_vector_dict, lens_slice, copy_arrays=True):
+    """
+    Args:
+        data_vector_dict (dict): every array has the lens axis first
+        lens_slice (slice): from lens_shard()
+        copy_arrays (bool): If True, arrays are copied, so only the shard is 
+            read from a memory-mapped data vector. If False, arrays are views.
+
+    Returns:
+        dict: data vector w/ only these lenses
+    """
+
+    num_lenses = data_vector_dict['fpd_samples'].shape[0]
+    data_vector_shard = {}
+    for key, value in data_vector_dict.items():
+        if isinstance(value, np.ndarray) and value.ndim > 0 and value.shape[0] == num_lenses:
+            data_vector_shard[key] = value[lens_slice]
+            if copy_arrays:
+                data_vector_shard[key] = np.array(data_vector_shard[key])
+        else:
+            data_vector_shard[key] = value
+
+    return data_vector_shard
+
+def shard_likelihood(tdc_likelihood, lens_slice):
+    """
+    Args:
+        tdc_likelihood (TDCLikelihood)
+        lens_slice (slice): from lens_shard()
+
+    Returns:
+        copy of tdc_likelihood for this shard of its lenses
+    """
+
+    likelihood_shard = copy.copy(tdc_likelihood)
+    likelihood_shard.num_lenses = lens_slice.stop - lens_slice.start
+    # same lambda_int base uniforms as the un-sharded likelihood
+    likelihood_shard.lens_offset = tdc_likelihood.lens_offset + lens_slice.start
+    likelihood_shard._lambda_int_base_uniforms = None
+    likelihood_shard._jax_data_vector = None
+    likelihood_shard._jax_data_vector_source = None
+    # scratch arrays for the shard's # of lenses
+    likelihood_shard._workspace = None
+    # rebuilt for the shard's redshifts
+    likelihood_shard._distance_engine = None
+
+    return likelihood_shard
+
+def shard_log_likelihood(hyperparameters, tdc_likelihood_list,
+                         index_likelihood_list, likelihood_group=None):
+    """
+    Args:
+        hyperparameters ([float]): see log_posterior(), or a batch of
+            proposals w/ shape (n_walkers,n_params)
+        tdc_likelihood_list ([TDCLikelihood]): likelihoods of one shard
+        index_likelihood_list ([int]): their data vectors in 
+            data_vector_global
+        likelihood_group (LikelihoodGroup): If not None, used instead of 
+            the list
+
+    Returns:
+        np.array: summed log likelihood, shape=() or (n_walkers)
+    """
+
+    hyperparameters = np.asarray(hyperparameters, dtype=float)
+    if likelihood_group is not None:
+        log_likelihood = likelihood_group.full_log_likelihood(hyperparameters)
+    else:
+        log_likelihood = 0.
+        for tdc_likelihood, i in zip(tdc_likelihood_list, index_likelihood_list):
+            log_likelihood = log_likelihood + tdc_likelihood.full_log_likelihood(
+                hyperparameters, i)
+
+    return np.zeros(hyperparameters.shape[:-1]) + log_likelihood
+
+class DistributedLikelihood():
+
+    def __init__(self, tdc_likelihood_list, data_vector_list, comm=None,
+                 group_likelihoods=False):
+        """
+        Each MPI rank owns a disjoint shard of the lenses of every likelihood
+        object. The master (rank 0) broadcasts each proposal, every rank
+        evaluates the log likelihood of its own lenses, and the partial sums
+        are combined w/ an allreduce. The other ranks wait in wait() until the
+        master calls close().
+
+        NOTE: data_vector_global must be set to self.data_vector_list on every
+            rank before evaluating (done in fast_TDC()).
+
+        Args:
+            tdc_likelihood_list ([TDCLikelihood]): likelihoods for all lenses
+            data_vector_list ([dict]): data vectors for all lenses (i.e. 
+                memory-mapped, only this rank's shard is read)
+            comm (mpi4py.MPI.Comm): Default=MPI.COMM_WORLD
+            group_likelihoods (bool): If True, the local shards are evaluated
+                as a LikelihoodGroup
+        """
+
+        if comm is None:
+            from mpi4py import MPI
+            comm = MPI.COMM_WORLD
+        self.comm = comm
+        self.rank = comm.Get_rank()
+        self.num_ranks = comm.Get_size()
+        self.cosmo_model = tdc_likelihood_list[0].cosmo_model
+
+        self.data_vector_list = []
+        self.local_likelihood_list = []
+        self.local_index_list = []
+        for i, (tdc_likelihood, data_vector_dict) in enumerate(zip(
+                tdc_likelihood_list, data_vector_list)):
+            lens_slice = lens_shard(tdc_likelihood.num_lenses, self.num_ranks,
+                                    self.rank)
+            self.data_vector_list.append(shard_data_vector(data_vector_dict,
+                                                           lens_slice))
+            num_local_lenses = lens_slice.stop - lens_slice.start
+            if num_local_lenses > 0:
+                self.local_likelihood_list.append(shard_likelihood(
+                    tdc_likelihood, lens_slice))
+                self.local_index_list.append(i)
+
+        add_missing_sufficient_statistics(
+            [self.data_vector_list[i] for i in self.local_index_list],
+            self.local_likelihood_list)
+
+        self.local_group = None
+        if group_likelihoods and len(self.local_likelihood_list) > 0:
+            self.local_group = LikelihoodGroup(self.local_likelihood_list,
+                                               self.local_index_list)
+
+    def is_master(self):
+        return self.rank == 0
+
+    def local_log_likelihood(self, hyperparameters):
+        """
+        Args:
+            hyperparameters ([float]): see log_posterior(), or a batch of
+                proposals w/ shape (n_walkers,n_params)
+
+        Returns:
+            np.array: log likelihood of this rank's lenses, shape=() or
+                (n_walkers)
+        """
+
+        return shard_log_likelihood(hyperparameters, self.local_likelihood_list,
+                                    self.local_index_list, self.local_group)
+
+    def _reduce_log_likelihood(self, hyperparameters):
+        from mpi4py import MPI
+
+        local = np.atleast_1d(self.local_log_likelihood(hyperparameters))
+        total = np.empty_like(local)
+        self.comm.Allreduce(local, total, op=MPI.SUM)
+
+        return total
+
+    def full_log_likelihood(self, hyperparameters):
+        """Called on the master only (see log_posterior())
+
+        Returns:
+            log_likelihood (float, or (n_walkers) array for a batch): summed 
+                over the lenses of all ranks
+        """
+
+        hyperparameters = np.asarray(hyperparameters, dtype=float)
+        self.comm.bcast(hyperparameters, root=0)
+        log_likelihood = self._reduce_log_likelihood(hyperparameters)
+        if hyperparameters.ndim > 1:
+            return log_likelihood
+
+        return log_likelihood[0]
+
+    def wait(self):
+        """Evaluates this rank's shard for every proposal broadcast by the
+            master, until close()
+        """
+
+        while True:
+            hyperparameters = self.comm.bcast(None, root=0)
+            if hyperparameters is None:
+                break
+            self._reduce_log_likelihood(hyperparameters)
+
+    def close(self):
+        """Called on the master only, releases the other ranks from wait()
+        """
+
+        self.comm.bcast(None, root=0)
+
+
+class ThreadedLikelihood():
+
+    def __init__(self, tdc_likelihood_list, data_vector_list, num_threads=None,
+                 num_chunks=None, group_likelihoods=False):
+        """
+        Splits the lenses of every likelihood object into chunks that are 
+        evaluated concurrently by a thread pool (the per-sample exp, 
+        reweighting and sample mean are numpy calls that release the GIL), 
+        the per-chunk log likelihoods are then summed.
+
+        NOTE: data_vector_global must be set to self.data_vector_list before
+            evaluating (done in fast_TDC()). num_threads is independent of 
+            the BLAS threads (i.e. OMP_NUM_THREADS), set those to 1 to avoid
+            oversubscription.
+
+        NOTE: pickled copies do not carry the data vectors, they can only be
+            evaluated in fork-started worker processes, which inherit 
+            data_vector_global (spawn / forkserver / MPI workers raise a 
+            ValueError, see LikelihoodWorkerPool for those).
+
+        Args:
+            tdc_likelihood_list ([TDCLikelihood])
+            data_vector_list ([dict]): w/ the sufficient statistics (if used), 
+                chunks are views (no copy)
+            num_threads (int): Default=os.cpu_count()
+            num_chunks (int): # of lens chunks per likelihood object. 
+                Default=num_threads
+            group_likelihoods (bool): If True, each chunk is evaluated as a
+                LikelihoodGroup
+        """
+
+        if num_threads is None:
+            num_threads = os.cpu_count()
+        if num_chunks is None:
+            num_chunks = num_threads
+        self.num_threads = num_threads
+        self.num_chunks = num_chunks
+        self.cosmo_model = tdc_likelihood_list[0].cosmo_model
+
+        # chunk c of likelihood i is data_vector_list[c*len(tdc_likelihood_list)+i]
+        self.data_vector_list = []
+        self.chunk_likelihood_lists = []
+        self.chunk_index_lists = []
+        self.chunk_groups = []
+        for c in range(num_chunks):
+            chunk_likelihood_list = []
+            chunk_index_list = []
+            for tdc_likelihood, data_vector_dict in zip(tdc_likelihood_list,
+                                                        data_vector_list):
+                lens_slice = lens_shard(tdc_likelihood.num_lenses, num_chunks, c)
+                num_chunk_lenses = lens_slice.stop - lens_slice.start
+                if num_chunk_lenses > 0:
+                    chunk_likelihood_list.append(shard_likelihood(
+                        tdc_likelihood, lens_slice))
+                    chunk_index_list.append(len(self.data_vector_list))
+                self.data_vector_list.append(shard_data_vector(
+                    data_vector_dict, lens_slice, copy_arrays=False))
+            if len(chunk_likelihood_list) == 0:
+                continue
+            self.chunk_likelihood_lists.append(chunk_likelihood_list)
+            self.chunk_index_lists.append(chunk_index_list)
+            self.chunk_groups.append(LikelihoodGroup(chunk_likelihood_list,
+                chunk_index_list) if group_likelihoods else None)
+
+        self.num_data_vectors = len(self.data_vector_list)
+        # started on first use (also in each worker process)
+        self._executor = None
+
+    def __getstate__(self):
+        # sent to worker processes (w/ every task of a Pool): threads can not 
+        #   be pickled, chunks are read from the (fork-inherited) 
+        #   data_vector_global instead of sending the data vectors
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        state['data_vector_list'] = None
+        return state
+
+    def check_data_vector_global(self):
+        """Raises a ValueError if data_vector_global does not hold the chunks
+            of this object, i.e. in a pickled copy evaluated by a process 
+            that was not forked after fast_TDC() set it
+        """
+
+        data_vector_list = globals().get('data_vector_global')
+        if (data_vector_list is None or
+                len(data_vector_list) != self.num_data_vectors or any(
+                data_vector_list[i]['fpd_samples'].shape[0] !=
+                tdc_likelihood.num_lenses
+                for chunk_likelihood_list, chunk_index_list in zip(
+                    self.chunk_likelihood_lists, self.chunk_index_lists)
+                for tdc_likelihood, i in zip(chunk_likelihood_list,
+                                             chunk_index_list))):
+            raise ValueError("data_vector_global does not hold the lens "+
+                             "chunks of this ThreadedLikelihood: pickled "+
+                             "copies are only valid in fork-started workers")
+
+    def chunk_log_likelihood(self, c, hyperparameters):
+        """
+        Returns:
+            np.array: log likelihood of chunk c, shape=() or (n_walkers)
+        """
+
+        return shard_log_likelihood(hyperparameters,
+            self.chunk_likelihood_lists[c], self.chunk_index_lists[c],
+            self.chunk_groups[c])
+
+    def full_log_likelihood(self, hyperparameters):
+        """
+        Returns:
+            log_likelihood (float, or (n_walkers) array for a batch): summed 
+                over all chunks
+        """
+
+        hyperparameters = np.asarray(hyperparameters, dtype=float)
+        if self.data_vector_list is None:
+            # unpickled copy
+            self.check_data_vector_global()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.num_threads)
+        chunk_log_likelihoods = list(self._executor.map(
+            partial(self.chunk_log_likelihood, hyperparameters=hyperparameters),
+            range(len(self.chunk_likelihood_lists))))
+        log_likelihood = np.sum(chunk_log_likelihoods, axis=0)
+        if hyperparameters.ndim > 1:
+            return log_likelihood
+
+        return float(log_likelihood)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+################
+# JAX Likelihood
+################
+
+class JaxLikelihood():
+
+    def __init__(self, tdc_likelihood_list, index_likelihood_list=None,
+                 seed=None):
+        """
+        Evaluates several likelihood objects w/ a single jax.jit function 
+        over device-resident data vectors: the whole path from the 
+        hyperparameter vector to the summed log likelihood (distances, 
+        lambda_int/kappa_ext scaling, time-delay & kinematic terms, 
+        reweighting, log-mean-exp over fpd samples, sum over lenses) is 
+        compiled once. A batch of proposals goes through jax.vmap of the same
+        function.
+
+        Distances use the Gauss-Legendre rule of tdc_utils.W0waCDMDistanceEngine
+        (the members' distance settings are not used). W/ lambda_int_seed, 
+        the members' base uniforms are used and the result matches the numpy
+        path. Otherwise, lambda_int is drawn w/ jax.random.
+
+        NOTE: data_vector_global must be set before the first evaluation 
+            (the data vectors are copied to the device then, unless already 
+            done by prepare_jax_data_vectors()).
+
+        Args:
+            tdc_likelihood_list ([TDCLikelihood]): must share cosmo_model
+            index_likelihood_list ([int]): index of each member's data vector 
+                in data_vector_global. Default: 0,...,len(tdc_likelihood_list)-1
+            seed (int): seed of the jax.random stream for lambda_int draws. 
+                Default: drawn from np.random
+        """
+
+        self.tdc_likelihood_list = list(tdc_likelihood_list)
+        if index_likelihood_list is None:
+            index_likelihood_list = range(len(self.tdc_likelihood_list))
+        self.index_likelihood_list = list(index_likelihood_list)
+
+        self.cosmo_model = self.tdc_likelihood_list[0].cosmo_model
+        for tdc_likelihood in self.tdc_likelihood_list[1:]:
+            if tdc_likelihood.cosmo_model != self.cosmo_model:
+                raise ValueError("all likelihoods must share cosmo_model")
+
+        if seed is None:
+            seed = np.random.randint(2**31)
+        self._key = jax.random.PRNGKey(seed)
+
+        # set on first use
+        self._device_data_list = None
+        self._log_likelihood_fn = None
+        self._batch_log_likelihood_fn = None
+
+    def __getstate__(self):
+        # device arrays & compiled functions are rebuilt in other processes
+        state = self.__dict__.copy()
+        state['_key'] = np.asarray(self._key)
+        state['_device_data_list'] = None
+        state['_log_likelihood_fn'] = None
+        state['_batch_log_likelihood_fn'] = None
+        return state
+
+    @staticmethod
+    def likelihood_settings(tdc_likelihood):
+        """
+        Returns:
+            (dict): python values that select the branches of 
+                tdc_jax_utils.jax_log_likelihood()
+        """
+
+        use_kinematics = isinstance(tdc_likelihood, TDCKinLikelihood)
+
+        return {
+            'cosmo_model':tdc_likelihood.cosmo_model,
+            'use_gamma_info':tdc_likelihood.use_gamma_info,
+            'use_td_suff_stats':tdc_likelihood.use_td_suff_stats,
+            'marginalize_lambda_int':tdc_likelihood.marginalize_lambda_int,
+            'use_kinematics':use_kinematics,
+            'use_kin_suff_stats':use_kinematics and tdc_likelihood.use_kin_suff_stats
+        }
+
+    @staticmethod
+    def device_data_vector(tdc_likelihood, data_vector_dict):
+        """
+        Args:
+            tdc_likelihood (TDCLikelihood)
+            data_vector_dict (dict): w/ the sufficient statistics (if used)
+
+        Returns:
+            (dict): jnp arrays used by tdc_jax_utils.jax_log_likelihood(), 
+                measurements as (n_lenses,1,...) (see per_sample_measurement())
+        """
+
+        settings = JaxLikelihood.likelihood_settings(tdc_likelihood)
+        # Gauss-Legendre nodes for the lens & source redshifts
+        engine = tdc_utils.W0waCDMDistanceEngine(data_vector_dict['z_lens'],
+            data_vector_dict['z_src'], cache_size=0)
+        data = {'gl_' + key:value for key, value in 
+                engine.gauss_legendre_tables().items()}
+        data['gamma_pred_samples'] = data_vector_dict['gamma_pred_samples']
+
+        keys = ['td_likelihood_prefactors']
+        if settings['use_td_suff_stats'] or settings['marginalize_lambda_int']:
+            keys += ['td_aPa', 'td_aPm', 'td_mPm']
+        else:
+            keys += ['fpd_samples', 'td_measured', 'td_likelihood_prec']
+        if settings['use_kinematics']:
+            keys += ['sigma_v_likelihood_prefactors']
+            if settings['use_kin_suff_stats']:
+                keys += ['sigma_v_aPa', 'sigma_v_aPm', 'sigma_v_mPm']
+            else:
+                keys += ['kin_pred_samples', 'sigma_v_measured',
+                         'sigma_v_likelihood_prec']
+            if settings['cosmo_model'] in ['LCDM_lambda_int_beta_ani',
+                                           'w0waCDM_lambda_int_beta_ani']:
+                keys += ['beta_ani_samples', 'log_prob_beta_ani_samps_nu_int']
+        if settings['use_gamma_info']:
+            keys += ['log_prob_gamma_samps_nu_int']
+        if data_vector_dict['kappa_ext_samples'] is not None:
+            keys += ['kappa_ext_samples']
+        for key in keys:
+            if key in PER_LENS_MEASUREMENT_DIMS:
+                data[key] = per_sample_measurement(data_vector_dict, key)
+            else:
+                data[key] = data_vector_dict[key]
+
+        if (tdc_likelihood.lambda_int_seed is not None and 
+                not settings['marginalize_lambda_int'] and
+                settings['cosmo_model'] in jax_utils.LAMBDA_INT_INDICES):
+            data['lambda_int_base_uniforms'] = tdc_likelihood.lambda_int_base_uniforms()
+
+        return {key: jnp.asarray(value, dtype=float) for key, value in data.items()}
+
+    def build(self):
+        """Collects the members' device data vectors & traces the jitted 
+            functions (compiled on the first call)
+        """
+
+        self._device_data_list = prepare_jax_data_vectors(
+            self.tdc_likelihood_list, self.index_likelihood_list)
+        settings_list = [self.likelihood_settings(tdc_likelihood)
+                         for tdc_likelihood in self.tdc_likelihood_list]
+
+        def log_likelihood(hyperparameters, key, device_data_list):
+            member_keys = jax.random.split(key, len(settings_list))
+            total = 0.
+            for m, (data, settings) in enumerate(zip(device_data_list,
+                                                     settings_list)):
+                total = total + jax_utils.jax_log_likelihood(hyperparameters,
+                    member_keys[m], data, settings)
+            return total
+
+        # the random key is advanced inside the jitted call, so only the 
+        #   proposal is transferred per evaluation
+        def single_log_likelihood(hyperparameters, key, device_data_list):
+            key, subkey = jax.random.split(key)
+            return log_likelihood(hyperparameters, subkey, device_data_list), key
+
+        def batch_log_likelihood(hyperparameters, key, device_data_list):
+            key, subkey = jax.random.split(key)
+            walker_keys = jax.random.split(subkey, hyperparameters.shape[0])
+            return jax.vmap(log_likelihood, in_axes=(0, 0, None))(
+                hyperparameters, walker_keys, device_data_list), key
+
+        self._log_likelihood_fn = jax.jit(single_log_likelihood)
+        self._batch_log_likelihood_fn = jax.jit(batch_log_likelihood)
+
+    def compile(self, hyperparameters):
+        """Ahead-of-time lowering & compilation for the fixed data vector 
+            shapes & proposals shaped like hyperparameters (w/ 
+            tdc_utils.enable_jax_compilation_cache(), loaded from disk if 
+            another process already compiled it), then one call on 
+            placeholder proposals, so the next call w/ this shape neither 
+            traces nor compiles
+
+        Args:
+            hyperparameters (np.array): (n_params) or (n_walkers,n_params),
+                only the shape is used
+
+        Returns:
+            int: # of compiled programs
+        """
+
+        if self._device_data_list is None:
+            self.build()
+
+        hyperparameters = np.asarray(hyperparameters, dtype=float)
+        jitted_fn = (self._batch_log_likelihood_fn if hyperparameters.ndim > 1
+                     else self._log_likelihood_fn)
+        tdc_utils.aot_compile(jitted_fn, jax.ShapeDtypeStruct(
+            hyperparameters.shape, hyperparameters.dtype), self._key,
+            self._device_data_list)
+        # the AOT program is not registered in jitted_fn's dispatch cache,
+        #   one call on placeholder proposals is (the PRNG key is unchanged)
+        jax.block_until_ready(jitted_fn(np.zeros_like(hyperparameters),
+            self._key, self._device_data_list))
+
+        return 1
+
+    def full_log_likelihood(self, hyperparameters):
+        """
+        Args:
+            hyperparameters ([float]): see log_posterior(), or a batch of
+                proposals w/ shape (n_walkers,n_params)
+
+        Returns:
+            log_likelihood (float, or (n_walkers) array for a batch): summed 
+                over all members
+        """
+
+        if self._device_data_list is None:
+            self.build()
+
+        hyperparameters = np.asarray(hyperparameters, dtype=float)
+        if hyperparameters.ndim > 1:
+            log_likelihood, self._key = self._batch_log_likelihood_fn(
+                hyperparameters, self._key, self._device_data_list)
+            return np.asarray(log_likelihood)
+
+        log_likelihood, self._key = self._log_likelihood_fn(hyperparameters,
+            self._key, self._device_data_list)
+
+        return float(log_likelihood)
+
+
+def prepare_jax_data_vectors(tdc_likelihood_list, index_likelihood_list=None):
+    """Setup stage of the JAX backend: copies each likelihood's data vector 
+        from data_vector_global to the device once (kept on the likelihood
+        object, see TDCLikelihood.jax_data_vector()), so evaluations only 
+        transfer the proposal
+
+    Args:
+        tdc_likelihood_list ([TDCLikelihood])
+        index_likelihood_list ([int]): see JaxLikelihood
+
+    Returns:
+        [dict]: device data vectors, one per likelihood
+    """
+
+    if index_likelihood_list is None:
+        index_likelihood_list = range(len(tdc_likelihood_list))
+
+    device_data_list = [tdc_likelihood.jax_data_vector(i) for tdc_likelihood, i
+                        in zip(tdc_likelihood_list, index_likelihood_list)]
+    jax.block_until_ready(device_data_list)
+
+    return device_data_list
+
+def warm_up_likelihoods(tdc_likelihood_list, hyperparameters,
+                        index_likelihood_list=None):
+    """Ahead-of-time compilation of every jitted function evaluated by 
+        total_log_likelihood(hyperparameters, tdc_likelihood_list), for the
+        shapes of this process' data vectors (see JaxLikelihood.compile() & 
+        TDCLikelihood.warm_up_jax()). Nothing to do for numpy-only 
+        likelihoods.
+
+    Args:
+        tdc_likelihood_list ([TDCLikelihood], LikelihoodGroup, 
+            DistributedLikelihood, ThreadedLikelihood, or JaxLikelihood)
+        hyperparameters (np.array): (n_params) or (n_walkers,n_params), only
+            the shape is used
+        index_likelihood_list ([int]): data vectors of a list of 
+            likelihoods in data_vector_global. Default: 0,1,...
+
+    Returns:
+        int: # of compiled programs
+    """
+
+    if isinstance(tdc_likelihood_list, JaxLikelihood):
+        return tdc_likelihood_list.compile(hyperparameters)
+    elif isinstance(tdc_likelihood_list, LikelihoodGroup):
+        return tdc_likelihood_list.tdc_likelihood_list[0].warm_up_jax(
+            hyperparameters, *tdc_likelihood_list.concatenate_redshifts())
+    elif isinstance(tdc_likelihood_list, DistributedLikelihood):
+        if tdc_likelihood_list.local_group is not None:
+            return warm_up_likelihoods(tdc_likelihood_list.local_group,
+                                       hyperparameters)
+        return warm_up_likelihoods(tdc_likelihood_list.local_likelihood_list,
+            hyperparameters, tdc_likelihood_list.local_index_list)
+    elif isinstance(tdc_likelihood_list, ThreadedLikelihood):
+        num_compiled = 0
+        for c in range(len(tdc_likelihood_list.chunk_likelihood_lists)):
+            if tdc_likelihood_list.chunk_groups[c] is not None:
+                num_compiled += warm_up_likelihoods(
+                    tdc_likelihood_list.chunk_groups[c], hyperparameters)
+            else:
+                num_compiled += warm_up_likelihoods(
+                    tdc_likelihood_list.chunk_likelihood_lists[c],
+                    hyperparameters, tdc_likelihood_list.chunk_index_lists[c])
+        return num_compiled
+
+    if index_likelihood_list is None:
+        index_likelihood_list = range(len(tdc_likelihood_list))
+    num_compiled = 0
+    for tdc_likelihood, i in zip(tdc_likelihood_list, index_likelihood_list):
+        num_compiled += tdc_likelihood.warm_up_jax(hyperparameters,
+            data_vector_global[i]['z_lens'], data_vector_global[i]['z_src'])
+
+    return num_compiled
+
+def proposal_shaped_hyperparameters(n_walkers, cosmo_model, vectorize=False):
+    """Placeholder proposals w/ every shape log_posterior() is called with 
+        by emcee's default (stretch) move, for warm_up_likelihoods(): w/ 
+        vectorize=True, the initial state (n_walkers,n_params), then each 
+        half of the ensemble per step, (n_walkers//2,n_params) (and 
+        (n_walkers-n_walkers//2,n_params) if n_walkers is odd)
+
+    Args:
+        n_walkers (int)
+        cosmo_model (string)
+        vectorize (bool): see fast_TDC()
+
+    Returns:
+        [np.array]: zeros, one per distinct shape
+    """
+
+    n_params = NUM_HYPERPARAMETERS[cosmo_model]
+    if not vectorize:
+        return [np.zeros(n_params)]
+
+    batch_sizes = sorted({n_walkers, n_walkers // 2, n_walkers - n_walkers // 2},
+                         reverse=True)
+
+    return [np.zeros((batch_size, n_params)) for batch_size in batch_sizes]
+
+
+######################
+# Parallel Scheduling
+######################
+
+# walker groups = worker processes (each evaluates whole walkers), 
+#   n_threads = lens chunks evaluated concurrently within each process
+HybridSchedule = namedtuple('HybridSchedule',
+    ['n_walker_groups', 'n_threads', 'predicted_step_time'])
+
+def calibrate_lens_cost(tdc_likelihood_list, data_vector_list, hyperparameters,
+                        num_repeats=3):
+    """Times one (serial) likelihood call on all lenses and on ~1/4 of the
+        lenses, and fits time = per_call_overhead + per_lens_cost*n_lenses
+
+    Args:
+        tdc_likelihood_list ([TDCLikelihood])
+        data_vector_list ([dict]): w/ sufficient statistics (if used)
+        hyperparameters ([float]): one proposal (i.e. an initial walker)
+        num_repeats (int)
+
+    Returns:
+        per_call_overhead (float), per_lens_cost (float): in seconds
+    """
+
+    global data_vector_global
+    previous_data_vector_global = data_vector_global
+    # chunk 0 of 4 (as evaluated by one thread)
+    quarter = ThreadedLikelihood(tdc_likelihood_list, data_vector_list,
+                                 num_threads=1, num_chunks=4)
+
+    def time_call(my_data_vector_list, *args):
+        global data_vector_global
+        data_vector_global = my_data_vector_list
+        shard_log_likelihood(hyperparameters, *args)
+        tik = time.time()
+        for _ in range(num_repeats):
+            shard_log_likelihood(hyperparameters, *args)
+        return (time.time() - tik) / num_repeats
+
+    try:
+        time_all = time_call(data_vector_list, tdc_likelihood_list,
+                             range(len(tdc_likelihood_list)))
+        time_quarter = time_call(quarter.data_vector_list,
+                                 quarter.chunk_likelihood_lists[0],
+                                 quarter.chunk_index_lists[0])
+    finally:
+        data_vector_global = previous_data_vector_global
+
+    num_lenses = sum(tdc_likelihood.num_lenses for tdc_likelihood in tdc_likelihood_list)
+    num_lenses_quarter = sum(tdc_likelihood.num_lenses for tdc_likelihood in 
+                             quarter.chunk_likelihood_lists[0])
+    # w/ timing noise larger than the lens cost, all time is per lens
+    if num_lenses_quarter == num_lenses or time_all <= time_quarter:
+        return 0., time_all / num_lenses
+    per_lens_cost = (time_all - time_quarter) / (num_lenses - num_lenses_quarter)
+    per_call_overhead = max(time_all - per_lens_cost * num_lenses, 0.)
+
+    return per_call_overhead, per_lens_cost
+
+def plan_hybrid_schedule(num_cores, n_walkers, num_lenses, per_call_overhead,
+                         per_lens_cost):
+    """Splits a core budget into walker groups x lens threads
+
+    emcee proposes n_walkers/2 walkers at a time (2 half-steps per step), 
+    each walker group evaluates its share of them one after the other, 
+    each call costs per_call_overhead + per_lens_cost*num_lenses/n_threads.
+
+    Args:
+        num_cores (int): total core budget
+        n_walkers (int): # of emcee walkers
+        num_lenses (int): summed over all likelihood objects
+        per_call_overhead (float), per_lens_cost (float): seconds, from 
+            calibrate_lens_cost()
+
+    Returns:
+        HybridSchedule w/ the smallest predicted time per emcee step (ties go
+            to fewer threads)
+    """
+
+    best = None
+    for n_walker_groups in range(1, max(min(num_cores, n_walkers // 2), 1) + 1):
+        n_threads = max(min(num_cores // n_walker_groups, num_lenses), 1)
+        calls_per_group = -(-(n_walkers // 2) // n_walker_groups)
+        step_time = 2 * calls_per_group * (per_call_overhead +
+                                           per_lens_cost * num_lenses / n_threads)
+        if best is None or step_time <= best.predicted_step_time:
+            best = HybridSchedule(n_walker_groups, n_threads, step_time)
+
+    return best
+
+
+##############
+# Worker Pool
+##############
+
+# set once per worker process by init_likelihood_worker()
+worker_likelihood_list = None
+worker_cosmo_model = None
+
+def load_data_vector_source(data_vector_source):
+    """
+    Args:
+        data_vector_source: one of
+            - [dict]: the data vectors (pickled once per worker)
+            - string: .h5 file from Utils.data_vector_io (memory-mapped)
+            - (string, [dict]): shared memory name & layout from 
+                Utils.shared_data_vectors.share_data_vectors_posix()
+
+    Returns:
+        [dict]: data vectors
+    """
+
+    if isinstance(data_vector_source, str):
+        from Utils.data_vector_io import read_data_vectors_h5
+        return read_data_vectors_h5(data_vector_source, mmap=True)
+    elif isinstance(data_vector_source, tuple):
+        from Utils.shared_data_vectors import attach_data_vectors_posix
+        return attach_data_vectors_posix(*data_vector_source)
+
+    return data_vector_source
+
+def init_likelihood_worker(tdc_likelihood_list, data_vector_source, cosmo_model,
+                           likelihood_threads=None, group_likelihoods=False,
+                           jax_cache_dir=None, pack_likelihoods=False):
+    """Pool initializer: loads/attaches the data vectors and builds the
+        likelihood objects once per worker process (works w/ the fork and 
+        spawn start methods)
+
+    Args:
+        tdc_likelihood_list ([TDCLikelihood])
+        data_vector_source: see load_data_vector_source(), w/ the sufficient
+            statistics (if used)
+        cosmo_model (string)
+        likelihood_threads (int): If not None, the worker evaluates lens 
+            chunks w/ this many threads (ThreadedLikelihood)
+        group_likelihoods (bool): If True, evaluated as a LikelihoodGroup
+        jax_cache_dir (string): If not None, persistent jax compilation 
+            cache (programs compiled by another worker are loaded from disk)
+        pack_likelihoods (bool): If True, data_vector_source holds the 
+            packed data vector of tdc_likelihood_list (see 
+            pack_data_vectors()), evaluated by one PackedLikelihood
+    """
+
+    global data_vector_global, worker_likelihood_list, worker_cosmo_model
+    if jax_cache_dir is not None:
+        tdc_utils.enable_jax_compilation_cache(jax_cache_dir)
+    data_vector_global = load_data_vector_source(data_vector_source)
+    worker_likelihood_list = list(tdc_likelihood_list)
+    if pack_likelihoods:
+        worker_likelihood_list = [PackedLikelihood(worker_likelihood_list)]
+    elif likelihood_threads is not None:
+        worker_likelihood_list = ThreadedLikelihood(worker_likelihood_list,
+            data_vector_global, num_threads=likelihood_threads,
+            group_likelihoods=group_likelihoods)
+        data_vector_global = worker_likelihood_list.data_vector_list
+    elif group_likelihoods:
+        worker_likelihood_list = LikelihoodGroup(worker_likelihood_list)
+    worker_cosmo_model = cosmo_model
+    # tables written by the master are loaded, not rebuilt
+    prepare_distance_engines(worker_likelihood_list)
+    # compiled before the first proposal arrives
+    warm_up_likelihoods(worker_likelihood_list,
+                        np.zeros(NUM_HYPERPARAMETERS[cosmo_model]))
+
+def worker_log_posterior(hyperparameters):
+    """log_posterior() w/ the likelihoods installed by init_likelihood_worker(),
+        only the proposal & its log probability cross the process boundary
+    """
+
+    return log_posterior(hyperparameters, worker_cosmo_model,
+                         worker_likelihood_list)
+
+def timed_call(fn, x):
+    """
+    Returns:
+        fn(x), seconds spent in fn (in the worker)
+    """
+
+    tik = time.time()
+    result = fn(x)
+
+    return result, time.time() - tik
+
+class LikelihoodWorkerPool():
+
+    def __init__(self, tdc_likelihood_list, data_vector_source, cosmo_model,
+                 processes=None, likelihood_threads=None, group_likelihoods=False,
+                 start_method=None, jax_cache_dir=None, pack_likelihoods=False):
+        """
+        Process pool whose workers install the likelihood objects & data 
+        vectors once (init_likelihood_worker()), for use as emcee's pool w/ 
+        worker_log_posterior. Also records per map() call the wall time & 
+        the time spent in the workers, the difference being the IPC (and 
+        scheduling) overhead.
+
+        Args:
+            tdc_likelihood_list ([TDCLikelihood])
+            data_vector_source: see load_data_vector_source()
+            cosmo_model (string)
+            processes (int): Default=os.cpu_count()
+            likelihood_threads (int), group_likelihoods (bool), 
+                jax_cache_dir (string), pack_likelihoods (bool): see 
+                init_likelihood_worker()
+            start_method (string): 'fork', 'spawn', 'forkserver', or None 
+                (platform default)
+        """
+
+        try:
+            import multiprocess as mp
+        except ImportError:
+            import multiprocessing as mp
+
+        if processes is None:
+            processes = os.cpu_count()
+        self.processes = processes
+        self._pool = mp.get_context(start_method).Pool(processes=processes,
+            initializer=init_likelihood_worker,
+            initargs=(tdc_likelihood_list, data_vector_source, cosmo_model,
+                      likelihood_threads, group_likelihoods, jax_cache_dir,
+                      pack_likelihoods))
+
+        self.wall_times = []
+        self.worker_times = []
+        self.payload_bytes = None
+
+    def map(self, fn, iterable):
+        """Same as Pool.map(), w/ timing
+        """
+
+        iterable = list(iterable)
+        if self.payload_bytes is None:
+            # what is pickled per task (the same every call)
+            self.payload_bytes = len(pickle.dumps((fn, iterable[0])))
+        tik = time.time()
+        results = self._pool.map(partial(timed_call, fn), iterable)
+        self.wall_times.append(time.time() - tik)
+        self.worker_times.append(sum(result[1] for result in results))
+
+        return [result[0] for result in results]
+
+    def ipc_overhead(self):
+        """
+        Returns:
+            np.array: per map() call, wall time minus the worker time spread 
+                evenly over the processes (seconds)
+        """
+
+        return (np.asarray(self.wall_times) -
+                np.asarray(self.worker_times) / self.processes)
+
+    def timing_summary(self):
+        """
+        Returns:
+            string: mean wall time, worker time & IPC overhead per map() call
+        """
+
+        if len(self.wall_times) == 0:
+            return "no map() calls"
+
+        return ("%d map() calls: %.4f s wall, %.4f s in workers (%d processes), "+
+                "%.4f s IPC overhead per call, %d bytes pickled per task") % (
+            len(self.wall_times), np.mean(self.wall_times),
+            np.mean(self.worker_times), self.processes,
+            np.mean(self.ipc_overhead()), self.payload_bytes)
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+####################
+# Data Vector Layout
+####################
+
+# per-lens measurements & their # of trailing (measurement) dims. These are
+#   stored compact, (n_lenses,...), and broadcast lazily against the fpd
+#   sample axis. Data vectors replicated across fpd samples,
+#   (n_lenses,n_fpd_samples,...), are still accepted.
+PER_LENS_MEASUREMENT_DIMS = {
+    'td_measured':1,
+    'td_likelihood_prec':2,
+    'td_likelihood_prefactors':0,
+    'td_mPm':0,
+    'sigma_v_measured':1,
+    'sigma_v_likelihood_prec':2,
+    'sigma_v_likelihood_prefactors':0,
+    'sigma_v_mPm':0
+}
+
+def per_sample_measurement(data_vector_dict, key, dtype=None):
+    """
+    Args:
+        data_vector_dict (dict)
+        key (string): one of PER_LENS_MEASUREMENT_DIMS
+        dtype (np.dtype): If not None, per-lens arrays are cast to dtype 
+            (i.e. the sample_dtype of the per-sample arithmetic, storage 
+            stays float64)
+
+    Returns:
+        data_vector_dict[key] as (n_lenses,1,...) view that broadcasts
+            against (n_lenses,n_fpd_samples,...) (no copy). Replicated
+            measurements are returned as is.
+    """
+
+    value = data_vector_dict[key]
+    if np.ndim(value) == PER_LENS_MEASUREMENT_DIMS[key] + 1:
+        if dtype is not None:
+            value = np.asarray(value).astype(dtype, copy=False)
+        return np.expand_dims(value, axis=1)
+
+    return value
+
+def gaussian_log_prefactors(likelihood_prec):
+    """
+    Args:
+        likelihood_prec (...,dim,dim): precision matrices
 
-        if self.use_astropy:
-            # instantiate astropy cosmology object
-            astropy_cosmo = w0waCDM(H0=h0_input,
-                                    Om0=omega_m_input, Ode0=omega_de_input,
-                                    w0=w0_input, wa=wa_input)
+    Returns:
+        log( (2pi)^(-dim/2) det(prec)^(1/2) ) w/ size:(...)
+    """
 
-            return astropy_cosmo
+    dim = np.shape(likelihood_prec)[-1]
+    _, log_det_prec = np.linalg.slogdet(likelihood_prec)
 
-        else:
-            # NOTE: baryonic fraction hardcoded to 0.05
-            my_jax_cosmo = jax_cosmo.Cosmology(h=jnp.float32(h0_input / 100),
-                                               Omega_c=jnp.float32(omega_c_input),  # "cold dark matter fraction"
-                                               Omega_b=jnp.float32(0.05),  # "baryonic fraction"
-                                               Omega_k=jnp.float32(0.),
-                                               w0=jnp.float32(w0_input),
-                                               wa=jnp.float32(wa_input), sigma8=jnp.float32(0.8), n_s=jnp.float32(0.96))
+    return -0.5 * dim * np.log(2 * np.pi) + 0.5 * log_det_prec
 
-            return my_jax_cosmo
+def log_mean_exp(log_terms, in_place=False):
+    """Importance sampling average in log space, shifted by the max. so 
+        that per-sample likelihoods far below 1 do not underflow to 0
 
-    def process_hyperparam_proposal(self, hyperparameters):
-        """
-        Args:
-            hyperparameters ():
-                - LCDM order: [H0,Omega_M,mu_gamma,sigma_gamma]
-                - LCDM_lambda_int order: [H0,Omega_M,mu_lambda_int,
-                    sigma_lambda_int,mu_gamma,sigma_gamma]
-                - w0waCDM order: [H0,Omega_M,w0,wa,mu_gamma,sigma_gamma]
-        Returns:
-            proposed_cosmo (default=jax_cosmo.Cosmology)
-            lambda_int_samples (): Set to None if no lambda_int in hypermodel.
-                If in hypermodel, shape=(num_lenses,num_fpd_samples)
-        """
+    Args:
+        log_terms (...,n_samples): i.e. per-sample log likelihoods
+        in_place (bool): If True, log_terms (i.e. a workspace buffer) is 
+            overwritten instead of allocating the exp temporaries
 
-        # importance sampling over lambda_int based on proposal distribution
-        lambda_int_samples = None
-        mu_lint = None
-        if self.cosmo_model == 'LCDM_lambda_int':
-            # NOTE: hardcoding of hyperparameter order!! (-4 is mu, -3 is sigma)
-            mu_lint = hyperparameters[-4]
-            sigma_lint = hyperparameters[-3]
-        elif self.cosmo_model == 'LCDM_lambda_int_beta_ani':
-            # NOTE: hardcoding of hyperparameter order!! (-6 is mu, -5 is sigma)
-            mu_lint = hyperparameters[-6]
-            sigma_lint = hyperparameters[-5]
-            # truncating to avoid values below 0 (unphysical)
-        elif self.cosmo_model == 'w0waCDM_lambda_int_beta_ani':
-            # NOTE: hardcoding of hyperparameter order!! (-6 is mu, -5 is sigma)
-            mu_lint = hyperparameters[-6]
-            sigma_lint = hyperparameters[-5]
-            # truncating to avoid values below 0 (unphysical)
+    Returns:
+        log(mean(exp(log_terms))) over the last axis, w/ size:(...). -inf 
+            only if every sample is -inf.
+    """
 
-        if mu_lint is not None:
-            lambda_int_samples = truncnorm.rvs(-mu_lint / sigma_lint, np.inf,
-                                               loc=mu_lint, scale=sigma_lint,
-                                               size=(self.num_lenses, self.num_fpd_samples))
+    log_terms = np.asarray(log_terms)
+    max_log_terms = np.max(log_terms, axis=-1, keepdims=True)
+    # all -inf: shift by 0 instead of -inf (-inf - -inf = nan)
+    max_log_terms = np.where(np.isfinite(max_log_terms), max_log_terms, 0.)
+    if in_place:
+        np.subtract(log_terms, max_log_terms, out=log_terms)
+        np.exp(log_terms, out=log_terms)
+    else:
+        log_terms = np.exp(log_terms - max_log_terms)
+    # accumulated in float64, whatever the sample dtype
+    with np.errstate(divide='ignore'):
+        return (np.log(np.mean(log_terms, axis=-1, dtype=ACCUMULATION_DTYPE))
+                + max_log_terms[..., 0])
+
+def sum_log_mean_exp(log_likelihoods, in_place=False):
+    """Log likelihood of a set of lenses, sum over lenses of log_mean_exp()
+        over the importance samples. Proposals are ruled out early across 
+        likelihood objects instead (see split_lens_chunks()).
 
-        return self.construct_proposed_cosmo(hyperparameters), lambda_int_samples
+    Args:
+        log_likelihoods (n_lenses,n_samples) or (n_walkers,n_lenses,n_samples):
+            per-sample log likelihoods
+        in_place (bool): see log_mean_exp()
 
-    def full_log_likelihood(self, hyperparameters, index_likelihood_list):
-        """
-        Args:
-            hyperparameters ([H0,mu_gamma,sigma_gamma] or [H0,w0,wa,mu_gamma,sigma_gamma])
-            fpd_pred_samples (size:(n_lenses,n_samples,3)): Note, it is assumed
-                that doubles are padded w/ zeros
-        """
+    Returns:
+        log_likelihood (float, or (n_walkers) array for a batch)
+    """
 
-        # construct cosmology + lint samps (if required) from hyperparameters
-        proposed_cosmo, lambda_int_samples = self.process_hyperparam_proposal(
-            hyperparameters)
+    return np.sum(log_mean_exp(log_likelihoods, in_place=in_place), axis=-1,
+                  dtype=ACCUMULATION_DTYPE)
 
-        # td_pred_samples from fpd_pred_samples
-        td_pred_samples = self.td_pred_from_fpd_pred(proposed_cosmo, index_likelihood_list,
-                                                     lambda_int_samples)
-        # TODO test jitting this
-        if USE_JAX:
-            td_log_likelihoods = jax_utils.jax_td_log_likelihood_per_samp(
-                jnp.asarray(td_pred_samples), jnp.asarray(data_vector_global[index_likelihood_list]['td_measured']),
-                jnp.asarray(data_vector_global[index_likelihood_list]['td_likelihood_prec']),
-                jnp.asarray(data_vector_global[index_likelihood_list]['td_likelihood_prefactors']))
-            td_log_likelihoods = np.asarray(td_log_likelihoods)
-        else:
-            td_log_likelihoods = self.td_log_likelihood_per_samp(
-                td_pred_samples, index_likelihood_list
-            )
+def compact_measurements(data_vector_dict):
+    """Converts measurements replicated across fpd samples (older data 
+        vectors) to the compact per-lens layout, in place
 
-        # reweighting factor
-        # NOTE: hardcoding of hyperparameter order!! (-2 is mu, -1 is sigma)
-        #TODO check this
-        if self.use_gamma_info:
-            eval_at_proposed_nu = norm.logpdf(data_vector_global[index_likelihood_list]['gamma_pred_samples'],
-                                              loc=hyperparameters[-2], scale=hyperparameters[-1])
-            rw_factor = eval_at_proposed_nu - data_vector_global[index_likelihood_list]['log_prob_gamma_samps_nu_int']
-        else:
-            rw_factor = 0.
+    Args:
+        data_vector_dict (dict): replicated copies must be identical (as 
+            written by np.repeat)
 
-        # sum across fpd samples
-        individ_likelihood = np.mean(np.exp(td_log_likelihoods + rw_factor), axis=1)
+    Raises:
+        ValueError: if a measurement varies across the fpd samples
+    """
 
-        # sum over all lenses
-        if np.sum(individ_likelihood == 0) > 0:
-            return -np.inf
+    for key, num_dims in PER_LENS_MEASUREMENT_DIMS.items():
+        if key in data_vector_dict and np.ndim(data_vector_dict[key]) == num_dims + 2:
+            replicated = np.asarray(data_vector_dict[key])
+            if not np.array_equal(replicated, np.broadcast_to(
+                    replicated[:, :1], replicated.shape), equal_nan=True):
+                raise ValueError("%s varies across fpd samples, can not be "
+                                 "stored per lens" % key)
+            data_vector_dict[key] = np.ascontiguousarray(replicated[:, 0])
+
+    return data_vector_dict
+
+# converted by set_sample_precision(), the per-lens arrays (redshifts, 
+#   measurements, precisions, prefactors) & the sufficient statistics 
+#   (s^2 aPa - 2 s aPm + mPm cancels in float32) stay float64
+PER_SAMPLE_KEYS = ['fpd_samples', 'kin_pred_samples', 'gamma_pred_samples',
+                   'kappa_ext_samples', 'beta_ani_samples',
+                   'log_prob_gamma_samps_nu_int',
+                   'log_prob_beta_ani_samps_nu_int', 'log_prob_modeling_prior',
+                   'log_prob_beta_ani_nu_int']
+
+def set_sample_precision(data_vector_dict, dtype=np.float32):
+    """Converts the per-sample arrays (PER_SAMPLE_KEYS) to dtype, in place 
+        (no copy if they already are, i.e. memory maps of a float32 file). 
+        The sufficient statistics are float64 either way, preferably added 
+        before (from the unrounded samples).
 
-        log_likelihood = np.sum(np.log(individ_likelihood))
+    Args:
+        data_vector_dict (dict)
+        dtype (np.dtype): i.e. the likelihood's sample_dtype
+    """
 
-        return log_likelihood
+    for key in PER_SAMPLE_KEYS:
+        value = data_vector_dict.get(key)
+        if isinstance(value, np.ndarray) and value.dtype.kind == 'f':
+            data_vector_dict[key] = value.astype(dtype, copy=False)
 
-    @staticmethod
-    def ddt_posterior_from_td_fpd(td_measured, td_likelihood_prec, fpd_samples,
-                                  num_emcee_samps=10000):
-        """Computes ddt posterior from measured time delay(s) and
-            samples from fermat potential difference posterior(s)
-            for a SINGLE lens
+    return data_vector_dict
 
-        The inference:
-            p(Ddt | delta_t, d_img) /propto p(Ddt) /integral [
-                p(delta_t | delta_phi, Ddt) p( delta_phi | d_img, nu_int)
-                p(delta_phi) / p(delta_phi | nu_int) d delta_phi   ]
 
-        Args:
-            td_measured ([n_td])
-            td_likelihood_prec ([n_td,n_td])
-            fpd_samples ([n_importance_samples,n_td])
+#########################
+# Common Random Numbers
+#########################
 
-        Returns:
-            emcee.EnsembleSampler.get_chain()
-        """
+def positive_truncnorm_from_uniforms(loc, scale, uniforms):
+    """Inverse CDF of a normal truncated to [0,inf), i.e. 
+        truncnorm.ppf(1-v, -loc/scale, inf, loc, scale). ndtri() is always
+        evaluated at p <= 0.5 to keep precision in both tails, w/ 
+        q = v*ndtr(loc/scale) the upper-tail probability of the untruncated 
+        normal:
+        - q < 0.5: loc - scale*ndtri(q)
+        - q >= 0.5: loc + scale*ndtri(ndtr(-loc/scale) + (1-v)*ndtr(loc/scale))
 
-        # set up variables here
-        n_td = len(td_measured)
-        n_walkers = 10
-        td_likelihood_prefactor = np.log((1 / (2 * np.pi) ** (n_td / 2)) /
-                                         np.sqrt(np.linalg.det(np.linalg.inv(td_likelihood_prec))))
+    Args:
+        loc, scale (float or np.array): broadcast against uniforms
+        uniforms (np.array): base uniforms v in (0,1]
 
-        def td_log_likelihood(Ddt_proposed):
+    Returns:
+        np.array: lambda_int samples (smooth in loc & scale)
+    """
 
-            # TODO: check dimensions heres
-            td_predicted = tdc_utils.td_from_ddt_fpd(Ddt_proposed, fpd_samples)
+    z = loc / scale
+    q = uniforms * ndtr(z)
+    upper_tail = q < 0.5
+    p = np.where(upper_tail, q, ndtr(-z) + (1. - uniforms) * ndtr(z))
 
-            x_minus_mu = (td_predicted - td_measured)
-            # add dimension s.t. x_minus_mu is 2D
-            x_minus_mu = np.expand_dims(x_minus_mu, axis=-1)
-            # matmul should condense the (# of time delays) dim.
-            # TODO: probably only 3 dimensions here? check...
-            exponent = -0.5 * np.matmul(np.transpose(x_minus_mu, axes=(0, 2, 1)),
-                                        np.matmul(td_likelihood_prec, x_minus_mu))
+    # round-off (or ndtri(0)=-inf for loc >> scale) at v=1
+    return np.maximum(loc + np.where(upper_tail, -scale, scale) * ndtri(p), 0.)
 
-            # reduce to one dimension: (n_fpd_samples)
-            exponent = np.squeeze(exponent)
 
-            imp_samp_likelihood = np.mean(np.exp(td_likelihood_prefactor + exponent))
+#######################
+# Sufficient Statistics
+#######################
 
-            return np.log(imp_samp_likelihood)
+def quadratic_form_sufficient_statistics(pred_basis, measured, likelihood_prec):
+    """
+    When the prediction is a per-sample scalar s times a fixed vector a
+        (x = s*a), the Gaussian exponent only depends on s through:
+        (x-m)^T P (x-m) = s^2 (a^T P a) - 2 s (a^T P m) + (m^T P m)
 
-        def td_log_posterior(Ddt_proposed):
+    Args:
+        pred_basis (n_lenses,n_fpd_samples,dim): a (i.e. fpd_samples)
+        measured (n_lenses,n_fpd_samples,dim): m (i.e. td_measured), or
+            (n_lenses,1,dim) (see per_sample_measurement())
+        likelihood_prec (n_lenses,n_fpd_samples,dim,dim): P (symmetric), or
+            (n_lenses,1,dim,dim)
+
+    Returns:
+        aPa, aPm (each size:(n_lenses,n_fpd_samples)), mPm (same leading
+            shape as measured, w/out dim)
+    """
 
-            # what's a good prior for Ddt?
-            if Ddt_proposed < 0. or Ddt_proposed > 15000:
-                return -np.inf
-            else:
-                return td_log_likelihood(Ddt_proposed)
+    P_a = np.einsum('...ij,...j->...i', likelihood_prec, pred_basis)
+    aPa = np.sum(pred_basis * P_a, axis=-1)
+    aPm = np.sum(measured * P_a, axis=-1)
+    mPm = np.einsum('...i,...ij,...j->...', measured, likelihood_prec, measured)
 
-        # set-up emcee sampler
-        cur_state = np.empty((n_walkers, 1))
-        cur_state[:, 0] = uniform.rvs(loc=0., scale=15000., size=n_walkers)
-        sampler = emcee.EnsembleSampler(n_walkers,
-                                        cur_state.shape[1], td_log_posterior)
+    return aPa, aPm, mPm
 
-        # run mcmc
-        _ = sampler.run_mcmc(cur_state, nsteps=num_emcee_samps, progress=True)
+def sufficient_statistics_exponent(scaling, aPa, aPm, mPm):
+    """
+    Args:
+        scaling (n_lenses,n_fpd_samples): s
+        aPa, aPm, mPm (n_lenses,n_fpd_samples): from
+            quadratic_form_sufficient_statistics()
 
-        # return chain
-        return sampler.get_chain()
-    
+    Returns:
+        (x-m)^T P (x-m) (n_lenses,n_fpd_samples)
+    """
+    return scaling * (scaling * aPa - 2. * aPm) + mPm
 
+def sufficient_statistics_exponent_in_place(out, scaling, aPa, aPm, mPm, tmp):
+    """sufficient_statistics_exponent() written to out, w/ tmp a scratch 
+        array of the same shape (no allocations)
 
-class TDCKinLikelihood(TDCLikelihood):
+    Returns:
+        out
+    """
 
-    def __init__(self, fpd_sample_shape, kin_pred_samples_shape,
-                 cosmo_model='LCDM' ,use_gamma_info=True,
-                 use_astropy=False):
-        """
-        Keep track of quantities that remain constant throughout the inference
+    np.multiply(scaling, aPa, out=tmp)
+    np.multiply(aPm, 2., out=out)
+    np.subtract(tmp, out, out=tmp)
+    np.multiply(scaling, tmp, out=out)
+    np.add(out, mPm, out=out)
 
-        Args:
-            fpd_sample_shape: shape of fpd samples (n_lenses,n_fpd_samples,dim_fpd)
-            kin_pred_samples_shape: shape of kinematic samples (n_lenses,n_fpd_samples,num_kin_bins)
-            log_prob_gamma_nu_int: TODO
-            cosmo_model (string): 'LCDM', 'w0waCDM', 'LCDM_lambda_int', or
-                'LCDM_lambda_int_beta_ani'
-            use_gamma_info (bool): If False, removes reweighting from likelihood
-                evaluation (any population level gamma params should just
-                return the prior then...)
-            beta_ani_samples (): None if beta_ani not in population model
-                (n_lenses,n_fpd_samples)
-        """
+    return out
 
-        super().__init__(fpd_sample_shape, cosmo_model ,use_gamma_info,
-                         use_astropy)
+def quadratic_form_in_place(out, x_minus_mu, prec, prec_x):
+    """(x-m)^T P (x-m) written to out, x_minus_mu is overwritten
 
-        self.num_kin_bins = kin_pred_samples_shape[2]
+    Args:
+        out (...): i.e. (n_lenses,n_fpd_samples)
+        x_minus_mu (...,dim)
+        prec (...,dim,dim): broadcast against x_minus_mu
+        prec_x (...,dim,1): scratch array for P (x-m)
 
+    Returns:
+        out
+    """
 
-    def sigma_v_pred_from_kin_pred(self ,proposed_cosmo,index_likelihood_list, lambda_int_samples=None):
-        """
-        Args:
-            proposed_cosmo (default: jax_cosmo.Cosmology): built by
-                construct_proposed_cosmo() (see below)
-            lambda_int_samples (): shape=(num_lenses,num_fpd_samples)
-        """
+    np.matmul(prec, x_minus_mu[..., np.newaxis], out=prec_x)
+    np.multiply(x_minus_mu, prec_x[..., 0], out=x_minus_mu)
 
-        if self.use_astropy:
-            Ds_div_Dds_computed = tdc_utils.kin_distance_ratio(
-                proposed_cosmo , data_vector_global[index_likelihood_list]['z_lens'],
-                data_vector_global[index_likelihood_list]['z_src'])
+    return np.sum(x_minus_mu, axis=-1, out=out)
 
-            # raise ValueError("astropy option not implemented for TDC+Kin")
-        else:
-            Ds_div_Dds_computed = tdc_utils.jax_kin_distance_ratio(
-                proposed_cosmo, data_vector_global[index_likelihood_list]['z_lens'],
-                data_vector_global[index_likelihood_list]['z_src'])
+def mass_sheet_scaling(distance_factor, lambda_int_samples, kappa_ext_samples):
+    """Per-sample distance_factor * lambda_int * (1-kappa_ext), by 
+        broadcasting the per-lens factor against the per-sample ones (no 
+        repeated copies). Multiplies fpd_samples / kin_pred_samples through a
+        trailing new axis, independent of the # of images / kinematic bins.
 
-        Ds_div_Dds_computed = np.array(Ds_div_Dds_computed)
-        # add batch dimensions for fpd_samples
-        Ds_div_Dds_repeated = np.repeat(Ds_div_Dds_computed[:, np.newaxis],
-                                        self.num_fpd_samples, axis=1)
-        # add batch dimension for # kinematic bins
-        Ds_div_Dds_repeated = np.repeat(Ds_div_Dds_repeated[:, :, np.newaxis],
-                                        self.num_kin_bins, axis=2)
-        # scale the kin_pred with cosmology term: sigma_v = sqrt(Ds/Dds)*c*sqrt(mathcal{J})
-        sigma_v_pred = np.sqrt(Ds_div_Dds_repeated ) *data_vector_global[index_likelihood_list]['kin_pred_samples']
+    Args:
+        distance_factor ([n_walkers],n_lenses): i.e. td_from_ddt_fpd(Ddt,1.)
+            or Ds/Dds
+        lambda_int_samples ([n_walkers],n_lenses,n_fpd_samples) or None
+        kappa_ext_samples (n_lenses,n_fpd_samples) or None
+
+    Returns:
+        ([n_walkers],n_lenses,n_fpd_samples), or ([n_walkers],n_lenses,1) if
+            both lambda_int_samples & kappa_ext_samples are None
+    """
 
-        # Account for mass sheets:
-        #   sigma_v = sqrt(lambda) * sigma_v
-        #   lambda = (1-kappa_ext)*lambda_int
+    scaling = np.asarray(distance_factor)[..., np.newaxis]
+    if lambda_int_samples is not None:
+        scaling = scaling * lambda_int_samples
+    if kappa_ext_samples is not None:
+        scaling = scaling * (1. - kappa_ext_samples)
 
-        # sqrt(lambda) scaling if lambda_int is present
-        if lambda_int_samples is not None:
-            lambda_int_repeated = np.repeat(lambda_int_samples[: ,: ,np.newaxis],
-                                            self.num_kin_bins, axis=2)
-            sigma_v_pred *= np.sqrt(lambda_int_repeated)
-        # sqrt(1-kappa_ext) scaling
-        if data_vector_global[index_likelihood_list]['kappa_ext_samples'] is not None:
-            kappa_ext_repeated = np.repeat(data_vector_global[index_likelihood_list]['kappa_ext_samples'][: ,: ,np.newaxis],
-                                           self.num_kin_bins, axis=2)
-            sigma_v_pred *= np.sqrt(1 - kappa_ext_repeated)
+    return scaling
 
-        return sigma_v_pred
+def mass_sheet_scaling_in_place(out, distance_factor, lambda_int_samples,
+                                kappa_ext_samples, tmp):
+    """mass_sheet_scaling() written to out
 
-    # TODO: jaxify & jit
-    def sigma_v_log_likelihood_per_samp(self,sigma_v_pred_samples, index_likelihood_list):
-        """
-        Args:
-            sigma_v_pred_samples (n_lenses,n_fpd_samps,num_kin_bins)
+    Args:
+        out ([n_walkers],n_lenses,n_fpd_samples)
+        distance_factor ([n_walkers],n_lenses): i.e. td_from_ddt_fpd(Ddt,1.)
+            or Ds/Dds
+        lambda_int_samples ([n_walkers],n_lenses,n_fpd_samples) or None
+        kappa_ext_samples (n_lenses,n_fpd_samples) or None
+        tmp: scratch array w/ the shape of out
+
+    Returns:
+        out
+    """
 
-        Returns:
-            sigma_v_log_likelihood_per_fpd_samp (n_lenses,n_fpd_samps)
-        """
+    # distances are float64, the per-sample product is in out.dtype
+    out[...] = distance_factor[..., np.newaxis]
+    if lambda_int_samples is not None:
+        np.multiply(out, lambda_int_samples.astype(out.dtype, copy=False),
+                    out=out)
+    if kappa_ext_samples is not None:
+        np.subtract(1., kappa_ext_samples, out=tmp)
+        np.multiply(out, tmp, out=out)
 
-        x_minus_mu = (sigma_v_pred_samples -data_vector_global[index_likelihood_list]['sigma_v_measured'])
-        # add dimension s.t. x_minus_mu is 2D
-        x_minus_mu = np.expand_dims(x_minus_mu ,axis=-1)
-        # matmul should condense the (# of time delays) dim.
-        exponent = -0.5 *np.matmul(np.transpose(x_minus_mu ,axes=(0 ,1 ,3 ,2)),
-                                  np.matmul(data_vector_global[index_likelihood_list]['sigma_v_likelihood_prec'],x_minus_mu))
+    return out
 
-        # reduce to two dimensions: (n_lenses,n_fpd_samples)
-        exponent = np.squeeze(exponent)
+def add_log_reweighting_in_place(out, samples, loc, scale, log_prob_nu_int, tmp):
+    """out += norm.logpdf(samples,loc,scale) - log_prob_nu_int, i.e. the 
+        reweighting of the importance samples from the modeling prior to the
+        proposed population (no allocations)
 
-        # log-likelihood
-        return data_vector_global[index_likelihood_list]['sigma_v_likelihood_prefactors'] + exponent
-    
+    Args:
+        out ([n_walkers],n_lenses,n_fpd_samples)
+        samples, log_prob_nu_int (n_lenses,n_fpd_samples)
+        loc, scale (float or ([n_walkers],1,1)): proposed population
+        tmp: scratch array w/ the shape of out
 
-    def full_log_likelihood(self, hyperparameters, index_likelihood_list):
+    Returns:
+        out
+    """
 
-        # construct cosmology from hyperparameters
-        proposed_cosmo, lambda_int_samples = self.process_hyperparam_proposal(
-            hyperparameters)
+    # float64 hyperparameters would promote the per-sample arithmetic
+    loc = np.asarray(loc, dtype=out.dtype)
+    scale = np.asarray(scale, dtype=out.dtype)
+    np.subtract(samples, loc, out=tmp)
+    np.divide(tmp, scale, out=tmp)
+    np.square(tmp, out=tmp)
+    np.multiply(tmp, -0.5, out=tmp)
+    np.subtract(tmp, np.log(scale) + out.dtype.type(0.5 * np.log(2 * np.pi)),
+                out=tmp)
+    np.subtract(tmp, log_prob_nu_int, out=tmp)
+    np.add(out, tmp, out=out)
 
-        # td log likelihood per sample
-        td_pred_samples = self.td_pred_from_fpd_pred(
-            proposed_cosmo, index_likelihood_list, lambda_int_samples)
-        # TODO: test jitting this
-        if USE_JAX:
-            td_log_likelihoods = jax_utils.jax_td_log_likelihood_per_samp(
-                jnp.asarray(td_pred_samples) ,jnp.asarray(data_vector_global[index_likelihood_list]['td_measured']),
-                jnp.asarray(data_vector_global[index_likelihood_list]['td_likelihood_prec']),
-                jnp.asarray(data_vector_global[index_likelihood_list]['td_likelihood_prefactors']))
-        else:
-            td_log_likelihoods = self.td_log_likelihood_per_samp(
-                td_pred_samples, index_likelihood_list
-            )
-        td_log_likelihoods = np.asarray(td_log_likelihoods)
+    return out
 
-        # kin log likelihood per sample
-        sigma_v_pred_samples = self.sigma_v_pred_from_kin_pred(
-            proposed_cosmo, index_likelihood_list, lambda_int_samples)
-        # TODO: test jitting this
-        if USE_JAX:
-            sigma_v_log_likelihoods = jax_utils.jax_sigma_v_log_likelihood_per_samp(
-                jnp.asarray(sigma_v_pred_samples),
-                jnp.asarray(data_vector_global[index_likelihood_list]['sigma_v_measured']),
-                jnp.asarray(data_vector_global[index_likelihood_list]['sigma_v_likelihood_prec']),
-                jnp.asarray(data_vector_global[index_likelihood_list]['sigma_v_likelihood_prefactors']))
-            sigma_v_log_likelihoods = np.asarray(sigma_v_log_likelihoods)
-        else:
-            sigma_v_log_likelihoods = self.sigma_v_log_likelihood_per_samp(
-                sigma_v_pred_samples, index_likelihood_list
-            )
+def add_td_sufficient_statistics(data_vector_dict):
+    """Adds 'td_aPa', 'td_aPm', 'td_mPm' to a data vector (used when
+        use_td_suff_stats=True)
 
-        # reweighting factor
-        # NOTE: hardcoding of hyperparameter order!! (-2 is mu, -1 is sigma)
-        if self.use_gamma_info:
-            eval_at_proposed_nu = norm.logpdf(data_vector_global[index_likelihood_list]['gamma_pred_samples'],
-                                              loc=hyperparameters[-2] ,scale=hyperparameters[-1])
-            rw_factor = eval_at_proposed_nu - data_vector_global[index_likelihood_list]['log_prob_gamma_samps_nu_int']
-        else:
-            rw_factor = 0.
+    Args:
+        data_vector_dict (dict): must contain 'fpd_samples', 'td_measured',
+            'td_likelihood_prec' (compact or replicated layout)
+    """
 
-        if self.cosmo_model in ['LCDM_lambda_int_beta_ani' ,'w0waCDM_lambda_int_beta_ani']:
-            eval_at_proposed_beta_pop = norm.logpdf(data_vector_global[index_likelihood_list]['beta_ani_samples'],
-                                                    loc=hyperparameters[-4] ,scale=hyperparameters[-3])
-            beta_rw_factor = eval_at_proposed_beta_pop - data_vector_global[index_likelihood_list]['log_prob_beta_ani_samps_nu_int']
-            rw_factor += beta_rw_factor
+    (data_vector_dict['td_aPa'], data_vector_dict['td_aPm'],
+        td_mPm) = quadratic_form_sufficient_statistics(
+        data_vector_dict['fpd_samples'],
+        per_sample_measurement(data_vector_dict, 'td_measured'),
+        per_sample_measurement(data_vector_dict, 'td_likelihood_prec'))
+    # one m^T P m per lens for compact measurements
+    data_vector_dict['td_mPm'] = (td_mPm[:, 0] if
+        np.ndim(data_vector_dict['td_measured']) == 2 else td_mPm)
 
-        # TODO: testing some jitting here (jit doesn't like the ==0 statement)
+    return data_vector_dict
 
-        if USE_JAX:
-            individ_likelihood = jax_utils.jax_fpd_samp_summation(jnp.asarray(
-                td_log_likelihoods +sigma_v_log_likelihoods +rw_factor))
-            individ_likelihood = np.asarray(individ_likelihood)
+def add_kin_sufficient_statistics(data_vector_dict):
+    """Adds 'sigma_v_aPa', 'sigma_v_aPm', 'sigma_v_mPm' to a data vector (used
+        when use_kin_suff_stats=True)
 
-        else:
-            # sum across fpd samples
-            individ_likelihood = np.mean(
-                np.exp(td_log_likelihoods +sigma_v_log_likelihoods +rw_factor),
-                axis=1)
-
-        # sum over all lenses
-        # TODO: there is a way to do this in jax
-        if jnp.sum(individ_likelihood == 0) > 0:
-            log_likelihood = -jnp.inf
-
-        if USE_JAX:
-            log_likelihood = jax_utils.jax_lenses_summation(jnp.asarray(individ_likelihood))
-        else:
-            log_likelihood = np.sum(np.log(individ_likelihood))
+    Args:
+        data_vector_dict (dict): must contain 'kin_pred_samples',
+            'sigma_v_measured', 'sigma_v_likelihood_prec' (compact or
+            replicated layout)
+    """
 
-        return log_likelihood
+    (data_vector_dict['sigma_v_aPa'], data_vector_dict['sigma_v_aPm'],
+        sigma_v_mPm) = quadratic_form_sufficient_statistics(
+        data_vector_dict['kin_pred_samples'],
+        per_sample_measurement(data_vector_dict, 'sigma_v_measured'),
+        per_sample_measurement(data_vector_dict, 'sigma_v_likelihood_prec'))
+    # one m^T P m per lens for compact measurements
+    data_vector_dict['sigma_v_mPm'] = (sigma_v_mPm[:, 0] if
+        np.ndim(data_vector_dict['sigma_v_measured']) == 2 else sigma_v_mPm)
 
+    return data_vector_dict
 
 #########################
 # Sampling Implementation
 #########################
+def uniform_box_log_prior(hyperparameters, lower_bounds, upper_bounds):
+    """
+    Args:
+        hyperparameters ([float]): (n_params), or a batch of proposals
+            w/ shape (n_walkers,n_params)
+        lower_bounds ([float]): (n_params)
+        upper_bounds ([float]): (n_params)
+
+    Returns:
+        0 inside the bounds, -np.inf outside (float, or (n_walkers) array)
+    """
+
+    hyperparameters = np.asarray(hyperparameters)
+    in_bounds = np.all((hyperparameters >= lower_bounds) &
+                       (hyperparameters <= upper_bounds), axis=-1)
+
+    if hyperparameters.ndim == 1:
+        return 0 if in_bounds else -np.inf
+
+    return np.where(in_bounds, 0., -np.inf)
+
 def LCDM_log_prior(hyperparameters):
     """
     Args:
         hyperparameters ([H0,omega_M,mu_gamma,sigma_gamma])
     """
 
-    if hyperparameters[0] < 0 or hyperparameters[0] > 150: #h0
-        return -np.inf
-    if hyperparameters[1] < 0.05 or hyperparameters[1] > 0.5: #omega_M 
-        return -np.inf
-    elif hyperparameters[2] < 1.5 or hyperparameters[2] > 2.5: #mu(gamma_lens)
-        return -np.inf
-    elif hyperparameters[3] < 0.001 or hyperparameters[3] > 0.2: #sigma(gamma_lens)
-        return -np.inf
-    
-    return 0
+    return uniform_box_log_prior(hyperparameters,
+        #   h0, omega_M, mu(gamma_lens), sigma(gamma_lens)
+        [   0., 0.05,    1.5,            0.001],
+        [ 150., 0.5,     2.5,            0.2])
 
 def LCDM_lambda_int_log_prior(hyperparameters):
     """
@@ -550,46 +3407,22 @@ def LCDM_lambda_int_log_prior(hyperparameters):
             mu_gamma,sigma_gamma])
     """
 
-    if hyperparameters[0] < 0 or hyperparameters[0] > 150: #h0
-        return -np.inf
-    if hyperparameters[1] < 0.05 or hyperparameters[1] > 0.5: #omega_M 
-        return -np.inf
-    elif hyperparameters[2] < 0.5 or hyperparameters[2] > 1.5: #mu(lambda_int)
-        return -np.inf
-    elif hyperparameters[3] < 0.001 or hyperparameters[3] > 0.5: #sigma(lambda_int)
-        return -np.inf
-    elif hyperparameters[4] < 1.5 or hyperparameters[4] > 2.5: #mu(gamma_lens)
-        return -np.inf
-    elif hyperparameters[5] < 0.001 or hyperparameters[5] > 0.2: #sigma(gamma_lens)
-        return -np.inf
-    
-    return 0
+    return uniform_box_log_prior(hyperparameters,
+        #   h0, omega_M, mu(lambda_int), sigma(lambda_int), mu(gamma_lens), sigma(gamma_lens)
+        [   0., 0.05,    0.5,            0.001,             1.5,            0.001],
+        [ 150., 0.5,     1.5,            0.5,               2.5,            0.2])
 
 def LCDM_lambda_int_beta_ani_log_prior(hyperparameters):
     """
     Args:
         hyperparameters ([H0,omega_M,mu_lambda_int,sigma_lambda_int,
-            mu_gamma,sigma_gamma])
+            mu_beta_ani,sigma_beta_ani,mu_gamma,sigma_gamma])
     """
 
-    if hyperparameters[0] < 0 or hyperparameters[0] > 150: #h0
-        return -np.inf
-    if hyperparameters[1] < 0.05 or hyperparameters[1] > 0.5: #omega_M 
-        return -np.inf
-    elif hyperparameters[2] < 0.5 or hyperparameters[2] > 1.5: #mu(lambda_int)
-        return -np.inf
-    elif hyperparameters[3] < 0.001 or hyperparameters[3] > 0.5: #sigma(lambda_int)
-        return -np.inf
-    elif hyperparameters[4] < -0.5 or hyperparameters[4] > 0.5: #mu(beta_ani)
-        return -np.inf
-    elif hyperparameters[5] < 0.001 or hyperparameters[5] > 0.2: #sigma(beta_ani)
-        return -np.inf
-    elif hyperparameters[6] < 1.5 or hyperparameters[4] > 2.5: #mu(gamma_lens)
-        return -np.inf
-    elif hyperparameters[7] < 0.001 or hyperparameters[5] > 0.2: #sigma(gamma_lens)
-        return -np.inf
-    
-    return 0
+    return uniform_box_log_prior(hyperparameters,
+        #   h0, omega_M, mu(lambda_int), sigma(lambda_int), mu(beta_ani), sigma(beta_ani), mu(gamma_lens), sigma(gamma_lens)
+        [   0., 0.05,    0.5,            0.001,             -0.5,         0.001,           1.5,            0.001],
+        [ 150., 0.5,     1.5,            0.5,               0.5,          0.2,             2.5,            0.2])
 
 def w0waCDM_log_prior(hyperparameters):
     """
@@ -597,58 +3430,22 @@ def w0waCDM_log_prior(hyperparameters):
         hyperparameters ([H0,Omega_M,w0,wa,mu_gamma,sigma_gamma])
     """
 
-    # h0 [0,150]
-    if hyperparameters[0] < 0 or hyperparameters[0] > 150: 
-        return -np.inf
-    # Omega_M [0.05,0.5]
-    if hyperparameters[1] < 0.05 or hyperparameters[1] > 0.5: 
-        return -np.inf
-    #w0 [-2,0]
-    elif hyperparameters[2] < -2 or hyperparameters[2] > 0:
-        return -np.inf
-    #wa [-2,2]
-    elif hyperparameters[3] < -2 or hyperparameters[3] > 2:
-        return -np.inf
-    #mu(gamma)
-    elif hyperparameters[4] < 1.5 or hyperparameters[4] > 2.5:
-        return -np.inf
-    #sigma(gamma)
-    elif hyperparameters[5] < 0.001 or hyperparameters[5] > 0.2:
-        return -np.inf
-    
-    return 0
+    return uniform_box_log_prior(hyperparameters,
+        #   h0, Omega_M, w0,  wa,  mu(gamma), sigma(gamma)
+        [   0., 0.05,    -2., -2., 1.5,       0.001],
+        [ 150., 0.5,     0.,  2.,  2.5,       0.2])
 
 def w0waCDM_lambda_int_beta_ani_log_prior(hyperparameters):
     """
     Args:
-        hyperparameters ([H0,omega_M,mu_lambda_int,sigma_lambda_int,
-            mu_gamma,sigma_gamma])
+        hyperparameters ([H0,omega_M,w0,wa,mu_lambda_int,sigma_lambda_int,
+            mu_beta_ani,sigma_beta_ani,mu_gamma,sigma_gamma])
     """
 
-    if hyperparameters[0] < 0 or hyperparameters[0] > 150: #h0
-        return -np.inf
-    elif hyperparameters[1] < 0.05 or hyperparameters[1] > 0.5: #omega_M 
-        return -np.inf
-    #w0 [-2,0]
-    elif hyperparameters[2] < -2 or hyperparameters[2] > 0:
-        return -np.inf
-    #wa [-2,2]
-    elif hyperparameters[3] < -2 or hyperparameters[3] > 2:
-        return -np.inf
-    elif hyperparameters[4] < 0.5 or hyperparameters[4] > 1.5: #mu(lambda_int)
-        return -np.inf
-    elif hyperparameters[5] < 0.001 or hyperparameters[5] > 0.5: #sigma(lambda_int)
-        return -np.inf
-    elif hyperparameters[6] < -0.5 or hyperparameters[6] > 0.5: #mu(beta_ani)
-        return -np.inf
-    elif hyperparameters[7] < 0.001 or hyperparameters[7] > 0.2: #sigma(beta_ani)
-        return -np.inf
-    elif hyperparameters[8] < 1.5 or hyperparameters[8] > 2.5: #mu(gamma_lens)
-        return -np.inf
-    elif hyperparameters[9] < 0.001 or hyperparameters[9] > 0.2: #sigma(gamma_lens)
-        return -np.inf
-    
-    return 0
+    return uniform_box_log_prior(hyperparameters,
+        #   h0, omega_M, w0,  wa,  mu(lambda_int), sigma(lambda_int), mu(beta_ani), sigma(beta_ani), mu(gamma_lens), sigma(gamma_lens)
+        [   0., 0.05,    -2., -2., 0.5,            0.001,             -0.5,         0.001,           1.5,            0.001],
+        [ 150., 0.5,     0.,  2.,  1.5,            0.5,               0.5,          0.2,             2.5,            0.2])
 
 def generate_initial_state(n_walkers,cosmo_model):
     """
@@ -734,6 +3531,12 @@ def log_posterior(hyperparameters, cosmo_model, tdc_likelihood_list):
             - LCDM_lambda_int_beta_ani: [H0,Omega_M,
                 mu_lint,sigma_lint,mu_bani,sigma_bani,mu_gamma,sigma_gamma] 
             - w0waCDM: [H0,Omega_M,w0,wa,mu_gamma,sigma_gamma]
+            A batch of proposals w/ shape (n_walkers,n_params) is also 
+            accepted (emcee vectorize=True), then returns (n_walkers)
+        cosmo_model (string)
+        tdc_likelihood_list ([TDCLikelihood], LikelihoodGroup, 
+            DistributedLikelihood, ThreadedLikelihood, or JaxLikelihood): log
+            likelihoods are added together
     """
     #rank = MPI.COMM_WORLD.Get_rank()
     #pid = os.getpid()
@@ -750,13 +3553,112 @@ def log_posterior(hyperparameters, cosmo_model, tdc_likelihood_list):
     elif cosmo_model == 'w0waCDM_lambda_int_beta_ani':
         lp = w0waCDM_lambda_int_beta_ani_log_prior(hyperparameters)
     # Likelihood
-    if lp == 0:
-        for i, tdc_likelihood in enumerate(tdc_likelihood_list):
-            fll = tdc_likelihood.full_log_likelihood(hyperparameters, index_likelihood_list = i)
-            lp += fll
+    if np.ndim(hyperparameters) > 1:
+        # batch of proposals: walkers outside the prior are swapped for a
+        #   valid proposal (keeps the batch shape fixed, avoids re-jitting),
+        #   and their result is discarded
+        in_prior = np.isfinite(lp)
+        if np.any(in_prior):
+            valid_hyperparameters = np.where(in_prior[:, np.newaxis], hyperparameters,
+                                             np.asarray(hyperparameters)[np.argmax(in_prior)])
+            lp = lp + total_log_likelihood(valid_hyperparameters,
+                                           tdc_likelihood_list)
+            lp[~in_prior] = -np.inf
+
+    elif lp == 0:
+        lp += total_log_likelihood(hyperparameters, tdc_likelihood_list)
 
     return lp
 
+def lens_log_prefactors(data_vector_dict):
+    """
+    Args:
+        data_vector_dict (dict): w/ the time-delay (& kinematic) precisions 
+            or their Gaussian log-prefactors
+
+    Returns:
+        (n_lenses): sum of the Gaussian log-prefactors of each lens, larger 
+            for tighter constraints (see gaussian_log_prefactors())
+    """
+
+    num_lenses = data_vector_dict['fpd_samples'].shape[0]
+    log_prefactors = np.zeros(num_lenses)
+    for key, prec_key in [('td_likelihood_prefactors', 'td_likelihood_prec'),
+            ('sigma_v_likelihood_prefactors', 'sigma_v_likelihood_prec')]:
+        if key in data_vector_dict:
+            values = data_vector_dict[key]
+        elif prec_key in data_vector_dict:
+            values = gaussian_log_prefactors(data_vector_dict[prec_key])
+        else:
+            continue
+        # compact (n_lenses) or replicated across fpd samples
+        log_prefactors += np.reshape(values, (num_lenses, -1))[:, 0]
+
+    return log_prefactors
+
+def split_lens_chunks(tdc_likelihood_list, data_vector_list, num_chunks):
+    """Splits the lenses of every likelihood object into contiguous chunks, 
+        ordered from the tightest constraints to the loosest (max. of 
+        lens_log_prefactors() over the chunk). total_log_likelihood() 
+        evaluates a list in order & returns once the log likelihood is 
+        -inf, so a hopeless proposal (or a batch of them) stops after the 
+        first chunk at -inf instead of after the whole likelihood object.
+
+    Args:
+        tdc_likelihood_list ([TDCLikelihood]): not packed
+        data_vector_list ([dict]): w/ the sufficient statistics (if used)
+        num_chunks (int): # of chunks per likelihood object
+
+    Returns:
+        chunk_likelihood_list ([TDCLikelihood]), chunk_data_vector_list 
+            ([dict]): views of the data vectors (see shard_data_vector())
+    """
+
+    chunks = []
+    for tdc_likelihood, data_vector_dict in zip(tdc_likelihood_list,
+                                                data_vector_list):
+        if isinstance(tdc_likelihood, PackedLikelihood):
+            raise ValueError("split_lens_chunks() requires un-packed "+
+                             "likelihood objects")
+        log_prefactors = lens_log_prefactors(data_vector_dict)
+        for c in range(num_chunks):
+            lens_slice = lens_shard(tdc_likelihood.num_lenses, num_chunks, c)
+            if lens_slice.stop == lens_slice.start:
+                continue
+            chunks.append((np.max(log_prefactors[lens_slice]),
+                shard_likelihood(tdc_likelihood, lens_slice),
+                shard_data_vector(data_vector_dict, lens_slice,
+                                  copy_arrays=False)))
+    # stable: ties keep the original order
+    chunks.sort(key=lambda chunk: -chunk[0])
+
+    return ([chunk[1] for chunk in chunks], [chunk[2] for chunk in chunks])
+
+def total_log_likelihood(hyperparameters, tdc_likelihood_list):
+    """
+    Args:
+        hyperparameters ([float]): see log_posterior()
+        tdc_likelihood_list ([TDCLikelihood], LikelihoodGroup, 
+            DistributedLikelihood, ThreadedLikelihood, or JaxLikelihood)
+
+    Returns:
+        sum of the log likelihoods (float, or (n_walkers) array for a batch)
+    """
+
+    if isinstance(tdc_likelihood_list, (LikelihoodGroup, DistributedLikelihood,
+                                        ThreadedLikelihood, JaxLikelihood)):
+        return tdc_likelihood_list.full_log_likelihood(hyperparameters)
+
+    log_likelihood = 0.
+    for i, tdc_likelihood in enumerate(tdc_likelihood_list):
+        log_likelihood = log_likelihood + tdc_likelihood.full_log_likelihood(
+            hyperparameters, index_likelihood_list = i)
+        if np.all(log_likelihood == -np.inf):
+            # no need to evaluate the other likelihoods
+            return log_likelihood
+
+    return log_likelihood
+
 def prepare_data_vector_list(data_vector_list, tdc_likelihood_list):
     """
     Args:
@@ -769,13 +3671,13 @@ def prepare_data_vector_list(data_vector_list, tdc_likelihood_list):
     for i in range(len(data_vector_list)):
         #expand the axis according to the number of samples in the data vector
         num_lenses, num_fpd_samples, dim_fpd= data_vector_list[i]['fpd_samples'].shape
-        data_vector_list[i]['td_measured'] = np.repeat(data_vector_list[i]['td_measured'][:, np.newaxis, :],
-                num_fpd_samples, axis=1)
-        data_vector_list[i]['td_likelihood_prec'] = np.repeat(data_vector_list[i]['td_likelihood_prec'][:, np.newaxis, :, :],
-            num_fpd_samples, axis=1)
+        # measurements stay per-lens (n_lenses,...), broadcast in the likelihood
+        #   (see per_sample_measurement())
+        data_vector_list[i]['td_likelihood_prefactors'] = gaussian_log_prefactors(
+            data_vector_list[i]['td_likelihood_prec'])
 
-        data_vector_list[i]['td_likelihood_prefactors'] = np.log( (1/(2*np.pi)**(dim_fpd/2)) /
-                np.sqrt(np.linalg.det(np.linalg.inv(data_vector_list[i]['td_likelihood_prec']))) )
+        if tdc_likelihood_list[i].use_td_suff_stats:
+            add_td_sufficient_statistics(data_vector_list[i])
 
         # evaluate the modeling prior for gamma_lens from a provided distribution or on the provided samples
         if tdc_likelihood_list[i].log_prob_gamma_nu_int is None:
@@ -792,19 +3694,12 @@ def prepare_data_vector_list(data_vector_list, tdc_likelihood_list):
         if isinstance(tdc_likelihood_list[i], TDCKinLikelihood):
             #expand the axis according to the number of samples in the data vector
             if 'kin_pred_samples' in data_vector_list[i]:
-                num_kin_bins = data_vector_list[i]['kin_pred_samples'].shape[2]
-                # pad measurements with a 2nd batch dim for # of fpd samples
-                data_vector_list[i]['sigma_v_measured'] = np.repeat(
-                    data_vector_list[i]['sigma_v_measured'][:, np.newaxis, :],
-                    num_fpd_samples, axis=1)
-                data_vector_list[i]['sigma_v_likelihood_prec'] = np.repeat(
-                    data_vector_list[i]['sigma_v_likelihood_prec'][:, np.newaxis, :, :],
-                    num_fpd_samples, axis=1)
-
-                data_vector_list[i]['sigma_v_likelihood_prefactors'] = np.log((1 / (2 * np.pi) ** (num_kin_bins / 2)) /
-                                                                              np.sqrt(np.linalg.det(np.linalg.inv(
-                                                                                  data_vector_list[i][
-                                                                                      'sigma_v_likelihood_prec']))))
+                # measurements stay per-lens, broadcast in the likelihood
+                data_vector_list[i]['sigma_v_likelihood_prefactors'] = gaussian_log_prefactors(
+                    data_vector_list[i]['sigma_v_likelihood_prec'])
+
+                if tdc_likelihood_list[i].use_kin_suff_stats:
+                    add_kin_sufficient_statistics(data_vector_list[i])
             else:
                 raise ValueError('kin_pred_samples not found in data_vector_list whereas TDCKinLikelihood is used')
 
@@ -829,8 +3724,87 @@ def prepare_data_vector_list(data_vector_list, tdc_likelihood_list):
 
     return data_vector_list
 
+def add_missing_sufficient_statistics(data_vector_list, tdc_likelihood_list):
+    """Adds the sufficient statistics required by the likelihood objects
+        (if not already in the data vectors). Call before sharing the data 
+        vectors read-only (Utils.shared_data_vectors) so that they are 
+        computed once per node.
+
+    Args:
+        data_vector_list ([dict]): modified in place
+        tdc_likelihood_list ([TDCLikelihood])
+    """
+    for i in range(len(tdc_likelihood_list)):
+        if ((tdc_likelihood_list[i].use_td_suff_stats or
+                tdc_likelihood_list[i].marginalize_lambda_int) and
+                'td_aPa' not in data_vector_list[i]):
+            add_td_sufficient_statistics(data_vector_list[i])
+        if (isinstance(tdc_likelihood_list[i], TDCKinLikelihood) and
+                tdc_likelihood_list[i].use_kin_suff_stats and
+                'sigma_v_aPa' not in data_vector_list[i]):
+            add_kin_sufficient_statistics(data_vector_list[i])
+
+def prepare_distance_engines(tdc_likelihood_list, index_likelihood_list=None):
+    """Builds (or loads, see tdc_utils.W0waCDMDistanceEmulator.load_or_build())
+        every distance engine evaluated by total_log_likelihood(
+        hyperparameters, tdc_likelihood_list), instead of on the first 
+        likelihood call. Nothing to do for astropy, jax_cosmo or 
+        JaxLikelihood distances.
+
+    Args:
+        tdc_likelihood_list ([TDCLikelihood], LikelihoodGroup, 
+            DistributedLikelihood, ThreadedLikelihood, or JaxLikelihood)
+        index_likelihood_list ([int]): data vectors of a list of 
+            likelihoods in data_vector_global. Default: 0,1,...
+
+    Returns:
+        int: # of distance engines
+    """
+
+    if isinstance(tdc_likelihood_list, JaxLikelihood):
+        return 0
+    elif isinstance(tdc_likelihood_list, LikelihoodGroup):
+        lead = tdc_likelihood_list.tdc_likelihood_list[0]
+        if not lead.use_distance_engine():
+            return 0
+        if tdc_likelihood_list._distance_engine is None:
+            tdc_likelihood_list._distance_engine = lead.build_distance_engine(
+                *tdc_likelihood_list.concatenate_redshifts())
+        return 1
+    elif isinstance(tdc_likelihood_list, DistributedLikelihood):
+        if tdc_likelihood_list.local_group is not None:
+            return prepare_distance_engines(tdc_likelihood_list.local_group)
+        return prepare_distance_engines(
+            tdc_likelihood_list.local_likelihood_list,
+            tdc_likelihood_list.local_index_list)
+    elif isinstance(tdc_likelihood_list, ThreadedLikelihood):
+        num_engines = 0
+        for c in range(len(tdc_likelihood_list.chunk_likelihood_lists)):
+            if tdc_likelihood_list.chunk_groups[c] is not None:
+                num_engines += prepare_distance_engines(
+                    tdc_likelihood_list.chunk_groups[c])
+            else:
+                num_engines += prepare_distance_engines(
+                    tdc_likelihood_list.chunk_likelihood_lists[c],
+                    tdc_likelihood_list.chunk_index_lists[c])
+        return num_engines
+
+    if index_likelihood_list is None:
+        index_likelihood_list = range(len(tdc_likelihood_list))
+    num_engines = 0
+    for tdc_likelihood, i in zip(tdc_likelihood_list, index_likelihood_list):
+        if tdc_likelihood.use_distance_engine():
+            tdc_likelihood.distance_engine(i)
+            num_engines += 1
+
+    return num_engines
+
 def fast_TDC(tdc_likelihood_list, data_vector_list, num_emcee_samps=1000,
-    n_walkers=20, use_mpi=False, use_multiprocess=False, backend_path=None, reset_backend=True):
+    n_walkers=20, use_mpi=False, use_multiprocess=False, backend_path=None, reset_backend=True,
+    vectorize=False, group_likelihoods=False, distribute_lenses=False,
+    likelihood_threads=None, num_cores=None, persistent_workers=False,
+    likelihood_backend='numpy', jax_cache_dir=None, pack_likelihoods=False,
+    early_exit_chunks=None):
     """
     Args:
         tdc_likelihood_list ([TDCLikelihood]): list of likelihood objects 
@@ -839,6 +3813,55 @@ def fast_TDC(tdc_likelihood_list, data_vector_list, num_emcee_samps=1000,
         n_walkers (int): Number of emcee walkers
         use_mpi (bool): If True, uses MPI for parallelization
         backend_path (string): If not None, saves a backend .h5 file
+        vectorize (bool): If True, all walkers are evaluated in one 
+            log_posterior call (emcee vectorize=True). Not compatible with
+            use_mpi or use_multiprocess.
+        group_likelihoods (bool): If True, likelihoods are evaluated as a 
+            LikelihoodGroup (cosmology & distances computed once per 
+            proposal for all subsamples)
+        distribute_lenses (bool): If True (requires use_mpi), lenses are
+            sharded across MPI ranks (DistributedLikelihood) instead of 
+            farming out walkers. The master runs emcee w/ vectorize=True.
+        likelihood_threads (int): If not None, lenses are split into chunks
+            evaluated by this many threads (ThreadedLikelihood). Not 
+            compatible w/ use_mpi. W/ use_multiprocess, each worker process
+            evaluates its walkers w/ this many threads.
+        num_cores (int): If not None, the core budget is split into walker
+            groups (worker processes) x lens threads, chosen from a short 
+            calibration of the per-lens cost (see plan_hybrid_schedule()).
+            Walker groups run on persistent worker processes 
+            (LikelihoodWorkerPool) w/ the lens threads built in each worker.
+            Overrides use_multiprocess, likelihood_threads & 
+            persistent_workers, not compatible w/ use_mpi or vectorize.
+        persistent_workers (bool): If True (requires use_multiprocess or 
+            num_cores, not compatible w/ use_mpi), the data vectors are 
+            placed in POSIX shared memory and each worker process attaches 
+            them & builds the likelihoods once (LikelihoodWorkerPool), only 
+            proposals & log probabilities are sent per step. Also prints the
+            per-step IPC overhead.
+        likelihood_backend (string): 'numpy' (default) or 'jax'. W/ 'jax', 
+            all likelihoods are evaluated by one jitted function 
+            (JaxLikelihood), use vectorize=True to evaluate all walkers in 
+            one call. Not compatible w/ the process/thread parallelization 
+            options.
+        jax_cache_dir (string): If not None, compiled jax programs are 
+            stored in / loaded from this directory (persistent compilation 
+            cache, shared by MPI ranks, worker processes & later runs). 
+            Jitted functions are always compiled ahead of time on every
+            process before sampling (see warm_up_likelihoods()).
+        pack_likelihoods (bool): If True, all subsamples (doubles, quads, 
+            any kinematics) are evaluated by one PackedLikelihood, in one 
+            vectorized pass per proposal over the packed data vector (see 
+            pack_data_vectors()). Not compatible w/ distribute_lenses, 
+            likelihood_threads, num_cores or likelihood_backend='jax'.
+        early_exit_chunks (int): If not None, the lenses of every likelihood
+            object are split into this many chunks, evaluated from the 
+            tightest constraints to the loosest, so a proposal at -inf 
+            stops after the first chunk at -inf (see split_lens_chunks()).
+            Only for the plain list of likelihoods (not compatible w/ 
+            distribute_lenses, likelihood_threads, num_cores, 
+            persistent_workers, pack_likelihoods, group_likelihoods or 
+            likelihood_backend='jax').
         
     Returns: 
         mcmc chain (emcee.EnsemblerSampler.chain)
@@ -850,11 +3873,154 @@ def fast_TDC(tdc_likelihood_list, data_vector_list, num_emcee_samps=1000,
         if tdc_likelihood_list[i].cosmo_model != cosmo_model:
             raise ValueError("")
 
-    # TODO: prepare the data vectors
+    if distribute_lenses:
+        if not use_mpi or use_multiprocess:
+            raise ValueError("distribute_lenses=True requires use_mpi=True "+
+                             "(and use_multiprocess=False)")
+        # one broadcast + allreduce per ensemble step
+        vectorize = True
+    elif vectorize and (use_mpi or use_multiprocess):
+        raise ValueError("vectorize=True evaluates all walkers in one call, "+
+                         "choose it OR use_mpi/use_multiprocess")
+    if num_cores is not None and (use_mpi or vectorize):
+        raise ValueError("num_cores schedules walker groups x lens threads, "+
+                         "not compatible w/ use_mpi or vectorize")
+    if persistent_workers and (use_mpi or not (use_multiprocess or
+            num_cores is not None)):
+        raise ValueError("persistent_workers=True runs a pool of worker "+
+                         "processes, requires use_multiprocess=True or "+
+                         "num_cores (and use_mpi=False)")
+    if likelihood_threads is not None and use_mpi:
+        raise ValueError("likelihood_threads parallelizes within one process, "+
+                         "choose it OR use_mpi")
+    if likelihood_backend not in ['numpy', 'jax']:
+        raise ValueError("likelihood_backend must be 'numpy' or 'jax'")
+    if likelihood_backend == 'jax' and (use_mpi or use_multiprocess or 
+            likelihood_threads is not None or num_cores is not None):
+        raise ValueError("likelihood_backend='jax' evaluates all lenses in "+
+                         "one jitted call, use vectorize=True for the "+
+                         "walkers instead of process/thread parallelization")
+    if pack_likelihoods and (distribute_lenses or likelihood_threads is not None
+            or num_cores is not None or likelihood_backend == 'jax'):
+        raise ValueError("pack_likelihoods=True evaluates all lenses in one "+
+                         "pass, not compatible w/ distribute_lenses, "+
+                         "likelihood_threads, num_cores or "+
+                         "likelihood_backend='jax'")
+    if early_exit_chunks is not None and (distribute_lenses or
+            likelihood_threads is not None or num_cores is not None or
+            persistent_workers or pack_likelihoods or group_likelihoods or
+            likelihood_backend == 'jax'):
+        raise ValueError("early_exit_chunks evaluates a list of lens chunks "+
+                         "in order, not compatible w/ distribute_lenses, "+
+                         "likelihood_threads, num_cores, persistent_workers, "+
+                         "pack_likelihoods, group_likelihoods or "+
+                         "likelihood_backend='jax'")
+
+    if jax_cache_dir is not None:
+        tdc_utils.enable_jax_compilation_cache(jax_cache_dir)
+    # only the shape of the proposals matters for compilation
+    warm_up_hyperparameters_list = proposal_shaped_hyperparameters(n_walkers,
+        cosmo_model, vectorize)
 
-    # make the variable global to speed up multiprocessing access during the sampling
     global data_vector_global
-    data_vector_global = data_vector_list
+    # Default: one worker process per CPU
+    num_processes = None
+    # installed in the workers if persistent_workers
+    worker_tdc_likelihood_list = tdc_likelihood_list
+    if distribute_lenses:
+        tdc_likelihood_list = DistributedLikelihood(tdc_likelihood_list,
+            data_vector_list, group_likelihoods=group_likelihoods)
+        data_vector_global = tdc_likelihood_list.data_vector_list
+        print("Rank %d: %d lenses" % (tdc_likelihood_list.rank, sum(
+            tdc_likelihood.num_lenses for tdc_likelihood in 
+            tdc_likelihood_list.local_likelihood_list)))
+        # each rank's shard has its own redshifts (& emulator table)
+        prepare_distance_engines(tdc_likelihood_list)
+        tik_warm_up = time.time()
+        num_compiled = sum(warm_up_likelihoods(tdc_likelihood_list,
+            warm_up_hyperparameters) for warm_up_hyperparameters in
+            warm_up_hyperparameters_list)
+        if num_compiled > 0:
+            print("Rank %d: compiled %d jax programs in %.2f seconds" % (
+                tdc_likelihood_list.rank, num_compiled, time.time() - tik_warm_up))
+        if not tdc_likelihood_list.is_master():
+            tdc_likelihood_list.wait()
+            sys.exit(0)
+    else:
+        # TODO: prepare the data vectors
+        add_missing_sufficient_statistics(data_vector_list, tdc_likelihood_list)
+
+        if pack_likelihoods:
+            tik_pack = time.time()
+            data_vector_list = [pack_data_vectors(data_vector_list,
+                                                  tdc_likelihood_list)]
+            tdc_likelihood_list = [PackedLikelihood(tdc_likelihood_list)]
+            print("Packed %d lenses in %.2f seconds" % (
+                tdc_likelihood_list[0].num_lenses, time.time() - tik_pack))
+        elif early_exit_chunks is not None:
+            tdc_likelihood_list, data_vector_list = split_lens_chunks(
+                tdc_likelihood_list, data_vector_list, early_exit_chunks)
+            print("Split lenses into %d chunks, tightest constraints first" % (
+                len(tdc_likelihood_list)))
+
+        # make the variable global to speed up multiprocessing access during the sampling
+        data_vector_global = data_vector_list
+
+        if num_cores is not None:
+            per_call_overhead, per_lens_cost = calibrate_lens_cost(
+                tdc_likelihood_list, data_vector_list,
+                generate_initial_state(1, cosmo_model)[0])
+            schedule = plan_hybrid_schedule(num_cores, n_walkers,
+                sum(tdc_likelihood.num_lenses for tdc_likelihood in tdc_likelihood_list),
+                per_call_overhead, per_lens_cost)
+            print("Calibration: %.2e seconds per call + %.2e seconds per lens" % (
+                per_call_overhead, per_lens_cost))
+            print("Schedule: %d walker groups x %d threads (%.3f seconds per step predicted)" % (
+                schedule.n_walker_groups, schedule.n_threads, schedule.predicted_step_time))
+            use_multiprocess = schedule.n_walker_groups > 1
+            # workers build their own lens threads (any start method), 
+            #   the chunks are not pickled w/ every task
+            persistent_workers = use_multiprocess
+            num_processes = schedule.n_walker_groups
+            likelihood_threads = schedule.n_threads if schedule.n_threads > 1 else None
+
+        if likelihood_backend == 'jax':
+            # static arrays are transferred once, before sampling
+            tik_device = time.time()
+            device_data_list = prepare_jax_data_vectors(tdc_likelihood_list)
+            print("Copied data vectors to %s: %.1f MB in %.2f seconds" % (
+                jax.devices()[0].platform, sum(value.nbytes for data in 
+                device_data_list for value in data.values()) / 1e6,
+                time.time() - tik_device))
+            # distances for all subsamples are fused in the jitted function
+            tdc_likelihood_list = JaxLikelihood(tdc_likelihood_list)
+        elif likelihood_threads is not None:
+            tdc_likelihood_list = ThreadedLikelihood(tdc_likelihood_list,
+                data_vector_list, num_threads=likelihood_threads,
+                group_likelihoods=group_likelihoods)
+            data_vector_global = tdc_likelihood_list.data_vector_list
+        elif group_likelihoods:
+            tdc_likelihood_list = LikelihoodGroup(tdc_likelihood_list)
+
+        # before sampling, not on the first likelihood call: emulator tables
+        #   are built & written by rank 0 only, the other MPI ranks load 
+        #   them, forked / persistent workers inherit (or load) the engines
+        if use_mpi:
+            from mpi4py import MPI
+            if MPI.COMM_WORLD.Get_rank() == 0:
+                prepare_distance_engines(tdc_likelihood_list)
+            MPI.COMM_WORLD.Barrier()
+        prepare_distance_engines(tdc_likelihood_list)
+
+        # on every MPI rank before the pool starts (forked workers inherit 
+        #   the compiled programs, persistent workers compile their own)
+        tik_warm_up = time.time()
+        num_compiled = sum(warm_up_likelihoods(tdc_likelihood_list,
+            warm_up_hyperparameters) for warm_up_hyperparameters in
+            warm_up_hyperparameters_list)
+        if num_compiled > 0:
+            print("Compiled %d jax programs in %.2f seconds" % (
+                num_compiled, time.time() - tik_warm_up))
 
     log_posterior_fn = partial(log_posterior, cosmo_model=cosmo_model,
         tdc_likelihood_list=tdc_likelihood_list)
@@ -863,19 +4029,24 @@ def fast_TDC(tdc_likelihood_list, data_vector_list, num_emcee_samps=1000,
     cur_state = generate_initial_state(n_walkers,cosmo_model)
 
     print('Initial likelihood call : ')
-    if cosmo_model == 'LCDM_lambda_int_beta_ani':
+    if cosmo_model == 'LCDM_lambda_int':
+        hyperparameters_init = [6.47242793e+01, 2.33623746e-01, 9.14884078e-01, 1.34268817e-01,
+                            2.22904902e+00, 8.78549539e-03]
+    elif cosmo_model == 'LCDM_lambda_int_beta_ani':
         hyperparameters_init = [6.47242793e+01, 2.33623746e-01, 9.14884078e-01, 1.34268817e-01,
                             -3.15238075e-02, 8.41097628e-02, 2.22904902e+00, 8.78549539e-03]
     elif cosmo_model == 'w0waCDM_lambda_int_beta_ani':
         hyperparameters_init = [6.47242793e+01, 2.33623746e-01, -1., 0., 9.14884078e-01, 1.34268817e-01,
                             -3.15238075e-02, 8.41097628e-02, 2.22904902e+00, 8.78549539e-03]
+    else:
+        hyperparameters_init = cur_state[0]
     print('hyperparameters_init', hyperparameters_init)
     log_post_val = log_posterior(hyperparameters_init, cosmo_model,
                   tdc_likelihood_list)
     print('log_posterior', log_post_val)
 
     # emcee stuff here
-    if not use_mpi:
+    if not use_mpi or distribute_lenses:
         backend = None
         if backend_path is not None:
             backend = emcee.backends.HDFBackend(backend_path)
@@ -883,12 +4054,38 @@ def fast_TDC(tdc_likelihood_list, data_vector_list, num_emcee_samps=1000,
             if reset_backend:
                 backend.reset(n_walkers,cur_state.shape[1])
 
-        if use_multiprocess:
+        if use_multiprocess and persistent_workers:
+            from Utils.shared_data_vectors import share_data_vectors_posix
+            print("Using persistent worker processes for parallelization...")
+            shm, layout = share_data_vectors_posix(data_vector_list)
+            try:
+                with LikelihoodWorkerPool(worker_tdc_likelihood_list,
+                        (shm.name, layout), cosmo_model, processes=num_processes,
+                        likelihood_threads=likelihood_threads,
+                        group_likelihoods=group_likelihoods,
+                        jax_cache_dir=jax_cache_dir,
+                        pack_likelihoods=pack_likelihoods) as pool:
+                    print("Number of processes: %d" % pool.processes)
+                    sampler = emcee.EnsembleSampler(n_walkers,cur_state.shape[1],
+                        worker_log_posterior, backend=backend, pool=pool)
+
+                    # run mcmc
+                    tik_mcmc = time.time()
+                    _ = sampler.run_mcmc(cur_state,nsteps=num_emcee_samps,progress=False)
+                    tok_mcmc = time.time()
+                    print("Avg. Time per MCMC Step: %.3f seconds"%((tok_mcmc-tik_mcmc)/num_emcee_samps))
+                    print("Avg. IPC overhead per MCMC Step: %.4f seconds" % (
+                        np.sum(pool.ipc_overhead()) / num_emcee_samps))
+                    print(pool.timing_summary())
+            finally:
+                shm.close()
+                shm.unlink()
+        elif use_multiprocess:
             from multiprocess import Pool, cpu_count
             cpu_count = cpu_count()
             print("Using multiprocessing for parallelization...")
             print("Number of CPUs: %d" % cpu_count)
-            with Pool() as pool:
+            with Pool(processes=num_processes) as pool:
                 sampler = emcee.EnsembleSampler(n_walkers,cur_state.shape[1],
                     log_posterior_fn,backend=backend, pool=pool)
 
@@ -899,13 +4096,19 @@ def fast_TDC(tdc_likelihood_list, data_vector_list, num_emcee_samps=1000,
                 print("Avg. Time per MCMC Step: %.3f seconds"%((tok_mcmc-tik_mcmc)/num_emcee_samps))
         else:
             sampler = emcee.EnsembleSampler(n_walkers, cur_state.shape[1],
-                                            log_posterior_fn, backend=backend)
+                                            log_posterior_fn, backend=backend,
+                                            vectorize=vectorize)
 
             # run mcmc
             tik_mcmc = time.time()
-            _ = sampler.run_mcmc(cur_state, nsteps=num_emcee_samps, progress=True)
+            _ = sampler.run_mcmc(cur_state, nsteps=num_emcee_samps,
+                                 progress=not distribute_lenses)
             tok_mcmc = time.time()
             print("Avg. Time per MCMC Step: %.3f seconds" % ((tok_mcmc - tik_mcmc) / num_emcee_samps))
+
+            if distribute_lenses:
+                # release the other ranks
+                tdc_likelihood_list.close()
     else: 
         print("Using MPI for parallelization...")
         from schwimmbad import MPIPool
@@ -1,12 +1,19 @@
 import unittest
 import numpy as np
 import jax.numpy as jnp
+import os
 import sys
+import pickle
+import tempfile
 import jax_cosmo
-from scipy.stats import norm,multivariate_normal,uniform
+from scipy.stats import norm,multivariate_normal,uniform,truncnorm
+from astropy.cosmology import w0waCDM
 sys.path.insert(0, '/Users/smericks/Desktop/StrongLensing/darkenergy-from-LAGN/')
 import tdc_sampler
+import tdc_jax_utils
 import Utils.tdc_utils as tdc_utils
+import Utils.data_vector_io as data_vector_io
+import Utils.shared_data_vectors as shared_data_vectors
 
 class TDCSamplerTests(unittest.TestCase):
 
@@ -263,6 +270,1241 @@ class TDCSamplerTests(unittest.TestCase):
 
         self.assertAlmostEqual(lens1_computed_ll,np.log(lens1_likelihood))
         
+    def _make_data_vector(self,td_measured,td_prec,fpd_samples,gamma_samples,
+        z_lens,z_src,kappa_ext_samples=None,sigma_v_measured=None,
+        sigma_v_prec=None,kin_pred_samples=None,beta_ani_samples=None):
+        """Builds a data vector dict w/ measurements replicated across fpd 
+            samples (older create_static_data_vectors() layout, see 
+            tdc_sampler.compact_measurements())
+        """
+        num_fpd_samples = fpd_samples.shape[1]
+        dim_fpd = fpd_samples.shape[2]
+        dv = {
+            'z_lens':np.asarray(z_lens),
+            'z_src':np.asarray(z_src),
+            'fpd_samples':fpd_samples,
+            'gamma_pred_samples':gamma_samples,
+            'kappa_ext_samples':kappa_ext_samples,
+            'td_measured':np.repeat(td_measured[:,np.newaxis,:],
+                num_fpd_samples,axis=1),
+            'td_likelihood_prec':np.repeat(td_prec[:,np.newaxis,:,:],
+                num_fpd_samples,axis=1),
+            'log_prob_gamma_samps_nu_int':uniform.logpdf(gamma_samples,
+                loc=1.,scale=2.)
+        }
+        dv['td_likelihood_prefactors'] = np.log((1/(2*np.pi)**(dim_fpd/2)) /
+            np.sqrt(np.linalg.det(np.linalg.inv(dv['td_likelihood_prec']))))
+        if kin_pred_samples is not None:
+            num_kin_bins = kin_pred_samples.shape[2]
+            dv['kin_pred_samples'] = kin_pred_samples
+            dv['sigma_v_measured'] = np.repeat(sigma_v_measured[:,np.newaxis,:],
+                num_fpd_samples,axis=1)
+            dv['sigma_v_likelihood_prec'] = np.repeat(
+                sigma_v_prec[:,np.newaxis,:,:],num_fpd_samples,axis=1)
+            dv['sigma_v_likelihood_prefactors'] = np.log(
+                (1/(2*np.pi)**(num_kin_bins/2)) / np.sqrt(np.linalg.det(
+                np.linalg.inv(dv['sigma_v_likelihood_prec']))))
+        if beta_ani_samples is not None:
+            dv['beta_ani_samples'] = beta_ani_samples
+            dv['log_prob_beta_ani_samps_nu_int'] = uniform.logpdf(
+                beta_ani_samples,loc=-0.5,scale=1.)
+        return dv
+
+    def test_td_suff_stats(self):
+
+        dv_dbls = self._make_data_vector(self.td_measured_dbls,
+            self.td_prec_dbls,self.fpd_pred_samples_dbls,
+            self.gamma_pred_samples_dbls,[0.5],[1.2],
+            kappa_ext_samples=self.kappa_ext_samples)
+        dv_quads = self._make_data_vector(self.td_measured_quads,
+            self.td_prec_quads,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.6],[1.3])
+        tdc_sampler.add_td_sufficient_statistics(dv_dbls)
+        tdc_sampler.add_td_sufficient_statistics(dv_quads)
+        tdc_sampler.data_vector_global = [dv_dbls,dv_quads]
+
+        for cosmo_model,hyperparameters in [('LCDM',[70.,0.3,2.0,0.2]),
+            ('LCDM_lambda_int',[70.,0.3,1.,0.1,2.0,0.2])]:
+            for i,dv in enumerate([dv_dbls,dv_quads]):
+                full_lklhd = tdc_sampler.TDCLikelihood(dv['fpd_samples'].shape,
+                    cosmo_model=cosmo_model)
+                suff_lklhd = tdc_sampler.TDCLikelihood(dv['fpd_samples'].shape,
+                    cosmo_model=cosmo_model,use_td_suff_stats=True)
+                # lambda_int samples are random, fix the seed for both calls
+                np.random.seed(0)
+                full_ll = full_lklhd.full_log_likelihood(hyperparameters,i)
+                np.random.seed(0)
+                suff_ll = suff_lklhd.full_log_likelihood(hyperparameters,i)
+                self.assertAlmostEqual(full_ll,suff_ll)
+
+    def test_kin_suff_stats(self):
+
+        dv_kin = self._make_data_vector(self.td_measured_quads,
+            self.td_prec_quads,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.6],[1.3],
+            kappa_ext_samples=self.kappa_ext_samples,
+            sigma_v_measured=self.sigma_v_measured,
+            sigma_v_prec=self.sigma_v_likelihood_prec,
+            kin_pred_samples=self.kin_pred_samples,
+            beta_ani_samples=self.beta_ani_samples)
+        dv_ifu = self._make_data_vector(self.td_measured_quads,
+            self.td_prec_quads,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.6],[1.3],
+            kappa_ext_samples=self.kappa_ext_samples,
+            sigma_v_measured=self.ifu_sigma_v_measured,
+            sigma_v_prec=self.ifu_sigma_v_likelihood_prec,
+            kin_pred_samples=self.ifu_sigma_v_pred_samples/1.2,
+            beta_ani_samples=self.beta_ani_samples)
+        for dv in [dv_kin,dv_ifu]:
+            tdc_sampler.add_td_sufficient_statistics(dv)
+            tdc_sampler.add_kin_sufficient_statistics(dv)
+        tdc_sampler.data_vector_global = [dv_kin,dv_ifu]
+
+        hyperparameters = [70.,0.3,1.,0.1,0.,0.1,2.0,0.2]
+        for i,dv in enumerate([dv_kin,dv_ifu]):
+            full_lklhd = tdc_sampler.TDCKinLikelihood(dv['fpd_samples'].shape,
+                dv['kin_pred_samples'].shape,
+                cosmo_model='LCDM_lambda_int_beta_ani')
+            suff_lklhd = tdc_sampler.TDCKinLikelihood(dv['fpd_samples'].shape,
+                dv['kin_pred_samples'].shape,
+                cosmo_model='LCDM_lambda_int_beta_ani',
+                use_td_suff_stats=True,use_kin_suff_stats=True)
+            np.random.seed(0)
+            full_ll = full_lklhd.full_log_likelihood(hyperparameters,i)
+            np.random.seed(0)
+            suff_ll = suff_lklhd.full_log_likelihood(hyperparameters,i)
+            self.assertAlmostEqual(full_ll,suff_ll)
+
+    def test_vectorized_log_posterior(self):
+
+        dv_dbls = self._make_data_vector(self.td_measured_dbls,
+            self.td_prec_dbls,self.fpd_pred_samples_dbls,
+            self.gamma_pred_samples_dbls,[0.5],[1.2],
+            kappa_ext_samples=self.kappa_ext_samples)
+        dv_kin = self._make_data_vector(self.td_measured_quads,
+            self.td_prec_quads,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.6],[1.3],
+            sigma_v_measured=self.ifu_sigma_v_measured,
+            sigma_v_prec=self.ifu_sigma_v_likelihood_prec,
+            kin_pred_samples=self.ifu_sigma_v_pred_samples/1.2)
+        tdc_sampler.data_vector_global = [dv_dbls,dv_kin]
+
+        # 3rd walker is outside of the prior
+        walkers = {
+            'LCDM':np.asarray([[70.,0.3,2.0,0.2],[65.,0.25,1.9,0.1],
+                [200.,0.3,2.0,0.2]]),
+            'w0waCDM':np.asarray([[70.,0.3,-1.,0.,2.0,0.2],
+                [65.,0.25,-0.8,0.3,1.9,0.1],[70.,0.3,-3.,0.,2.0,0.2]])
+        }
+        for cosmo_model in walkers.keys():
+            # distance engine (default), jax_cosmo, astropy
+            for distance_kwargs in [{},{'use_jax_cosmo':True},
+                {'use_astropy':True}]:
+                lklhd_list = [
+                    tdc_sampler.TDCLikelihood(dv_dbls['fpd_samples'].shape,
+                        cosmo_model=cosmo_model,**distance_kwargs),
+                    tdc_sampler.TDCKinLikelihood(dv_kin['fpd_samples'].shape,
+                        dv_kin['kin_pred_samples'].shape,
+                        cosmo_model=cosmo_model,**distance_kwargs)]
+                batched_lp = tdc_sampler.log_posterior(walkers[cosmo_model],
+                    cosmo_model,lklhd_list)
+                self.assertEqual(np.shape(batched_lp),(3,))
+                self.assertEqual(batched_lp[2],-np.inf)
+                for w in range(3):
+                    self.assertAlmostEqual(batched_lp[w],tdc_sampler.log_posterior(
+                        walkers[cosmo_model][w],cosmo_model,lklhd_list))
+
+    def test_lambda_int_beta_ani_prior(self):
+
+        # mu(gamma_lens) <= 2.5 & sigma(gamma_lens) <= 0.2 (before 
+        #   uniform_box_log_prior, the upper bounds were checked on 
+        #   mu & sigma(beta_ani) instead)
+        walkers = np.asarray([[70.,0.3,1.,0.1,0.,0.1,2.,0.1],
+            [70.,0.3,1.,0.1,0.,0.1,2.6,0.1],[70.,0.3,1.,0.1,0.,0.1,2.,0.25],
+            [70.,0.3,1.,0.1,0.,0.1,2.5,0.2]])
+        expected = [0.,-np.inf,-np.inf,0.]
+        np.testing.assert_array_equal(
+            tdc_sampler.LCDM_lambda_int_beta_ani_log_prior(walkers),expected)
+        for w in range(4):
+            self.assertEqual(tdc_sampler.LCDM_lambda_int_beta_ani_log_prior(
+                walkers[w]),expected[w])
+
+    def test_compact_measurements(self):
+
+        dv_kin = self._make_data_vector(self.td_measured_quads,
+            self.td_prec_quads,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.6],[1.3],
+            kappa_ext_samples=self.kappa_ext_samples,
+            sigma_v_measured=self.ifu_sigma_v_measured,
+            sigma_v_prec=self.ifu_sigma_v_likelihood_prec,
+            kin_pred_samples=self.ifu_sigma_v_pred_samples/1.2)
+        tdc_sampler.add_td_sufficient_statistics(dv_kin)
+        tdc_sampler.add_kin_sufficient_statistics(dv_kin)
+        dv_compact = tdc_sampler.compact_measurements(dict(dv_kin))
+        self.assertEqual(dv_compact['td_likelihood_prec'].shape,(1,3,3))
+        self.assertEqual(dv_compact['sigma_v_measured'].shape,
+            self.ifu_sigma_v_measured.shape)
+        self.assertEqual(dv_compact['td_likelihood_prefactors'].shape,(1,))
+        # sufficient statistics from compact measurements match
+        tdc_sampler.add_td_sufficient_statistics(dv_compact)
+        tdc_sampler.add_kin_sufficient_statistics(dv_compact)
+        self.assertEqual(dv_compact['td_mPm'].shape,(1,))
+        for key in ['td_aPa','td_aPm','sigma_v_aPa','sigma_v_aPm']:
+            np.testing.assert_allclose(dv_compact[key],dv_kin[key])
+        # prefactors w/out inverting the precision matrices
+        np.testing.assert_allclose(tdc_sampler.gaussian_log_prefactors(
+            self.td_prec_quads),dv_compact['td_likelihood_prefactors'])
+
+        walkers = np.asarray([[70.,0.3,2.0,0.2],[65.,0.25,1.9,0.1]])
+        for use_suff_stats in [False,True]:
+            lklhd = tdc_sampler.TDCKinLikelihood(dv_kin['fpd_samples'].shape,
+                dv_kin['kin_pred_samples'].shape,cosmo_model='LCDM',
+                use_td_suff_stats=use_suff_stats,
+                use_kin_suff_stats=use_suff_stats)
+            for hyp in [walkers,walkers[0]]:
+                tdc_sampler.data_vector_global = [dv_kin]
+                replicated = lklhd.full_log_likelihood(hyp,0)
+                tdc_sampler.data_vector_global = [dv_compact]
+                compact = lklhd.full_log_likelihood(hyp,0)
+                np.testing.assert_allclose(compact,replicated,rtol=1e-10)
+
+        # measurements that really vary per sample are not truncated
+        dv_varying = dict(dv_kin)
+        dv_varying['td_measured'] = np.array(dv_kin['td_measured'],
+            dtype=float)
+        dv_varying['td_measured'][:,-1] += 1.
+        with self.assertRaises(ValueError):
+            tdc_sampler.compact_measurements(dv_varying)
+
+    def test_data_vectors_h5(self):
+
+        dv_dbls = self._make_data_vector(self.td_measured_dbls,
+            self.td_prec_dbls,self.fpd_pred_samples_dbls,
+            self.gamma_pred_samples_dbls,[0.5],[1.2],
+            kappa_ext_samples=self.kappa_ext_samples)
+        dv_kin = self._make_data_vector(self.td_measured_quads,
+            self.td_prec_quads,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.6],[1.3],
+            kappa_ext_samples=self.kappa_ext_samples,
+            sigma_v_measured=self.ifu_sigma_v_measured,
+            sigma_v_prec=self.ifu_sigma_v_likelihood_prec,
+            kin_pred_samples=self.ifu_sigma_v_pred_samples/1.2)
+        dv_list = [tdc_sampler.compact_measurements(dv)
+            for dv in [dv_kin,dv_dbls]]
+        for dv in dv_list:
+            tdc_sampler.add_td_sufficient_statistics(dv)
+        tdc_sampler.add_kin_sufficient_statistics(dv_kin)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir,'static_datavectors.h5')
+            # group names out of alphabetical order: order kept by index
+            data_vector_io.write_data_vectors_h5(filepath,dv_list,
+                subsample_names=['quads_kin','dbls'])
+            for mmap in [True,False]:
+                dv_read = data_vector_io.read_data_vectors_h5(filepath,
+                    mmap=mmap)
+                self.assertEqual(len(dv_read),2)
+                for dv,dv_h5 in zip(dv_list,dv_read):
+                    self.assertEqual(set(dv.keys()),set(dv_h5.keys()))
+                    for key,value in dv.items():
+                        if value is None:
+                            self.assertIsNone(dv_h5[key])
+                        else:
+                            np.testing.assert_array_equal(dv_h5[key],value)
+                self.assertEqual(isinstance(dv_read[0]['fpd_samples'],
+                    np.memmap),mmap)
+
+                walkers = np.asarray([[70.,0.3,2.0,0.2],[65.,0.25,1.9,0.1]])
+                lklhd = tdc_sampler.TDCKinLikelihood(
+                    dv_kin['fpd_samples'].shape,
+                    dv_kin['kin_pred_samples'].shape,cosmo_model='LCDM')
+                tdc_sampler.data_vector_global = dv_list
+                expected = lklhd.full_log_likelihood(walkers,0)
+                tdc_sampler.data_vector_global = dv_read
+                np.testing.assert_allclose(
+                    lklhd.full_log_likelihood(walkers,0),expected)
+                # release memmaps before the directory is removed
+                del dv_read
+                tdc_sampler.data_vector_global = dv_list
+
+    def test_shared_data_vectors(self):
+
+        dv_kin = self._make_data_vector(self.td_measured_quads,
+            self.td_prec_quads,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.6],[1.3],
+            kappa_ext_samples=self.kappa_ext_samples,
+            sigma_v_measured=self.ifu_sigma_v_measured,
+            sigma_v_prec=self.ifu_sigma_v_likelihood_prec,
+            kin_pred_samples=self.ifu_sigma_v_pred_samples/1.2)
+        dv_kin = tdc_sampler.compact_measurements(dv_kin)
+        lklhd = tdc_sampler.TDCKinLikelihood(dv_kin['fpd_samples'].shape,
+            dv_kin['kin_pred_samples'].shape,cosmo_model='LCDM',
+            use_td_suff_stats=True,use_kin_suff_stats=True)
+        tdc_sampler.add_missing_sufficient_statistics([dv_kin],[lklhd])
+        self.assertIn('td_aPa',dv_kin)
+        self.assertIn('sigma_v_aPa',dv_kin)
+
+        layout,nbytes = shared_data_vectors.data_vector_layout([dv_kin])
+        for entry in layout[0].values():
+            if entry[0] == 'array':
+                self.assertEqual(entry[1]%shared_data_vectors.SHARED_ALIGNMENT,0)
+
+        shm,layout = shared_data_vectors.share_data_vectors_posix([dv_kin])
+        try:
+            dv_shared = shared_data_vectors.attach_data_vectors_posix(
+                shm.name,layout)[0]
+            for key,value in dv_kin.items():
+                if value is None:
+                    self.assertIsNone(dv_shared[key])
+                else:
+                    np.testing.assert_array_equal(dv_shared[key],value)
+            # zero-copy, read-only views
+            self.assertFalse(dv_shared['fpd_samples'].flags.owndata)
+            with self.assertRaises(ValueError):
+                dv_shared['fpd_samples'][0] = 0.
+
+            walkers = np.asarray([[70.,0.3,2.0,0.2],[65.,0.25,1.9,0.1]])
+            tdc_sampler.data_vector_global = [dv_kin]
+            expected = lklhd.full_log_likelihood(walkers,0)
+            tdc_sampler.data_vector_global = [dv_shared]
+            np.testing.assert_allclose(lklhd.full_log_likelihood(walkers,0),
+                expected)
+        finally:
+            tdc_sampler.data_vector_global = [dv_kin]
+            del dv_shared
+            shared_data_vectors._shared_buffers.pop().close()
+            shm.close()
+            shm.unlink()
+
+    def _make_multi_lens_inputs(self,num_lenses=3):
+        """Builds a kinematic quads and a doubles data vector, each w/
+            num_lenses lenses (at different redshifts), and their likelihoods
+        """
+
+        dv_kin = self._make_data_vector(self.td_measured_quads,
+            self.td_prec_quads,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.6],[1.3],
+            kappa_ext_samples=self.kappa_ext_samples,
+            sigma_v_measured=self.ifu_sigma_v_measured,
+            sigma_v_prec=self.ifu_sigma_v_likelihood_prec,
+            kin_pred_samples=self.ifu_sigma_v_pred_samples/1.2)
+        dv_dbls = self._make_data_vector(self.td_measured_dbls,
+            self.td_prec_dbls,self.fpd_pred_samples_dbls,
+            self.gamma_pred_samples_dbls,[0.5],[1.2],
+            kappa_ext_samples=self.kappa_ext_samples)
+        dv_list = []
+        for dv in [dv_kin,dv_dbls]:
+            dv = tdc_sampler.compact_measurements(dv)
+            dv = {key:(np.repeat(value,num_lenses,axis=0)
+                if isinstance(value,np.ndarray) else value)
+                for key,value in dv.items()}
+            dv['z_lens'] = dv['z_lens'] + 0.1*np.arange(num_lenses)
+            dv_list.append(dv)
+        lklhd_list = [
+            tdc_sampler.TDCKinLikelihood(dv_list[0]['fpd_samples'].shape,
+                dv_list[0]['kin_pred_samples'].shape,cosmo_model='LCDM',
+                use_td_suff_stats=True,use_kin_suff_stats=True),
+            tdc_sampler.TDCLikelihood(dv_list[1]['fpd_samples'].shape,
+                cosmo_model='LCDM')]
+        tdc_sampler.add_missing_sufficient_statistics(dv_list,lklhd_list)
+
+        return dv_list,lklhd_list
+
+    def test_distributed_likelihood(self):
+
+        class RankComm():
+            # stands in for an mpi4py communicator (rank/size only)
+            def __init__(self,rank,size):
+                self.rank, self.size = rank, size
+            def Get_rank(self):
+                return self.rank
+            def Get_size(self):
+                return self.size
+
+        for num_lenses,num_shards in [(5,2),(3,3),(2,3)]:
+            edges = [tdc_sampler.lens_shard(num_lenses,num_shards,r)
+                for r in range(num_shards)]
+            self.assertEqual(edges[0].start,0)
+            self.assertEqual(edges[-1].stop,num_lenses)
+            for r in range(1,num_shards):
+                self.assertEqual(edges[r].start,edges[r-1].stop)
+
+        dv_list,lklhd_list = self._make_multi_lens_inputs()
+        walkers = np.asarray([[70.,0.3,2.0,0.2],[65.,0.25,1.9,0.1]])
+        tdc_sampler.data_vector_global = dv_list
+        expected = tdc_sampler.total_log_likelihood(walkers,lklhd_list)
+
+        for num_ranks in [2,4]:
+            for group_likelihoods in [False,True]:
+                total = 0.
+                for rank in range(num_ranks):
+                    distributed = tdc_sampler.DistributedLikelihood(lklhd_list,
+                        dv_list,comm=RankComm(rank,num_ranks),
+                        group_likelihoods=group_likelihoods)
+                    self.assertEqual(distributed.is_master(),rank==0)
+                    tdc_sampler.data_vector_global = distributed.data_vector_list
+                    local = distributed.local_log_likelihood(walkers)
+                    self.assertEqual(local.shape,(2,))
+                    total = total + local
+                np.testing.assert_allclose(total,expected,rtol=1e-10)
+        tdc_sampler.data_vector_global = dv_list
+
+    def test_threaded_likelihood(self):
+
+        dv_list,lklhd_list = self._make_multi_lens_inputs(num_lenses=5)
+        walkers = np.asarray([[70.,0.3,2.0,0.2],[65.,0.25,1.9,0.1]])
+        tdc_sampler.data_vector_global = dv_list
+        expected = tdc_sampler.total_log_likelihood(walkers,lklhd_list)
+        expected_single = tdc_sampler.total_log_likelihood(walkers[0],lklhd_list)
+
+        for num_chunks in [1,2,7]:
+            for group_likelihoods in [False,True]:
+                threaded = tdc_sampler.ThreadedLikelihood(lklhd_list,dv_list,
+                    num_threads=2,num_chunks=num_chunks,
+                    group_likelihoods=group_likelihoods)
+                # chunks are views into the data vectors
+                self.assertTrue(np.shares_memory(
+                    threaded.data_vector_list[0]['fpd_samples'],
+                    dv_list[0]['fpd_samples']))
+                tdc_sampler.data_vector_global = threaded.data_vector_list
+                np.testing.assert_allclose(tdc_sampler.total_log_likelihood(
+                    walkers,threaded),expected,rtol=1e-10)
+                np.testing.assert_allclose(threaded.full_log_likelihood(
+                    walkers[0]),expected_single,rtol=1e-10)
+                threaded.close()
+        tdc_sampler.data_vector_global = dv_list
+
+    def test_hybrid_schedule(self):
+
+        # 2000 lenses, 40 walkers, 128 cores: all walkers at once, rest of 
+        #   the node on lens threads
+        schedule = tdc_sampler.plan_hybrid_schedule(128,40,2000,1e-3,1e-4)
+        self.assertEqual(schedule.n_walker_groups,20)
+        self.assertEqual(schedule.n_threads,6)
+        # per-call overhead only: no lens threads
+        schedule = tdc_sampler.plan_hybrid_schedule(16,40,2000,1e-2,0.)
+        self.assertEqual((schedule.n_walker_groups,schedule.n_threads),(16,1))
+        # a single pair of walkers: all cores on lens threads
+        schedule = tdc_sampler.plan_hybrid_schedule(8,2,100,0.,1e-4)
+        self.assertEqual((schedule.n_walker_groups,schedule.n_threads),(1,8))
+        for num_cores in [1,3,64]:
+            schedule = tdc_sampler.plan_hybrid_schedule(num_cores,10,5,1e-3,1e-3)
+            self.assertLessEqual(schedule.n_walker_groups*schedule.n_threads,
+                num_cores)
+
+        dv_list,lklhd_list = self._make_multi_lens_inputs(num_lenses=4)
+        tdc_sampler.data_vector_global = dv_list
+        per_call_overhead,per_lens_cost = tdc_sampler.calibrate_lens_cost(
+            lklhd_list,dv_list,[70.,0.3,2.0,0.2],num_repeats=1)
+        self.assertGreaterEqual(per_call_overhead,0.)
+        self.assertGreater(per_lens_cost,0.)
+        self.assertIs(tdc_sampler.data_vector_global,dv_list)
+
+        # sent to worker processes w/out threads or data vectors
+        threaded = tdc_sampler.ThreadedLikelihood(lklhd_list,dv_list,
+            num_threads=2)
+        tdc_sampler.data_vector_global = threaded.data_vector_list
+        expected = threaded.full_log_likelihood([70.,0.3,2.0,0.2])
+        threaded_copy = pickle.loads(pickle.dumps(threaded))
+        self.assertIsNone(threaded_copy.data_vector_list)
+        np.testing.assert_allclose(threaded_copy.full_log_likelihood(
+            [70.,0.3,2.0,0.2]),expected)
+        # i.e. a spawned worker: the global is not the chunks
+        for data_vector_global in [None,dv_list]:
+            tdc_sampler.data_vector_global = data_vector_global
+            with self.assertRaises(ValueError):
+                threaded_copy.full_log_likelihood([70.,0.3,2.0,0.2])
+        threaded.close()
+        threaded_copy.close()
+        tdc_sampler.data_vector_global = dv_list
+
+        # walker groups on persistent workers (any start method)
+        test_chain = tdc_sampler.fast_TDC(lklhd_list,dv_list,
+            num_emcee_samps=2,n_walkers=8,num_cores=2)
+        self.assertEqual(test_chain.shape,(2,8,4))
+        self.assertTrue(np.all(np.isfinite(test_chain)))
+        tdc_sampler.data_vector_global = dv_list
+
+    def test_likelihood_worker_pool(self):
+
+        dv_list,lklhd_list = self._make_multi_lens_inputs()
+        walkers = np.asarray([[70.,0.3,2.0,0.2],[65.,0.25,1.9,0.1],
+            [75.,0.35,2.1,0.15]])
+        tdc_sampler.data_vector_global = dv_list
+        expected = [tdc_sampler.log_posterior(w,'LCDM',lklhd_list)
+            for w in walkers]
+
+        # spawned workers attach the shared data vectors & build the
+        #   likelihoods once
+        shm,layout = shared_data_vectors.share_data_vectors_posix(dv_list)
+        try:
+            with tdc_sampler.LikelihoodWorkerPool(lklhd_list,(shm.name,layout),
+                'LCDM',processes=1,likelihood_threads=2,
+                start_method='spawn') as pool:
+                for _ in range(2):
+                    log_probs = pool.map(tdc_sampler.worker_log_posterior,
+                        walkers)
+                    np.testing.assert_allclose(log_probs,expected,rtol=1e-10)
+                self.assertEqual(len(pool.wall_times),2)
+                self.assertEqual(pool.ipc_overhead().shape,(2,))
+                self.assertLess(pool.payload_bytes,1000)
+        finally:
+            shm.close()
+            shm.unlink()
+
+        for use_multiprocess,use_mpi in [(False,False),(True,True)]:
+            with self.assertRaises(ValueError):
+                tdc_sampler.fast_TDC(lklhd_list,dv_list,
+                    use_multiprocess=use_multiprocess,use_mpi=use_mpi,
+                    persistent_workers=True)
+
+    def test_common_random_numbers(self):
+
+        uniforms = np.linspace(1e-6,1.,101)
+        for mu,sigma in [(1.,0.1),(0.1,0.5),(-2.,0.5)]:
+            np.testing.assert_allclose(
+                tdc_sampler.positive_truncnorm_from_uniforms(mu,sigma,uniforms),
+                truncnorm.ppf(1-uniforms,-mu/sigma,np.inf,loc=mu,scale=sigma),
+                rtol=1e-8,atol=1e-12)
+        samples = tdc_sampler.positive_truncnorm_from_uniforms(0.1,0.5,
+            1.-np.random.default_rng(0).random(200000))
+        self.assertGreaterEqual(np.min(samples),0.)
+        self.assertAlmostEqual(np.mean(samples),
+            truncnorm.mean(-0.2,np.inf,loc=0.1,scale=0.5),places=2)
+
+        dv_list,_ = self._make_multi_lens_inputs(num_lenses=4)
+        lklhd_list = [
+            tdc_sampler.TDCKinLikelihood(dv_list[0]['fpd_samples'].shape,
+                dv_list[0]['kin_pred_samples'].shape,
+                cosmo_model='LCDM_lambda_int',lambda_int_seed=(3,0)),
+            tdc_sampler.TDCLikelihood(dv_list[1]['fpd_samples'].shape,
+                cosmo_model='LCDM_lambda_int',lambda_int_seed=(3,1))]
+        walkers = np.asarray([[70.,0.3,1.0,0.05,2.0,0.2],
+            [65.,0.25,0.95,0.1,1.9,0.1]])
+        tdc_sampler.data_vector_global = dv_list
+        # deterministic in the hyperparameters, batch = one walker at a time
+        batched = tdc_sampler.total_log_likelihood(walkers,lklhd_list)
+        np.testing.assert_array_equal(batched,
+            tdc_sampler.total_log_likelihood(walkers,lklhd_list))
+        for w in range(2):
+            self.assertAlmostEqual(batched[w],tdc_sampler.total_log_likelihood(
+                walkers[w],lklhd_list))
+        # continuous in mu(lambda_int)
+        shifted = walkers.copy()
+        shifted[:,2] += 1e-7
+        np.testing.assert_allclose(tdc_sampler.total_log_likelihood(
+            shifted,lklhd_list),batched,rtol=1e-6)
+
+        # same samples in a worker process & in lens chunks
+        lklhd_copy = pickle.loads(pickle.dumps(lklhd_list[0]))
+        self.assertIsNone(lklhd_copy._lambda_int_base_uniforms)
+        np.testing.assert_array_equal(lklhd_copy.lambda_int_base_uniforms(),
+            lklhd_list[0].lambda_int_base_uniforms())
+        threaded = tdc_sampler.ThreadedLikelihood(lklhd_list,dv_list,
+            num_threads=2,num_chunks=3)
+        tdc_sampler.data_vector_global = threaded.data_vector_list
+        np.testing.assert_allclose(threaded.full_log_likelihood(walkers),
+            batched,rtol=1e-10)
+        threaded.close()
+        tdc_sampler.data_vector_global = dv_list
+
+    def test_lambda_int_marginalization(self):
+
+        dv_list,_ = self._make_multi_lens_inputs(num_lenses=2)
+        dv_dbls = dv_list[1]
+        lklhd_analytic = tdc_sampler.TDCLikelihood(dv_dbls['fpd_samples'].shape,
+            cosmo_model='LCDM_lambda_int',marginalize_lambda_int=True)
+        lklhd_fixed = tdc_sampler.TDCLikelihood(dv_dbls['fpd_samples'].shape,
+            cosmo_model='LCDM_lambda_int',use_td_suff_stats=True)
+        tdc_sampler.add_missing_sufficient_statistics([dv_dbls],[lklhd_analytic])
+        tdc_sampler.data_vector_global = [dv_dbls]
+
+        for hyp in [[70.,0.3,1.0,0.05,2.0,0.2],[70.,0.3,0.05,0.1,2.0,0.2]]:
+            proposed_cosmo = lklhd_analytic.construct_proposed_cosmo(hyp)
+            analytic = lklhd_analytic.td_log_likelihoods_lambda_int_marginalized(
+                proposed_cosmo,0,hyp)
+            # quadrature over the truncated normal population (the td term
+            #   can pull the posterior on lambda_int well past mu+10*sigma)
+            mu,sigma = hyp[2],hyp[3]
+            lambda_grid = np.linspace(0.,5.,8001)
+            weights = truncnorm.pdf(lambda_grid,-mu/sigma,np.inf,loc=mu,
+                scale=sigma)
+            integrand = np.stack([np.exp(lklhd_fixed.td_log_likelihoods_from_proposal(
+                proposed_cosmo,0,np.full(dv_dbls['gamma_pred_samples'].shape,lint)))*w
+                for lint,w in zip(lambda_grid,weights)])
+            numeric = np.log(np.trapezoid(integrand,lambda_grid,axis=0))
+            np.testing.assert_allclose(analytic,numeric,rtol=1e-5)
+
+        # batch of walkers, no lambda_int draws
+        walkers = np.asarray([[70.,0.3,1.0,0.05,2.0,0.2],
+            [65.,0.25,0.95,0.1,1.9,0.1]])
+        self.assertIsNone(lklhd_analytic.lambda_int_samples_from_proposal(walkers))
+        batched = lklhd_analytic.full_log_likelihood(walkers,0)
+        for w in range(2):
+            self.assertAlmostEqual(batched[w],
+                lklhd_analytic.full_log_likelihood(walkers[w],0))
+
+        with self.assertRaises(ValueError):
+            tdc_sampler.TDCLikelihood(dv_dbls['fpd_samples'].shape,
+                cosmo_model='LCDM',marginalize_lambda_int=True)
+
+        # runs through fast_TDC
+        dv_list,_ = self._make_multi_lens_inputs(num_lenses=4)
+        lklhd_analytic = tdc_sampler.TDCLikelihood(
+            dv_list[1]['fpd_samples'].shape,cosmo_model='LCDM_lambda_int',
+            marginalize_lambda_int=True)
+        test_chain = tdc_sampler.fast_TDC([lklhd_analytic],[dv_list[1]],
+            num_emcee_samps=2,n_walkers=12)
+        self.assertEqual(test_chain.shape,(2,12,6))
+        self.assertTrue(np.all(np.isfinite(test_chain)))
+
+    def test_log_mean_exp(self):
+
+        log_terms = norm.rvs(size=(2,3,100),random_state=0)
+        expected = np.log(np.mean(np.exp(log_terms),axis=-1))
+        np.testing.assert_allclose(tdc_sampler.log_mean_exp(log_terms),expected)
+        np.testing.assert_allclose(tdc_sampler.sum_log_mean_exp(log_terms),
+            np.sum(expected,axis=-1))
+        self.assertAlmostEqual(tdc_sampler.sum_log_mean_exp(log_terms[0]),
+            np.sum(expected[0]))
+        np.testing.assert_allclose(
+            tdc_jax_utils.jax_log_mean_exp(jnp.asarray(log_terms)),expected)
+
+        # no underflow far from the samples
+        np.testing.assert_allclose(tdc_sampler.log_mean_exp(log_terms-2000.),
+            expected-2000.)
+        # lens w/ every sample at -inf: -inf for that walker only
+        log_terms[1,2] = -np.inf
+        self.assertEqual(tdc_sampler.log_mean_exp(log_terms)[1,2],-np.inf)
+        log_likelihood = tdc_sampler.sum_log_mean_exp(log_terms)
+        self.assertAlmostEqual(log_likelihood[0],np.sum(expected[0]))
+        self.assertEqual(log_likelihood[1],-np.inf)
+        self.assertEqual(tdc_sampler.sum_log_mean_exp(log_terms[1]),-np.inf)
+
+        # proposal far from the data: finite log likelihood, not log(0)
+        dv_list,lklhd_list = self._make_multi_lens_inputs(num_lenses=3)
+        tdc_sampler.data_vector_global = dv_list
+        log_likelihood = tdc_sampler.total_log_likelihood([200.,0.3,2.0,0.2],
+            lklhd_list)
+        self.assertTrue(np.isfinite(log_likelihood))
+        self.assertLess(log_likelihood,-1000.)
+
+        # in place: same result, the buffer is overwritten
+        log_terms = norm.rvs(size=(2,3,100),random_state=0)
+        buffer = log_terms.copy()
+        np.testing.assert_allclose(
+            tdc_sampler.sum_log_mean_exp(buffer,in_place=True),
+            np.sum(expected,axis=-1))
+        self.assertFalse(np.allclose(buffer,log_terms))
+
+    def test_split_lens_chunks(self):
+
+        dv_list,lklhd_list = self._make_multi_lens_inputs(num_lenses=4)
+        # tighter time delays for the last doubles
+        dv_list[1]['td_likelihood_prec'] = dv_list[1]['td_likelihood_prec'].copy()
+        dv_list[1]['td_likelihood_prec'][3] *= 4.
+        dv_list[1]['td_likelihood_prefactors'] = tdc_sampler.gaussian_log_prefactors(
+            dv_list[1]['td_likelihood_prec'])
+        self.assertEqual(np.argmax(tdc_sampler.lens_log_prefactors(dv_list[1])),3)
+
+        chunk_lklhd_list,chunk_dv_list = tdc_sampler.split_lens_chunks(
+            lklhd_list,dv_list,2)
+        self.assertEqual(len(chunk_lklhd_list),4)
+        self.assertEqual(sum(lklhd.num_lenses for lklhd in chunk_lklhd_list),8)
+        # tightest first
+        np.testing.assert_array_equal(chunk_dv_list[0]['z_lens'],
+            dv_list[1]['z_lens'][2:])
+        max_log_prefactors = [np.max(tdc_sampler.lens_log_prefactors(dv))
+            for dv in chunk_dv_list]
+        self.assertEqual(max_log_prefactors,
+            sorted(max_log_prefactors,reverse=True))
+        # views of the data vectors
+        self.assertTrue(np.shares_memory(chunk_dv_list[0]['fpd_samples'],
+            dv_list[1]['fpd_samples']))
+
+        walkers = np.asarray([[70.,0.3,2.0,0.2],[65.,0.25,1.9,0.1]])
+        tdc_sampler.data_vector_global = dv_list
+        expected = tdc_sampler.total_log_likelihood(walkers,lklhd_list)
+        tdc_sampler.data_vector_global = chunk_dv_list
+        np.testing.assert_allclose(
+            tdc_sampler.total_log_likelihood(walkers,chunk_lklhd_list),expected)
+        self.assertAlmostEqual(
+            tdc_sampler.total_log_likelihood(walkers[0],chunk_lklhd_list),
+            expected[0])
+
+        # -inf in the first chunk: the other chunks are not evaluated
+        calls = []
+        def counting_log_likelihood(hyperparameters,index_likelihood_list):
+            calls.append(index_likelihood_list)
+            return np.zeros(np.shape(hyperparameters)[:-1])
+        chunk_lklhd_list[0].full_log_likelihood = (lambda hyperparameters,
+            index_likelihood_list: np.full(np.shape(hyperparameters)[:-1],-np.inf))
+        for lklhd in chunk_lklhd_list[1:]:
+            lklhd.full_log_likelihood = counting_log_likelihood
+        self.assertEqual(tdc_sampler.total_log_likelihood(walkers[0],
+            chunk_lklhd_list),-np.inf)
+        self.assertEqual(calls,[])
+
+        with self.assertRaises(ValueError):
+            tdc_sampler.split_lens_chunks(
+                [tdc_sampler.PackedLikelihood(lklhd_list)],
+                [tdc_sampler.pack_data_vectors(dv_list,lklhd_list)],2)
+
+    def test_prediction_kernels(self):
+
+        dv_list,_ = self._make_multi_lens_inputs(num_lenses=3)
+        dv_one_image = dict(dv_list[0])
+        dv_one_image['fpd_samples'] = dv_list[0]['fpd_samples'][...,:1]
+        dv_one_image['kin_pred_samples'] = dv_list[0]['kin_pred_samples'][...,:1]
+        tdc_sampler.data_vector_global = [dv_list[0],dv_one_image]
+        walkers = np.asarray([[70.,0.3,1.0,0.05,2.0,0.2],
+            [65.,0.25,0.95,0.1,1.9,0.1]])
+
+        for index,dv in enumerate([dv_list[0],dv_one_image]):
+            lklhd = tdc_sampler.TDCKinLikelihood(dv['fpd_samples'].shape,
+                dv['kin_pred_samples'].shape,cosmo_model='LCDM_lambda_int',
+                lambda_int_seed=(5,0))
+            for hyperparameters in [walkers,walkers[0]]:
+                proposed_cosmo, lambda_int_samples = (
+                    lklhd.process_hyperparam_proposal(hyperparameters))
+                distances = lklhd.distances_from_proposed_cosmo(
+                    proposed_cosmo,index)
+                one_minus_kappa = 1. - dv['kappa_ext_samples']
+                td_pred = lklhd.td_pred_from_fpd_pred(proposed_cosmo,index,
+                    lambda_int_samples,distances)
+                np.testing.assert_allclose(td_pred,tdc_utils.td_from_ddt_fpd(
+                    distances['Ddt'][...,np.newaxis,np.newaxis],
+                    dv['fpd_samples'])*(lambda_int_samples*
+                    one_minus_kappa)[...,np.newaxis],rtol=1e-13)
+                sigma_v_pred = lklhd.sigma_v_pred_from_kin_pred(proposed_cosmo,
+                    index,lambda_int_samples,distances)
+                np.testing.assert_allclose(sigma_v_pred,np.sqrt(
+                    distances['Ds_div_Dds'][...,np.newaxis,np.newaxis])*
+                    dv['kin_pred_samples']*np.sqrt(lambda_int_samples*
+                    one_minus_kappa)[...,np.newaxis],rtol=1e-13)
+                if index == 0:
+                    td_pred_all, sigma_v_pred_all = td_pred, sigma_v_pred
+            # same prediction for an image/bin, whatever the # of images/bins
+            np.testing.assert_array_equal(td_pred,td_pred_all[...,:td_pred.shape[-1]])
+            np.testing.assert_array_equal(sigma_v_pred,
+                sigma_v_pred_all[...,:sigma_v_pred.shape[-1]])
+
+    def test_likelihood_workspace(self):
+
+        dv_list,_ = self._make_multi_lens_inputs(num_lenses=3)
+        tdc_sampler.data_vector_global = dv_list
+        walkers = np.asarray([[70.,0.3,1.0,0.05,2.0,0.2],
+            [65.,0.25,0.95,0.1,1.9,0.1]])
+
+        for use_suff_stats in [False,True]:
+            lklhd_lists = [[
+                tdc_sampler.TDCKinLikelihood(dv_list[0]['fpd_samples'].shape,
+                    dv_list[0]['kin_pred_samples'].shape,
+                    cosmo_model='LCDM_lambda_int',
+                    use_td_suff_stats=use_suff_stats,
+                    use_kin_suff_stats=use_suff_stats,lambda_int_seed=(4,0),
+                    use_workspace=use_workspace),
+                tdc_sampler.TDCLikelihood(dv_list[1]['fpd_samples'].shape,
+                    cosmo_model='LCDM_lambda_int',
+                    use_td_suff_stats=use_suff_stats,lambda_int_seed=(4,1),
+                    use_workspace=use_workspace)]
+                for use_workspace in [True,False]]
+            tdc_sampler.add_missing_sufficient_statistics(dv_list,
+                lklhd_lists[0])
+            # batch of proposals & single proposal
+            np.testing.assert_allclose(
+                tdc_sampler.total_log_likelihood(walkers,lklhd_lists[0]),
+                tdc_sampler.total_log_likelihood(walkers,lklhd_lists[1]),
+                rtol=1e-10)
+            self.assertAlmostEqual(
+                tdc_sampler.total_log_likelihood(walkers[1],lklhd_lists[0]),
+                tdc_sampler.total_log_likelihood(walkers[1],lklhd_lists[1]))
+
+        # scratch arrays are allocated once, for the largest batch, & re-used
+        lklhd = lklhd_lists[0][0]
+        buffers = lklhd.workspace().buffers(walkers.shape[:-1])
+        tdc_sampler.total_log_likelihood(walkers,lklhd_lists[0])
+        self.assertIs(lklhd.workspace().buffers(walkers.shape[:-1]),buffers)
+        self.assertEqual(buffers['log_likelihoods'].shape,
+            (2,)+dv_list[0]['fpd_samples'].shape[:2])
+        self.assertNotIn('td_pred',buffers)
+        nbytes = lklhd.workspace().nbytes()
+        self.assertGreater(nbytes,0)
+        # smaller batches & single proposals share the same storage
+        for batch_shape in [(1,),()]:
+            self.assertTrue(np.shares_memory(
+                lklhd.workspace().buffers(batch_shape)['exponent'],
+                buffers['exponent']))
+        self.assertEqual(lklhd.workspace().nbytes(),nbytes)
+        # a larger batch replaces the storage
+        lklhd.workspace().buffers((4,))
+        self.assertEqual(lklhd.workspace().nbytes(),2*nbytes)
+        np.testing.assert_allclose(
+            tdc_sampler.total_log_likelihood(walkers,lklhd_lists[0]),
+            tdc_sampler.total_log_likelihood(walkers,lklhd_lists[1]),
+            rtol=1e-10)
+        self.assertIsNone(pickle.loads(pickle.dumps(lklhd))._workspace)
+        self.assertIsNone(tdc_sampler.shard_likelihood(lklhd,
+            slice(0,1))._workspace)
+
+    def test_sample_precision(self):
+
+        dv_list,_ = self._make_multi_lens_inputs(num_lenses=3)
+        walkers = np.asarray([[70.,0.3,1.0,0.05,2.0,0.2],
+            [65.,0.25,0.95,0.1,1.9,0.1]])
+
+        log_likelihoods = []
+        for sample_dtype in [np.float64,np.float32]:
+            lklhd_list = [
+                tdc_sampler.TDCKinLikelihood(dv_list[0]['fpd_samples'].shape,
+                    dv_list[0]['kin_pred_samples'].shape,
+                    cosmo_model='LCDM_lambda_int',lambda_int_seed=(6,0),
+                    sample_dtype=sample_dtype),
+                tdc_sampler.TDCLikelihood(dv_list[1]['fpd_samples'].shape,
+                    cosmo_model='LCDM_lambda_int',use_td_suff_stats=True,
+                    lambda_int_seed=(6,1),sample_dtype=sample_dtype)]
+            tdc_sampler.add_missing_sufficient_statistics(dv_list,lklhd_list)
+            tdc_sampler.data_vector_global = [tdc_sampler.set_sample_precision(
+                dict(dv),sample_dtype) for dv in dv_list]
+            log_likelihoods.append([tdc_sampler.total_log_likelihood(
+                hyperparameters,lklhd_list)
+                for hyperparameters in [walkers,walkers[0]]])
+
+        # float32 samples & arithmetic, float64 redshifts, per-lens arrays,
+        #   sufficient statistics & accumulation
+        dv = tdc_sampler.data_vector_global[1]
+        self.assertEqual(dv['fpd_samples'].dtype,np.float32)
+        self.assertEqual(dv['gamma_pred_samples'].dtype,np.float32)
+        for key in ['z_lens','td_measured','td_likelihood_prec',
+            'td_likelihood_prefactors']:
+            self.assertNotEqual(dv[key].dtype,np.float32)
+        for key in ['td_aPa','td_aPm','td_mPm']:
+            self.assertEqual(dv[key].dtype,np.float64)
+        self.assertEqual(lklhd_list[0].workspace().buffers(
+            walkers.shape[:-1])['log_likelihoods'].dtype,np.float32)
+        self.assertEqual(lklhd_list[0].workspace().buffers(
+            walkers.shape[:-1])['exponent'].dtype,np.float32)
+        # s^2 aPa - 2 s aPm + mPm in float64
+        self.assertEqual(lklhd_list[1].workspace().buffers(
+            walkers.shape[:-1])['exponent'].dtype,np.float64)
+        self.assertEqual(log_likelihoods[1][0].dtype,np.float64)
+        for log_likelihood_64,log_likelihood_32 in zip(*log_likelihoods):
+            np.testing.assert_allclose(log_likelihood_32,log_likelihood_64,
+                rtol=1e-5)
+
+    def test_jax_likelihood(self):
+
+        dv_list,lklhd_list = self._make_multi_lens_inputs(num_lenses=3)
+        # broader errors, so that the numpy likelihood does not underflow
+        for dv in dv_list:
+            for prefix in ['td','sigma_v']:
+                if prefix+'_likelihood_prec' in dv:
+                    dv[prefix+'_likelihood_prec'] = dv[prefix+'_likelihood_prec']/100.
+                    dv[prefix+'_likelihood_prefactors'] = tdc_sampler.gaussian_log_prefactors(
+                        dv[prefix+'_likelihood_prec'])
+            tdc_sampler.add_td_sufficient_statistics(dv)
+        tdc_sampler.add_kin_sufficient_statistics(dv_list[0])
+        lklhd_lint_list = [
+            tdc_sampler.TDCKinLikelihood(dv_list[0]['fpd_samples'].shape,
+                dv_list[0]['kin_pred_samples'].shape,
+                cosmo_model='LCDM_lambda_int',lambda_int_seed=(3,0)),
+            tdc_sampler.TDCLikelihood(dv_list[1]['fpd_samples'].shape,
+                cosmo_model='LCDM_lambda_int',use_td_suff_stats=True,
+                lambda_int_seed=(3,1))]
+        tdc_sampler.data_vector_global = dv_list
+
+        for my_lklhd_list,walkers in [
+            (lklhd_list,np.asarray([[70.,0.3,2.0,0.2],[65.,0.25,1.9,0.1]])),
+            (lklhd_lint_list,np.asarray([[70.,0.3,1.0,0.05,2.0,0.2],
+                [65.,0.25,0.95,0.1,1.9,0.1]]))]:
+            jax_lklhd = tdc_sampler.JaxLikelihood(my_lklhd_list)
+            # same distance quadrature & lambda_int samples as numpy
+            np.testing.assert_allclose(
+                tdc_sampler.total_log_likelihood(walkers,jax_lklhd),
+                tdc_sampler.total_log_likelihood(walkers,my_lklhd_list),
+                rtol=1e-10)
+            self.assertAlmostEqual(
+                tdc_sampler.total_log_likelihood(walkers[1],jax_lklhd),
+                tdc_sampler.total_log_likelihood(walkers[1],my_lklhd_list))
+
+            # device data & compiled functions are rebuilt after pickling
+            jax_copy = pickle.loads(pickle.dumps(jax_lklhd))
+            self.assertIsNone(jax_copy._device_data_list)
+            self.assertAlmostEqual(jax_copy.full_log_likelihood(walkers[0]),
+                jax_lklhd.full_log_likelihood(walkers[0]))
+
+        # device data vectors are copied once & shared by every JaxLikelihood
+        device_data_list = tdc_sampler.prepare_jax_data_vectors(lklhd_list)
+        for i,(lklhd,device_data) in enumerate(zip(lklhd_list,device_data_list)):
+            self.assertIs(lklhd.jax_data_vector(i),device_data)
+        jax_lklhd = tdc_sampler.JaxLikelihood(lklhd_list)
+        jax_lklhd.full_log_likelihood([70.,0.3,2.0,0.2])
+        for device_data,jax_device_data in zip(device_data_list,
+            jax_lklhd._device_data_list):
+            self.assertIs(device_data,jax_device_data)
+        self.assertIsNone(pickle.loads(pickle.dumps(
+            lklhd_list[0]))._jax_data_vector)
+        self.assertIsNone(tdc_sampler.shard_likelihood(lklhd_list[0],
+            slice(0,1))._jax_data_vector)
+        # copied again once the data vector is swapped
+        data_vector_global = tdc_sampler.data_vector_global
+        tdc_sampler.data_vector_global = [dict(data_vector_global[0],
+            z_lens=np.asarray(data_vector_global[0]['z_lens'])+0.01)]
+        self.assertFalse(np.allclose(
+            lklhd_list[0].jax_data_vector(0)['gl_one_plus_z_cubed'],
+            device_data_list[0]['gl_one_plus_z_cubed']))
+        tdc_sampler.data_vector_global = data_vector_global
+        self.assertIsNot(lklhd_list[0].jax_data_vector(0),device_data_list[0])
+
+        # fresh lambda_int draws
+        jax_lklhd = tdc_sampler.JaxLikelihood([tdc_sampler.TDCLikelihood(
+            dv_list[1]['fpd_samples'].shape,cosmo_model='LCDM_lambda_int')],
+            [1],seed=0)
+        draws = [jax_lklhd.full_log_likelihood(walkers[0]) for _ in range(2)]
+        self.assertTrue(np.all(np.isfinite(draws)))
+        self.assertNotEqual(draws[0],draws[1])
+
+        with self.assertRaises(ValueError):
+            tdc_sampler.fast_TDC(lklhd_list,dv_list,use_multiprocess=True,
+                likelihood_backend='jax')
+
+    def test_jax_warm_up(self):
+
+        dv_list,lklhd_list = self._make_multi_lens_inputs(num_lenses=3)
+        for dv in dv_list:
+            tdc_sampler.add_td_sufficient_statistics(dv)
+        tdc_sampler.data_vector_global = dv_list
+        walkers = np.asarray([[70.,0.3,2.0,0.2],[65.,0.25,1.9,0.1]])
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            tdc_utils.enable_jax_compilation_cache(cache_dir)
+            try:
+                jax_lklhd = tdc_sampler.JaxLikelihood(lklhd_list)
+                self.assertEqual(tdc_sampler.warm_up_likelihoods(jax_lklhd,
+                    np.zeros(walkers.shape)),1)
+                # compiled program is stored on disk
+                self.assertGreater(len(os.listdir(cache_dir)),0)
+                np.testing.assert_allclose(
+                    tdc_sampler.total_log_likelihood(walkers,jax_lklhd),
+                    tdc_sampler.JaxLikelihood(lklhd_list).full_log_likelihood(
+                        walkers),rtol=1e-12)
+            finally:
+                tdc_utils.disable_jax_compilation_cache()
+
+        # every shape of emcee's vectorized stretch move (full ensemble,
+        #   then each half) is compiled before sampling
+        walker_batch = np.concatenate([walkers,walkers])
+        self.assertEqual([h.shape for h in
+            tdc_sampler.proposal_shaped_hyperparameters(4,'LCDM',vectorize=True)],
+            [(4,4),(2,4)])
+        self.assertEqual([h.shape for h in
+            tdc_sampler.proposal_shaped_hyperparameters(5,'LCDM',vectorize=True)],
+            [(5,4),(3,4),(2,4)])
+        jax_lklhd = tdc_sampler.JaxLikelihood(lklhd_list)
+        for hyperparameters in tdc_sampler.proposal_shaped_hyperparameters(
+                len(walker_batch),'LCDM',vectorize=True):
+            tdc_sampler.warm_up_likelihoods(jax_lklhd,hyperparameters)
+        num_programs = jax_lklhd._batch_log_likelihood_fn._cache_size()
+        tdc_sampler.total_log_likelihood(walker_batch,jax_lklhd)
+        tdc_sampler.total_log_likelihood(walkers,jax_lklhd)
+        # half-batch call w/out tracing or compiling a new program
+        self.assertEqual(jax_lklhd._batch_log_likelihood_fn._cache_size(),
+                         num_programs)
+
+        # jax_cosmo distance functions, nothing to compile for numpy
+        jax_cosmo_list = [tdc_sampler.TDCLikelihood(dv['fpd_samples'].shape,
+            cosmo_model='LCDM',use_jax_cosmo=True) for dv in dv_list]
+        self.assertEqual(tdc_sampler.warm_up_likelihoods(
+            tdc_sampler.LikelihoodGroup(jax_cosmo_list),walkers),3)
+        self.assertEqual(tdc_sampler.warm_up_likelihoods(jax_cosmo_list,
+            walkers[0]),3*len(dv_list))
+        self.assertEqual(tdc_sampler.warm_up_likelihoods(lklhd_list,
+            walkers),0)
+        np.testing.assert_allclose(
+            tdc_sampler.total_log_likelihood(walkers,jax_cosmo_list),
+            tdc_sampler.total_log_likelihood(walkers,[
+                tdc_sampler.TDCLikelihood(dv['fpd_samples'].shape,
+                cosmo_model='LCDM',use_jax_cosmo=True) for dv in dv_list]),
+            rtol=1e-12)
+
+    def test_likelihood_group(self):
+
+        dv_dbls = self._make_data_vector(self.td_measured_dbls,
+            self.td_prec_dbls,self.fpd_pred_samples_dbls,
+            self.gamma_pred_samples_dbls,[0.5],[1.2],
+            kappa_ext_samples=self.kappa_ext_samples)
+        dv_kin = self._make_data_vector(self.td_measured_quads,
+            self.td_prec_quads,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.6],[1.3],
+            sigma_v_measured=self.ifu_sigma_v_measured,
+            sigma_v_prec=self.ifu_sigma_v_likelihood_prec,
+            kin_pred_samples=self.ifu_sigma_v_pred_samples/1.2)
+        tdc_sampler.data_vector_global = [dv_dbls,dv_kin]
+
+        walkers = np.asarray([[70.,0.3,-1.,0.,2.0,0.2],
+            [65.,0.25,-0.8,0.3,1.9,0.1]])
+        # distance engine (default), jax_cosmo, astropy
+        for distance_kwargs in [{},{'use_jax_cosmo':True},
+            {'use_astropy':True}]:
+            lklhd_list = [
+                tdc_sampler.TDCLikelihood(dv_dbls['fpd_samples'].shape,
+                    cosmo_model='w0waCDM',**distance_kwargs),
+                tdc_sampler.TDCKinLikelihood(dv_kin['fpd_samples'].shape,
+                    dv_kin['kin_pred_samples'].shape,
+                    cosmo_model='w0waCDM',**distance_kwargs)]
+            lklhd_group = tdc_sampler.LikelihoodGroup(lklhd_list)
+            # batch of proposals & single proposal
+            np.testing.assert_allclose(
+                tdc_sampler.log_posterior(walkers,'w0waCDM',lklhd_group),
+                tdc_sampler.log_posterior(walkers,'w0waCDM',lklhd_list),
+                rtol=1e-6)
+            self.assertAlmostEqual(
+                tdc_sampler.log_posterior(walkers[0],'w0waCDM',lklhd_group),
+                tdc_sampler.log_posterior(walkers[0],'w0waCDM',lklhd_list),
+                places=5)
+
+        # members must share cosmo_model and distance settings
+        with self.assertRaises(ValueError):
+            tdc_sampler.LikelihoodGroup([lklhd_list[0],
+                tdc_sampler.TDCLikelihood(dv_dbls['fpd_samples'].shape,
+                    cosmo_model='LCDM')])
+        with self.assertRaises(ValueError):
+            tdc_sampler.LikelihoodGroup([lklhd_list[0],
+                tdc_sampler.TDCLikelihood(dv_dbls['fpd_samples'].shape,
+                    cosmo_model='w0waCDM')])
+
+    def test_packed_likelihood(self):
+
+        # doubles padded w/ zeros to 3 delays (no kappa_ext), quads w/ a
+        #   correlated precision matrix, kinematic quads w/ beta_ani
+        dv_dbls = self._make_data_vector(self.td_measured_dbls,
+            self.td_prec_dbls,self.fpd_pred_samples_dbls,
+            self.gamma_pred_samples_dbls,[0.5],[1.2])
+        for key in ['fpd_samples','td_measured']:
+            dv_dbls[key] = np.concatenate([dv_dbls[key],
+                np.zeros(dv_dbls[key].shape[:-1]+(2,))],axis=-1)
+        td_prec_padded = np.zeros((1,5,3,3))
+        td_prec_padded[...,0,0] = dv_dbls['td_likelihood_prec'][...,0,0]
+        dv_dbls['td_likelihood_prec'] = td_prec_padded
+        td_prec_corr = self.td_prec_quads.copy()
+        td_prec_corr[:,0,1] = td_prec_corr[:,1,0] = 0.01
+        dv_quads = self._make_data_vector(self.td_measured_quads,
+            td_prec_corr,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.4],[1.5],
+            kappa_ext_samples=self.kappa_ext_samples)
+        dv_kin = self._make_data_vector(self.td_measured_quads,
+            self.td_prec_quads,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.6],[1.3],
+            kappa_ext_samples=self.kappa_ext_samples,
+            sigma_v_measured=self.ifu_sigma_v_measured,
+            sigma_v_prec=self.ifu_sigma_v_likelihood_prec,
+            kin_pred_samples=self.ifu_sigma_v_pred_samples/1.2,
+            beta_ani_samples=self.beta_ani_samples)
+        dv_list = [dv_dbls,dv_quads,dv_kin]
+
+        for cosmo_model,walkers in [
+            ('LCDM',np.asarray([[70.,0.3,2.0,0.2],[65.,0.25,1.9,0.1]])),
+            ('LCDM_lambda_int_beta_ani',np.asarray([
+                [70.,0.3,1.,0.05,0.,0.1,2.0,0.2],
+                [65.,0.25,0.9,0.1,0.05,0.2,1.9,0.1]]))]:
+            for use_suff_stats in [False,True]:
+                kwargs = {'cosmo_model':cosmo_model,'lambda_int_seed':0,
+                          'use_td_suff_stats':use_suff_stats}
+                lklhd_list = [
+                    tdc_sampler.TDCLikelihood(dv_dbls['fpd_samples'].shape,
+                        **kwargs),
+                    tdc_sampler.TDCLikelihood(dv_quads['fpd_samples'].shape,
+                        **kwargs),
+                    tdc_sampler.TDCKinLikelihood(dv_kin['fpd_samples'].shape,
+                        dv_kin['kin_pred_samples'].shape,
+                        use_kin_suff_stats=use_suff_stats,**kwargs)]
+                tdc_sampler.add_missing_sufficient_statistics(dv_list,lklhd_list)
+                tdc_sampler.data_vector_global = dv_list
+                expected = tdc_sampler.total_log_likelihood(walkers,lklhd_list)
+                self.assertTrue(np.all(np.isfinite(expected)))
+
+                packed_dv = tdc_sampler.pack_data_vectors(dv_list,lklhd_list)
+                # kinematic lenses first, padded delays dropped
+                np.testing.assert_allclose(packed_dv['z_lens'],[0.6,0.5,0.4])
+                if not use_suff_stats:
+                    np.testing.assert_array_equal(packed_dv['delay_offsets'],
+                        [0,3,4,7])
+                    # off-diagonal element once (doubled)
+                    np.testing.assert_array_equal(
+                        np.diff(packed_dv['td_pair_offsets']),[3,1,4])
+                tdc_sampler.data_vector_global = [packed_dv]
+                for use_workspace in [True,False]:
+                    for lklhd in lklhd_list:
+                        lklhd.use_workspace = use_workspace
+                    packed_lklhd = tdc_sampler.PackedLikelihood(lklhd_list)
+                    self.assertEqual(packed_lklhd.num_lenses,3)
+                    self.assertEqual(packed_lklhd.num_kin_lenses,1)
+                    # same common random numbers as the members
+                    np.testing.assert_allclose(
+                        tdc_sampler.total_log_likelihood(walkers,[packed_lklhd]),
+                        expected,rtol=1e-10)
+                    self.assertAlmostEqual(
+                        tdc_sampler.total_log_likelihood(walkers[0],[packed_lklhd]),
+                        expected[0],places=8)
+
+        # members must share their settings
+        with self.assertRaises(ValueError):
+            tdc_sampler.PackedLikelihood([lklhd_list[0],
+                tdc_sampler.TDCLikelihood(dv_quads['fpd_samples'].shape,
+                    cosmo_model=cosmo_model,lambda_int_seed=0)])
+
+        # lens w/o any measurement: no empty segment (reduceat would return
+        #   the next lens' first product instead of 0)
+        td_prec = np.asarray([np.eye(3),np.zeros((3,3)),np.eye(3)])
+        with self.assertRaises(ValueError):
+            tdc_sampler.pack_quadratic_form([np.zeros((3,10,3))],
+                [np.zeros((3,3))],[td_prec])
+
+    def test_distance_bundle(self):
+
+        dv_kin = self._make_data_vector(self.td_measured_quads,
+            self.td_prec_quads,self.fpd_pred_samples_quads,
+            self.gamma_pred_samples_quads,[0.6],[1.3],
+            sigma_v_measured=self.ifu_sigma_v_measured,
+            sigma_v_prec=self.ifu_sigma_v_likelihood_prec,
+            kin_pred_samples=self.ifu_sigma_v_pred_samples/1.2)
+        tdc_sampler.data_vector_global = [dv_kin]
+
+        hyperparameters = np.asarray([[70.,0.3,-1.,0.,2.0,0.2],
+            [65.,0.25,-0.8,0.3,1.9,0.1]])
+        # distance engine (default), jax_cosmo, astropy
+        for distance_kwargs in [{},{'use_jax_cosmo':True},
+            {'use_astropy':True}]:
+            lklhd = tdc_sampler.TDCKinLikelihood(dv_kin['fpd_samples'].shape,
+                dv_kin['kin_pred_samples'].shape,cosmo_model='w0waCDM',
+                **distance_kwargs)
+            # single proposal & batch of proposals
+            for hyp in [hyperparameters[0],hyperparameters]:
+                proposed_cosmo = lklhd.construct_proposed_cosmo(hyp)
+                distances = lklhd.distances_from_proposed_cosmo(
+                    proposed_cosmo,0)
+                np.testing.assert_allclose(distances['Ddt'],
+                    lklhd.ddt_from_proposed_cosmo(proposed_cosmo,0),rtol=1e-6)
+                np.testing.assert_allclose(distances['Ds_div_Dds'],
+                    lklhd.kin_distance_ratio_from_proposed_cosmo(
+                    proposed_cosmo,0),rtol=1e-6)
+
+    def test_distance_engine(self):
+
+        z_lens = np.asarray([0.3,0.5,0.8])
+        z_src = np.asarray([1.0,1.2,2.5])
+        engine = tdc_utils.W0waCDMDistanceEngine(z_lens,z_src)
+
+        # single cosmology
+        for (H0,Om0,w0,wa) in [(70.,0.3,-1.,0.),(65.,0.25,-0.8,0.3)]:
+            astropy_cosmo = w0waCDM(H0=H0,Om0=Om0,Ode0=1.-Om0,w0=w0,wa=wa)
+            distances = engine.distances(tdc_utils.FlatW0waCDM(
+                H0=H0,Om0=Om0,w0=w0,wa=wa))
+            np.testing.assert_allclose(distances['Ddt'],
+                np.asarray(tdc_utils.ddt_from_redshifts(astropy_cosmo,
+                z_lens,z_src).value),rtol=1e-8)
+            np.testing.assert_allclose(distances['Ds_div_Dds'],
+                np.asarray(tdc_utils.kin_distance_ratio(astropy_cosmo,
+                z_lens,z_src)),rtol=1e-8)
+
+        # batch of cosmologies broadcasts to (n_walkers,n_lenses)
+        batch = tdc_utils.FlatW0waCDM(H0=np.asarray([70.,65.]),
+            Om0=np.asarray([0.3,0.25]),w0=np.asarray([-1.,-0.8]),
+            wa=np.asarray([0.,0.3]))
+        distances = engine.distances(batch)
+        self.assertEqual(distances['Ddt'].shape,(2,3))
+        self.assertEqual(distances['Ds_div_Dds'].shape,(2,3))
+        np.testing.assert_allclose(distances['Ddt'][1],
+            engine.distances(tdc_utils.FlatW0waCDM(
+                H0=65.,Om0=0.25,w0=-0.8,wa=0.3))['Ddt'])
+
+        # a likelihood's engine follows the data vector it is called with
+        tdc_sampler.data_vector_global = [{'z_lens':z_lens,'z_src':z_src},
+            {'z_lens':z_lens[::-1],'z_src':z_src[::-1]}]
+        lklhd = tdc_sampler.TDCLikelihood((3,10,1))
+        engine_0 = lklhd.distance_engine(0)
+        self.assertIs(lklhd.distance_engine(0),engine_0)
+        np.testing.assert_array_equal(lklhd.distance_engine(1).z_lens,
+            z_lens[::-1])
+        tdc_sampler.data_vector_global = [{'z_lens':z_lens+0.1,'z_src':z_src}]
+        np.testing.assert_array_equal(lklhd.distance_engine(0).z_lens,
+            z_lens+0.1)
+
+    def test_distance_cache(self):
+
+        z_lens = np.asarray([0.3,0.5,0.8])
+        z_src = np.asarray([1.0,1.2,2.5])
+        engine = tdc_utils.W0waCDMDistanceEngine(z_lens,z_src,cache_size=2)
+        uncached = tdc_utils.W0waCDMDistanceEngine(z_lens,z_src,cache_size=0)
+
+        # H0 scan at fixed shape parameters only integrates once
+        for H0 in [60.,70.,80.]:
+            cosmo = tdc_utils.FlatW0waCDM(H0=H0,Om0=0.3,w0=-1.,wa=0.)
+            for key in ['Ddt','Ds_div_Dds']:
+                np.testing.assert_allclose(engine.distances(cosmo)[key],
+                    uncached.distances(cosmo)[key])
+        self.assertEqual(engine.cache_misses,1)
+        self.assertEqual(engine.cache_hits,5)
+
+        # batch w/ repeated & new shape parameters, cache stays bounded
+        batch = tdc_utils.FlatW0waCDM(H0=np.asarray([70.,65.,60.,75.]),
+            Om0=np.asarray([0.3,0.25,0.3,0.2]),w0=-1.,wa=0.)
+        distances = engine.distances(batch)
+        for key in ['Ddt','Ds_div_Dds']:
+            np.testing.assert_allclose(distances[key],
+                uncached.distances(batch)[key])
+        self.assertEqual(len(engine._cache),2)
+        # least recently used entry (Om0=0.3) was evicted
+        self.assertNotIn((0.3,-1.,0.),engine._cache)
+
+    def test_distance_emulator(self):
+
+        z_lens = np.asarray([0.3,0.5,0.8])
+        z_src = np.asarray([1.0,1.2,2.5])
+        grid = {'Om0':(0.2,0.4,11),'w0':(-1.5,-0.5,11),'wa':(-1.,1.,11)}
+        engine = tdc_utils.W0waCDMDistanceEngine(z_lens,z_src,cache_size=0)
+
+        with tempfile.TemporaryDirectory() as table_dir:
+            for interpolation,rtol in [('linear',1e-3),('cubic',5e-4)]:
+                emulator = tdc_utils.W0waCDMDistanceEmulator.load_or_build(
+                    z_lens,z_src,table_dir,grid=grid,
+                    interpolation=interpolation)
+                report = emulator.accuracy_report(num_test_points=200)
+                self.assertLess(report['Ddt']['max'],rtol)
+                self.assertLess(report['Ds_div_Dds']['max'],rtol)
+
+                # inside the grid: interpolated, outside: exact
+                batch = tdc_utils.FlatW0waCDM(H0=np.asarray([70.,65.]),
+                    Om0=np.asarray([0.31,0.45]),w0=np.asarray([-0.9,-1.]),
+                    wa=np.asarray([0.1,0.]))
+                emulated = emulator.distances(batch)['Ddt']
+                exact = engine.distances(batch)['Ddt']
+                np.testing.assert_allclose(emulated[0],exact[0],rtol=rtol)
+                np.testing.assert_allclose(emulated[1],exact[1],rtol=1e-12)
+
+            # 2nd call re-used the table written by the 1st
+            self.assertEqual(len(os.listdir(table_dir)),1)
+            loaded = tdc_utils.W0waCDMDistanceEmulator.load(
+                os.path.join(table_dir,os.listdir(table_dir)[0]))
+            np.testing.assert_array_equal(loaded.chi_src_grid,
+                emulator.chi_src_grid)
+
+        # engines & tables are built before sampling, not on the first call
+        tdc_sampler.data_vector_global = [{'z_lens':z_lens,'z_src':z_src},
+            {'z_lens':z_lens[:2],'z_src':z_src[:2]}]
+        with tempfile.TemporaryDirectory() as table_dir:
+            lklhd_list = [tdc_sampler.TDCLikelihood((n,10,1),
+                distance_emulator='linear',distance_emulator_dir=table_dir)
+                for n in [3,2]]
+            self.assertEqual(tdc_sampler.prepare_distance_engines(lklhd_list),2)
+            self.assertEqual(len(os.listdir(table_dir)),2)
+            self.assertIsNotNone(lklhd_list[1]._distance_engine)
+            group = tdc_sampler.LikelihoodGroup(lklhd_list)
+            self.assertEqual(tdc_sampler.prepare_distance_engines(group),1)
+            self.assertEqual(len(group._distance_engine.z_lens),5)
+        self.assertEqual(tdc_sampler.prepare_distance_engines(
+            [tdc_sampler.TDCLikelihood((3,10,1),use_astropy=True)]),0)
+
     def _check_chain_moves(self,mcmc_chain):
         # loop over params, check that chain is moving
         for param_idx in range(0,mcmc_chain.shape[2]):